@@ -0,0 +1,185 @@
+"""Controle de admissão dos renders: vagas, fila com prazo e limite por cliente.
+
+Sem limite, uma rajada de certificados deixava todas as requisições
+lentas ao mesmo tempo e podia estourar a memória do container. Antes de
+renderizar, o handler chama `await admissao.admitir(request)`:
+
+- no máximo ADMISSAO_MAX_RENDERS requisições renderizam ao mesmo tempo;
+  as demais esperam numa fila FIFO de até ADMISSAO_FILA lugares, por no
+  máximo ADMISSAO_ESPERA segundos. Fila cheia ou prazo vencido → 503 na
+  hora, com Retry-After estimado pela duração média de uma vaga;
+- cada cliente tem um balde de ADMISSAO_RAJADA fichas que se repõe a
+  ADMISSAO_TAXA fichas/s; sem ficha → 429 com Retry-After. O cliente é o
+  IP da conexão; atrás de proxy (Vercel, nginx), ADMISSAO_PROXIES diz
+  quantos proxies confiáveis há na frente e o IP vem do X-Forwarded-For,
+  contando esse número de saltos a partir da direita. Os saltos à
+  esquerda são escritos pelo próprio cliente e não valem como chave;
+- a vaga fica guardada no scope da requisição e é devolvida pelo
+  AdmissaoMiddleware quando a resposta termina — inclusive ZIP e PDF
+  incremental em streaming, erro ou desconexão do cliente.
+
+`admitir` é idempotente na mesma requisição: rotas que gastam número de
+nota ou emitem código admitem antes disso (um 503 não pode abrir buraco na
+numeração), e o responder_pdf chamado depois não pede outra vaga. Cache
+hit não passa por aqui. Os jobs só pagam a ficha (`cobrar`): a
+concorrência deles já é JOBS_WORKERS.
+
+Tudo roda no event loop (uma thread), então não há locks.
+
+    ADMISSAO_MAX_RENDERS   requisições renderizando ao mesmo tempo (padrão 2 × PDF_WORKERS, 0 desliga)
+    ADMISSAO_FILA          lugares na fila de espera (padrão 32)
+    ADMISSAO_ESPERA        segundos máximos na fila (padrão 10)
+    ADMISSAO_TAXA          fichas por segundo por cliente (padrão 5, 0 desliga)
+    ADMISSAO_RAJADA        tamanho do balde de cada cliente (padrão 20)
+    ADMISSAO_PROXIES       proxies confiáveis na frente da API (padrão 0: ignora X-Forwarded-For)
+"""
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+
+from fastapi import HTTPException, Request
+
+from executor import executor
+from metrics import FASES, rota_atual
+
+_CLIENTES = 10_000  # baldes guardados (LRU); um cliente esquecido volta com o balde cheio
+
+
+class Admissao:
+    def __init__(self, max_renders: int = None, fila: int = None, espera: float = None,
+                 taxa: float = None, rajada: float = None, proxies: int = None):
+        self.max_renders = max_renders if max_renders is not None else int(os.getenv("ADMISSAO_MAX_RENDERS", executor.workers * 2))
+        self.fila_max = fila if fila is not None else int(os.getenv("ADMISSAO_FILA", 32))
+        self.espera = espera if espera is not None else float(os.getenv("ADMISSAO_ESPERA", 10))
+        self.taxa = taxa if taxa is not None else float(os.getenv("ADMISSAO_TAXA", 5))
+        self.rajada = rajada if rajada is not None else float(os.getenv("ADMISSAO_RAJADA", 20))
+        self.proxies = proxies if proxies is not None else int(os.getenv("ADMISSAO_PROXIES", 0))
+        self.em_voo = 0
+        self._fila = deque()  # futures de quem espera vaga, em ordem de chegada
+        self._baldes = OrderedDict()  # cliente -> (fichas, instante)
+        self._duracao = 1.0  # média móvel de quanto uma vaga fica ocupada
+        self.admitidos = 0
+        self.rejeitados = {"fila_cheia": 0, "prazo": 0, "taxa": 0}
+
+    # ---------- limite por cliente ----------
+    def cliente(self, request: Request) -> str:
+        """IP da conexão, ou o do X-Forwarded-For que o proxy confiável mais externo viu."""
+        if self.proxies > 0:
+            saltos = [s.strip() for s in ",".join(request.headers.getlist("x-forwarded-for")).split(",") if s.strip()]
+            if len(saltos) >= self.proxies:
+                return saltos[-self.proxies]
+        return request.client.host if request.client else "-"
+
+    def cobrar(self, request: Request):
+        """Tira uma ficha do balde do cliente; 429 com Retry-After se estiver vazio."""
+        if self.taxa <= 0:
+            return
+        cliente = self.cliente(request)
+        agora = time.monotonic()
+        fichas, antes = self._baldes.pop(cliente, (self.rajada, agora))
+        fichas = min(self.rajada, fichas + (agora - antes) * self.taxa)
+        if fichas < 1:
+            self._baldes[cliente] = (fichas, agora)
+            self.rejeitados["taxa"] += 1
+            raise HTTPException(429, "Muitas requisições deste cliente; tente mais tarde",
+                                headers={"Retry-After": str(math.ceil((1 - fichas) / self.taxa))})
+        self._baldes[cliente] = (fichas - 1, agora)
+        if len(self._baldes) > _CLIENTES:
+            self._baldes.popitem(last=False)
+
+    # ---------- vagas ----------
+    def _retry_after(self) -> str:
+        vagas = max(self.max_renders, 1)
+        return str(max(1, math.ceil(self._duracao * (len(self._fila) + 1) / vagas)))
+
+    def _recusar(self, motivo: str):
+        self.rejeitados[motivo] += 1
+        raise HTTPException(503, "Servidor ocupado gerando documentos; tente novamente em instantes",
+                            headers={"Retry-After": self._retry_after()})
+
+    async def admitir(self, request: Request):
+        """Cobra a ficha e ocupa uma vaga até a resposta terminar (429/503 se não der)."""
+        estado = request.scope.setdefault("state", {})
+        if "vaga" in estado:
+            return
+        self.cobrar(request)
+        if self.max_renders <= 0:
+            estado["vaga"] = None
+            return
+        t0 = time.monotonic()
+        if self.em_voo < self.max_renders and not self._fila:
+            self.em_voo += 1
+        elif len(self._fila) >= self.fila_max:
+            self._recusar("fila_cheia")
+        else:
+            vez = asyncio.get_running_loop().create_future()
+            self._fila.append(vez)
+            try:
+                await asyncio.wait_for(vez, self.espera)
+            except asyncio.TimeoutError:
+                self._sair_da_fila(vez)
+                self._recusar("prazo")
+            except asyncio.CancelledError:  # cliente desconectou esperando
+                if vez.done() and not vez.cancelled():
+                    self._devolver()  # a vaga chegou junto com o cancelamento
+                self._sair_da_fila(vez)
+                raise
+            FASES.observe("fila", rota_atual.get(), valor=time.monotonic() - t0)
+        self.admitidos += 1
+        estado["vaga"] = time.monotonic()
+
+    def _sair_da_fila(self, vez):
+        try:
+            self._fila.remove(vez)
+        except ValueError:
+            pass
+
+    def _devolver(self, inicio: float = None):
+        if inicio is not None:
+            self._duracao = 0.8 * self._duracao + 0.2 * (time.monotonic() - inicio)
+        while self._fila:  # passa a vaga direto para o próximo da fila
+            vez = self._fila.popleft()
+            if not vez.done():
+                vez.set_result(None)
+                return
+        self.em_voo -= 1
+
+    def liberar(self, scope):
+        """Chamado pelo middleware no fim da resposta."""
+        inicio = scope.get("state", {}).pop("vaga", None)
+        if inicio is not None:
+            self._devolver(inicio)
+
+    def stats(self) -> dict:
+        return {
+            "em_voo": self.em_voo,
+            "max_renders": self.max_renders,
+            "fila": len(self._fila),
+            "fila_max": self.fila_max,
+            "espera_max": self.espera,
+            "admitidos": self.admitidos,
+            **{f"rejeitados_{motivo}": n for motivo, n in self.rejeitados.items()},
+            "duracao_media": round(self._duracao, 3),
+            "clientes": len(self._baldes),
+        }
+
+
+class AdmissaoMiddleware:
+    """Devolve a vaga da requisição quando a resposta termina (streaming incluído)."""
+
+    def __init__(self, app, controle: Admissao = None):
+        self.app = app
+        self.controle = controle or admissao
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controle.liberar(scope)
+
+
+admissao = Admissao()
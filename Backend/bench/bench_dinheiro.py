@@ -0,0 +1,66 @@
+"""Formatação BRL e totais: cadeia de .replace() em float x dinheiro.py.
+
+Uso (dentro de Backend/):
+    python -m bench.bench_dinheiro                 # listas de 100.000 itens
+    python -m bench.bench_dinheiro --itens 1000000
+
+Mede, para cada distribuição de valores, o tempo de formatar a lista
+inteira e confere que as duas saídas são iguais; depois compara o total
+somado em float com o total exato em centavos.
+"""
+import argparse
+import random
+import time
+
+from dinheiro import brl, brl_lote, centavos
+
+
+def cadeia(valores):
+    """Como draw_nota formatava: três replace por valor, em float."""
+    return [f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") for v in valores]
+
+
+def melhor(fn, arg, rodadas: int) -> float:
+    tempos = []
+    for _ in range(rodadas):
+        t = time.perf_counter()
+        fn(arg)
+        tempos.append(time.perf_counter() - t)
+    return min(tempos)
+
+
+def main_cli():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--itens", type=int, default=100_000)
+    ap.add_argument("--rodadas", type=int, default=7)
+    args = ap.parse_args()
+
+    rnd = random.Random(42)
+    catalogo = [rnd.randint(500, 250_000) for _ in range(300)]
+    distribuicoes = {
+        "catálogo (300 preços)": [rnd.choice(catalogo) for _ in range(args.itens)],
+        "distintos até 5 mil": [rnd.randint(1, 500_000) for _ in range(args.itens)],
+        "distintos até 10 mi": [rnd.randint(-10**9, 10**9) for _ in range(args.itens)],
+    }
+
+    print(f"{args.itens} itens        {'cadeia ms':>10}{'brl_lote ms':>13}{'um a um ms':>12}{'ganho':>8}")
+    for nome, cs in distribuicoes.items():
+        floats = [c / 100 for c in cs]
+        assert cadeia(floats) == brl_lote(cs) == [brl(c) for c in cs]
+        t_cadeia = melhor(cadeia, floats, args.rodadas)
+        t_lote = melhor(brl_lote, cs, args.rodadas)
+        t_um = melhor(lambda v: [brl(c) for c in v], cs, args.rodadas)
+        print(f"{nome:<22}{t_cadeia * 1000:>10.1f}{t_lote * 1000:>13.1f}{t_um * 1000:>12.1f}{t_cadeia / t_lote:>7.1f}x")
+
+    # total: 0,10 + 0,20 + ... em float deriva; em centavos é exato
+    precos = [f"{rnd.randint(1, 99_999) / 100:.2f}" for _ in range(args.itens)]
+    exato = sum(centavos(p) for p in precos)
+    em_float = 0.0
+    for p in precos:
+        em_float += float(p)
+    print(f"\ntotal de {args.itens} itens: centavos {brl(exato)} | float {em_float:.10f} "
+          f"(erro {abs(em_float * 100 - exato):.2e} centavo)")
+
+
+if __name__ == "__main__":
+    main_cli()
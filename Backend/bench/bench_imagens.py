@@ -0,0 +1,210 @@
+"""Cache de imagens (imagens.ImageCache) contra um http.server local.
+
+Uso (dentro de Backend/):
+    python -m bench.bench_imagens [--n 5000] [--threads 16]
+
+Sobe um servidor HTTP numa thread, com PNGs gerados na hora, e confere
+contando as requisições que chegam a ele:
+
+- acerto/erro: obter com cache frio (download + decodificação), quente
+  (memória) e só em disco (outra instância no mesmo diretório, como outro
+  processo do executor); a mesma imagem por outra URL não é decodificada
+  de novo;
+- falha lembrada: uma URL que dá 404 não é pedida de novo antes de
+  falha_ttl, e volta a ser depois;
+- limites: Content-Length acima de max_download, corpo sem Content-Length
+  que passa do limite e imagem acima de max_pixels viram None;
+- single-flight: N threads pedem a mesma URL lenta ao mesmo tempo e o
+  servidor vê um download só; quem espera uma busca que passa de
+  2 × timeout desiste com None, sem baixar por conta própria.
+
+Sai com código 1 se alguma conferência falhar.
+"""
+import argparse
+import logging
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+from PIL import Image
+
+from imagens import ImageCache
+
+MAX_DOWNLOAD = 256 * 1024
+MAX_PIXELS = 1_000_000
+
+
+def png(largura: int, altura: int, cor=(46, 125, 50)) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (largura, altura), cor).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        servidor = self.server
+        with servidor.lock:
+            servidor.pedidos[self.path] += 1
+        if self.path not in servidor.arquivos:
+            self.send_error(404)
+            return
+        dados, atraso, com_tamanho = servidor.arquivos[self.path]
+        time.sleep(atraso)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        if com_tamanho:
+            self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        try:
+            self.wfile.write(dados)
+        except OSError:
+            pass  # o cliente desistiu no limite
+
+    def log_message(self, *args):
+        pass
+
+
+class Servidor(ThreadingHTTPServer):
+    """arquivos: caminho -> (bytes, atraso em s, manda Content-Length); conta os pedidos por caminho."""
+
+    daemon_threads = True
+
+    def __init__(self, arquivos: dict):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.arquivos = arquivos
+        self.pedidos = Counter()
+        self.lock = threading.Lock()
+
+    def url(self, caminho: str) -> str:
+        return f"http://127.0.0.1:{self.server_port}{caminho}"
+
+
+class Conferencias:
+    def __init__(self):
+        self.falhas = 0
+
+    def __call__(self, nome: str, ok: bool, detalhe: str = ""):
+        if not ok:
+            self.falhas += 1
+        print(f"  {'ok ' if ok else 'FALHOU'} {nome}{f' ({detalhe})' if detalhe else ''}")
+
+
+def ms(segundos: float) -> str:
+    return f"{segundos * 1000:.1f} ms"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--n", type=int, default=5000, help="obter() repetidos no cache quente")
+    ap.add_argument("--threads", type=int, default=16, help="threads pedindo a mesma URL ao mesmo tempo")
+    args = ap.parse_args()
+    logging.getLogger("imagens").setLevel(logging.ERROR)  # as falhas abaixo são de propósito
+
+    logo = png(600, 200)
+    servidor = Servidor({
+        "/logo.png": (logo, 0, True),
+        "/copia.png": (logo, 0, True),
+        "/lento.png": (png(600, 200, (200, 40, 40)), 0.3, True),
+        "/demorado.png": (png(300, 100, (40, 40, 200)), 0, True),
+        "/grande.png": (b"\0" * (MAX_DOWNLOAD * 2), 0, True),
+        "/sem-tamanho.png": (b"\0" * (MAX_DOWNLOAD * 2), 0, False),
+        "/gigante.png": (png(2000, 2000), 0, True),
+    })
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    conferir = Conferencias()
+    pedidos = servidor.pedidos
+
+    with tempfile.TemporaryDirectory() as disco:
+        def novo_cache(**kwargs) -> ImageCache:
+            opcoes = dict(disco=disco, max_download=MAX_DOWNLOAD, max_pixels=MAX_PIXELS, timeout=2, falha_ttl=0.5)
+            opcoes.update(kwargs)
+            return ImageCache(**opcoes)
+
+        cache = novo_cache()
+        print("acerto/erro")
+        t0 = time.perf_counter()
+        frio = cache.obter(servidor.url("/logo.png"))
+        t_frio = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        quentes = [cache.obter(servidor.url("/logo.png")) for _ in range(args.n)]
+        t_quente = (time.perf_counter() - t0) / args.n
+        conferir(f"frio {ms(t_frio)}, quente {t_quente * 1e6:.1f} µs/obter", frio is not None and all(r is frio for r in quentes))
+        conferir("um download para o frio + os quentes", pedidos["/logo.png"] == 1, f"{pedidos['/logo.png']} pedidos")
+        cache.obter(servidor.url("/copia.png"))
+        conferir("mesma imagem por outra URL decodificada uma vez", cache.stats()["imagens"] == 1, f"{cache.stats()['imagens']} imagens")
+
+        outro = novo_cache()
+        t0 = time.perf_counter()
+        do_disco = outro.obter(servidor.url("/logo.png"))
+        t_disco = time.perf_counter() - t0
+        conferir(f"outra instância lê do disco em {ms(t_disco)}", do_disco is not None and outro.disco_hits == 1)
+        conferir("sem baixar de novo", pedidos["/logo.png"] == 1, f"{pedidos['/logo.png']} pedidos")
+
+        print("falha lembrada")
+        url_404 = servidor.url("/nao-existe.png")
+        conferir("404 vira None", cache.obter(url_404) is None)
+        t0 = time.perf_counter()
+        lembrada = cache.obter(url_404)
+        conferir(f"dentro de falha_ttl responde sem o servidor em {ms(time.perf_counter() - t0)}",
+                 lembrada is None and pedidos["/nao-existe.png"] == 1, f"{pedidos['/nao-existe.png']} pedidos")
+        time.sleep(cache.falha_ttl + 0.05)
+        cache.obter(url_404)
+        conferir("depois de falha_ttl tenta de novo", pedidos["/nao-existe.png"] == 2, f"{pedidos['/nao-existe.png']} pedidos")
+
+        print("limites")
+        for caminho, nome in (
+            ("/grande.png", f"Content-Length acima de {MAX_DOWNLOAD} bytes"),
+            ("/sem-tamanho.png", "corpo sem Content-Length acima do limite"),
+            ("/gigante.png", f"2000x2000 acima de {MAX_PIXELS} pixels"),
+        ):
+            antes = cache.falhas
+            conferir(nome, cache.obter(servidor.url(caminho)) is None and cache.falhas == antes + 1)
+
+        print("single-flight")
+        barreira = threading.Barrier(args.threads)
+        resultados = [None] * args.threads
+        tempos = [0.0] * args.threads
+
+        def pedir(i, url, cache_):
+            barreira.wait()
+            t0 = time.perf_counter()
+            resultados[i] = cache_.obter(url)
+            tempos[i] = time.perf_counter() - t0
+
+        def em_paralelo(url, cache_):
+            threads = [threading.Thread(target=pedir, args=(i, url, cache_)) for i in range(args.threads)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        em_paralelo(servidor.url("/lento.png"), cache)
+        conferir(f"{args.threads} threads, URL de 300 ms: {ms(max(tempos))}",
+                 all(r is not None and r is resultados[0] for r in resultados) and pedidos["/lento.png"] == 1,
+                 f"{pedidos['/lento.png']} pedidos")
+
+        # dono preso além de 2 x timeout antes do primeiro byte (ex.: DNS lento):
+        # quem espera desiste com None no prazo, ninguém baixa em paralelo
+        def abrir_devagar(req, timeout):
+            time.sleep(timeout * 4)
+            return urllib.request.urlopen(req, timeout=timeout)
+
+        lento = novo_cache(disco="", timeout=0.1, abrir_url=abrir_devagar)
+        em_paralelo(servidor.url("/demorado.png"), lento)
+        dono, *esperas = sorted(tempos, reverse=True)
+        conferir(f"espera além de 2 x timeout: dono {ms(dono)}, os outros desistem em até {ms(max(esperas))}",
+                 all(r is None for r in resultados) and max(esperas) < dono and pedidos["/demorado.png"] == 1,
+                 f"{pedidos['/demorado.png']} pedidos")
+
+    servidor.shutdown()
+    print(f"\n{conferir.falhas} conferência(s) falharam")
+    if conferir.falhas:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Orçamento enorme: incremental numa thread x faixas de páginas em paralelo.
+
+Uso (dentro de Backend/):
+    python -m bench.bench_paralelo                       # 50.000 itens, todos os núcleos
+    python -m bench.bench_paralelo --itens 200000 --workers 8 --faixa 40
+
+Mede o tempo total até o último byte de pdf_incremental (uma thread) e de
+pdf_paralelo (faixas de --faixa páginas no executor em modo process) e
+confere que os dois PDFs são idênticos byte a byte. O ganho esperado é
+próximo do número de núcleos; numa máquina de um núcleo fica abaixo de 1x.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+
+async def consumir(gerador) -> bytes:
+    return b"".join([parte async for parte in gerador])
+
+
+def main_cli():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--itens", type=int, default=50_000)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--faixa", type=int, default=40, help="páginas por faixa")
+    args = ap.parse_args()
+
+    os.environ["PDF_EXECUTOR"] = "process"
+    os.environ["PDF_WORKERS"] = str(args.workers)
+    import pdf_stream
+    from executor import executor
+    from main import contar_paginas, draw_orcamento, faixas_orcamento
+    from relogio import RELOGIO, fixado
+    pares = [(f"Serviço {i}", 1_000 + i % 50_000) for i in range(args.itens)]
+    asyncio.run(executor.run(int))  # sobe o pool fora da medição
+
+    with fixado(RELOGIO):  # "Gerado em" e CreationDate fixos para comparar os bytes
+        t = time.perf_counter()
+        serial = asyncio.run(consumir(pdf_stream.pdf_incremental(draw_orcamento, "Cliente", pares)))
+        t_serial = time.perf_counter() - t
+        t = time.perf_counter()
+        paralelo = asyncio.run(consumir(pdf_stream.pdf_paralelo(faixas_orcamento("Cliente", pares, args.faixa))))
+        t_paralelo = time.perf_counter() - t
+    executor.shutdown()
+
+    assert serial == paralelo, "PDFs diferentes"
+    print(f"{args.itens} itens, {contar_paginas(args.itens)} páginas, {len(serial) / 1024:.0f} KiB, "
+          f"{args.workers} workers, faixas de {args.faixa} páginas")
+    print(f"incremental {t_serial:.2f}s | paralelo {t_paralelo:.2f}s | ganho {t_serial / t_paralelo:.1f}x")
+
+
+if __name__ == "__main__":
+    main_cli()
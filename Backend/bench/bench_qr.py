@@ -0,0 +1,71 @@
+"""Benchmark: QR pelo QrCodeWidget (caminho antigo) x qrcodes.draw_qr.
+
+Uso (dentro de Backend/):
+    python -m bench.bench_qr [--n 500]
+
+Mede desenhos/s e o tamanho do PDF resultante para um payload típico de
+nota fiscal, com cache frio (payload novo a cada desenho) e quente.
+"""
+import argparse
+import time
+from io import BytesIO
+
+from reportlab.graphics import renderPDF
+from reportlab.graphics.barcode import qr
+from reportlab.graphics.shapes import Drawing
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from qrcodes import draw_qr, qr_path
+
+SIZE = 80
+
+
+def widget(c, payload):
+    q = qr.QrCodeWidget(payload)
+    bounds = q.getBounds()
+    w, h = bounds[2] - bounds[0], bounds[3] - bounds[1]
+    d = Drawing(SIZE, SIZE, transform=[SIZE / w, 0, 0, SIZE / h, 0, 0])
+    d.add(q)
+    renderPDF.draw(d, c, 100, 100)
+
+
+def compacto(c, payload):
+    draw_qr(c, payload, 100, 100, SIZE)
+
+
+def medir(fn, payloads):
+    """Desenha cada payload numa página própria; devolve (desenhos/s, bytes/página)."""
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4, pageCompression=0)
+    t0 = time.perf_counter()
+    for p in payloads:
+        fn(c, p)
+        c.showPage()
+    dt = time.perf_counter() - t0
+    c.save()
+    return len(payloads) / dt, len(buffer.getvalue()) / len(payloads)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--n", type=int, default=500)
+    args = ap.parse_args()
+
+    base = "NF {:04d} - Cliente: João da Silva - Total: R$ 1.234,56"
+    frios = [base.format(i) for i in range(args.n)]
+    quentes = [base.format(0)] * args.n
+
+    print(f"{'caminho':<22}{'desenhos/s':>12}{'bytes/pág':>12}")
+    for nome, fn, payloads in (
+        ("widget", widget, quentes),
+        ("draw_qr (cache frio)", compacto, frios),
+        ("draw_qr (cache quente)", compacto, quentes),
+    ):
+        qr_path.cache_clear()
+        taxa, tamanho = medir(fn, payloads)
+        print(f"{nome:<22}{taxa:>12.0f}{tamanho:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
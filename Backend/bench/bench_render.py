@@ -0,0 +1,179 @@
+"""Microbenchmarks de todos os renderizadores draw_* (main.py e main_nf.py).
+
+Uso (dentro de Backend/):
+    python -m bench.bench_render                         # tabela completa
+    python -m bench.bench_render -k orcamento            # só casos que contêm "orcamento"
+    python -m bench.bench_render --save bench/base.json  # grava baseline
+    python -m bench.bench_render --compare bench/base.json [--tolerancia 0.15]
+
+Cada caso mede renders/s, latência p50/p99, pico de memória alocada
+(tracemalloc, numa execução separada para não distorcer o tempo) e o
+tamanho do PDF nos dois perfis de saída (padrão e compacto, perfis.py).
+Com --compare o script sai com código 1 se algum caso
+ficar mais lento (p50) ou maior (bytes) que a tolerância.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import main
+import main_nf
+from page_templates import _gravar
+from perfis import Perfil
+from qrcodes import qr_path
+
+TAMANHOS = (1, 100, 10_000)
+CURTO = "Serviço de manutenção preventiva."
+LONGO = " ".join(["Cláusula de prestação de serviços técnicos com garantia de noventa dias."] * 400)
+LONGO_LINHAS = "\n".join(f"Linha {i} da mensagem ao cliente." for i in range(600))
+
+
+def _pares(n):
+    return [(f"Item {i} - troca de peça", 1000 + i % 97 * 137) for i in range(n)]  # centavos
+
+
+def _direto(fn, *args, **kwargs):
+    """Para saídas que não passam por canvas (ex.: ESC/POS)."""
+    return fn(*args, **kwargs)
+
+
+def casos():
+    """(nome, pdf_fn, draw_fn, args, kwargs) para cada combinação medida."""
+    for mod in (main, main_nf):
+        m = mod.__name__
+        for n in TAMANHOS:
+            yield f"{m}.orcamento[{n}]", mod.pdf_bytes, mod.draw_orcamento, ("Cliente Teste", _pares(n)), {}
+            yield f"{m}.nota[{n}]", mod.pdf_bytes, mod.draw_nota, ("0001", "Cliente Teste", _pares(n), "2025-10-06 09:00"), {}
+        for rotulo, texto in (("curto", CURTO), ("longo", LONGO)):
+            yield f"{m}.contrato[{rotulo}]", mod.pdf_bytes, mod.draw_contrato, ("Cliente Teste", texto), {}
+        for rotulo, texto in (("curto", CURTO), ("longo", LONGO_LINHAS)):
+            yield f"{m}.carta[{rotulo}]", mod.pdf_bytes, mod.draw_carta, ("Destinatário", texto), {}
+        yield f"{m}.recibo", mod.pdf_bytes, mod.draw_recibo, ("Cliente Teste", 15000), {}
+
+    for n in TAMANHOS:
+        yield f"main_nf.nota_escpos[{n}]", _direto, main_nf.escpos_nota, ("0001", "Cliente Teste", _pares(n)), {}
+
+    for qr in (True, False):
+        yield (f"main.certificado[qr={'on' if qr else 'off'}]", main.pdf_bytes, main.draw_certificado,
+               ("Alison Antunes", "Inteligência Artificial", 20, "11/09/2025 a 09/10/2025", "Jundiaí-SP",
+                "Natália", "CIJUN JUNDIAÍ", main.ModeloCert.classico, "#2E7D32", qr), {})
+    for url in ("https://helptech-antunes.vercel.app/validar", None):
+        yield (f"main_nf.certificado[url={'on' if url else 'off'}]", main_nf.pdf_bytes, main_nf.draw_certificado,
+               ("Alison Antunes", "Inteligência Artificial", 20, "2025-10-09", "Natália", "ABC123DEF0"),
+               {"url_validacao": url})
+
+
+def medir(pdf_fn, draw_fn, args, kwargs, tempo_min: float, min_iter: int, frio: bool) -> dict:
+    def uma():
+        if frio:
+            qr_path.cache_clear()
+            _gravar.cache_clear()
+        return pdf_fn(draw_fn, *args, **kwargs)
+
+    pdf = uma()  # aquecimento (imports, caches de fonte)
+    tempos = []
+    inicio = time.perf_counter()
+    while len(tempos) < min_iter or time.perf_counter() - inicio < tempo_min:
+        t0 = time.perf_counter()
+        uma()
+        tempos.append(time.perf_counter() - t0)
+        if len(tempos) >= 10_000:
+            break
+
+    tracemalloc.start()
+    uma()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    compacto = None
+    if pdf_fn is not _direto:
+        compacto = len(pdf_fn(draw_fn, *args, perfil=Perfil.compacto, **kwargs))
+
+    tempos.sort()
+    return {
+        "iteracoes": len(tempos),
+        "renders_s": round(len(tempos) / sum(tempos), 2),
+        "p50_ms": round(statistics.median(tempos) * 1000, 3),
+        "p99_ms": round(tempos[min(len(tempos) - 1, int(len(tempos) * 0.99))] * 1000, 3),
+        "pico_kib": round(pico / 1024, 1),
+        "bytes": len(pdf),
+        "bytes_compacto": compacto,
+    }
+
+
+def imprimir(resultados: dict, base: dict = None):
+    cab = f"{'caso':<34}{'renders/s':>11}{'p50 ms':>10}{'p99 ms':>10}{'pico KiB':>11}{'bytes':>10}{'compacto':>10}{'Δ':>8}"
+    print(cab + ("   Δp50    Δbytes" if base else ""))
+    for nome, r in resultados.items():
+        linha = f"{nome:<34}{r['renders_s']:>11.1f}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['pico_kib']:>11.1f}{r['bytes']:>10}"
+        compacto = r.get("bytes_compacto")
+        linha += f"{compacto:>10}{(compacto / r['bytes'] - 1) * 100:>+7.1f}%" if compacto else f"{'-':>10}{'':>8}"
+        b = (base or {}).get(nome)
+        if b:
+            linha += f"{(r['p50_ms'] / b['p50_ms'] - 1) * 100:>+7.1f}%{(r['bytes'] / b['bytes'] - 1) * 100:>+9.1f}%"
+        print(linha)
+
+
+def regressoes(resultados: dict, base: dict, tolerancia: float) -> list:
+    ruins = []
+    for nome, r in resultados.items():
+        b = base.get(nome)
+        if not b:
+            continue
+        if r["p50_ms"] > b["p50_ms"] * (1 + tolerancia):
+            ruins.append(f"{nome}: p50 {b['p50_ms']} -> {r['p50_ms']} ms")
+        if r["bytes"] > b["bytes"] * (1 + tolerancia):
+            ruins.append(f"{nome}: {b['bytes']} -> {r['bytes']} bytes")
+        if b.get("bytes_compacto") and r["bytes_compacto"] > b["bytes_compacto"] * (1 + tolerancia):
+            ruins.append(f"{nome}: compacto {b['bytes_compacto']} -> {r['bytes_compacto']} bytes")
+    return ruins
+
+
+def main_cli():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-k", dest="filtro", default="", help="roda só casos cujo nome contém o texto")
+    ap.add_argument("--tempo", type=float, default=1.0, help="segundos mínimos por caso (padrão 1.0)")
+    ap.add_argument("--min-iter", type=int, default=5)
+    ap.add_argument("--frio", action="store_true", help="limpa caches de QR/templates a cada render")
+    ap.add_argument("--save", metavar="JSON", help="grava os resultados como baseline")
+    ap.add_argument("--compare", metavar="JSON", help="compara com uma baseline gravada")
+    ap.add_argument("--tolerancia", type=float, default=0.15)
+    args = ap.parse_args()
+
+    resultados = {}
+    for nome, pdf_fn, draw_fn, a, kw in casos():
+        if args.filtro in nome:
+            resultados[nome] = medir(pdf_fn, draw_fn, a, kw, args.tempo, args.min_iter, args.frio)
+
+    base = None
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)["resultados"]
+    imprimir(resultados, base)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "gerado_em": datetime.now().isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                "maquina": platform.platform(),
+                "frio": args.frio,
+                "resultados": resultados,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\nbaseline gravada em {args.save}")
+
+    if base:
+        ruins = regressoes(resultados, base, args.tolerancia)
+        if ruins:
+            print(f"\nREGRESSÕES (tolerância {args.tolerancia:.0%}):")
+            print("\n".join(f"  {r}" for r in ruins))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,94 @@
+"""Relatório de cold start e orçamento de tempo de import (main.py e main_nf.py).
+
+Uso (dentro de Backend/):
+    python -m bench.bench_startup                    # relatório, 5 processos novos por app
+    python -m bench.bench_startup --limite-ms 450    # sai com código 1 se estourar
+
+Cada rodada sobe um interpretador limpo e mede, em sequência:
+    import    tempo de `import main` (o que a Vercel paga antes do 1º byte)
+    /health   primeira requisição sem PDF, logo após o import
+    1º PDF    primeira renderização (inclui os imports adiados do reportlab)
+
+O orçamento falha se o import passar de --limite-ms (mediana) ou se algum
+módulo pesado de renderização já estiver carregado depois do import.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PESADOS = ("reportlab.pdfgen.canvas", "reportlab.lib.colors", "reportlab.graphics")
+
+# roda num processo novo; chama o app ASGI direto, sem servidor nem httpx
+SONDA = r'''
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+mod = __import__(sys.argv[1])
+t_import = time.perf_counter() - t0
+pesados = sorted(m for m in sys.modules if m.startswith(tuple(sys.argv[2].split(","))))
+
+async def chamar(path):
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+             "query_string": b"", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0),
+             "server": ("bench", 80)}
+    status, fim, lido = [], asyncio.Event(), []
+    async def receive():
+        if not lido:
+            lido.append(1)
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await fim.wait()
+        return {"type": "http.disconnect"}
+    async def send(msg):
+        if msg["type"] == "http.response.start":
+            status.append(msg["status"])
+        elif not msg.get("more_body"):
+            fim.set()
+    t = time.perf_counter()
+    await mod.app(scope, receive, send)
+    assert status and status[0] == 200, (path, status)
+    return time.perf_counter() - t
+
+t_health = asyncio.run(chamar("/health"))
+t_pdf = asyncio.run(chamar("/recibo"))
+print(json.dumps({"import": t_import, "health": t_health, "pdf": t_pdf, "pesados": pesados}))
+'''
+
+
+def rodada(app: str) -> dict:
+    saida = subprocess.run(
+        [sys.executable, "-c", SONDA, app, ",".join(PESADOS)],
+        capture_output=True, text=True, check=True, timeout=120,
+        env={**os.environ, "PDF_EXECUTOR": "inline"},
+    )
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main_cli():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rodadas", type=int, default=5)
+    ap.add_argument("--limite-ms", type=float, default=None, help="orçamento para a mediana do import")
+    args = ap.parse_args()
+
+    falhas = []
+    print(f"{'app':<10}{'import ms':>11}{'/health ms':>12}{'1º PDF ms':>11}   pesados após import")
+    for app in ("main", "main_nf"):
+        rodadas = [rodada(app) for _ in range(args.rodadas)]
+        med = {k: statistics.median(r[k] for r in rodadas) * 1000 for k in ("import", "health", "pdf")}
+        pesados = sorted({p for r in rodadas for m in r["pesados"] for p in PESADOS if m.startswith(p)})
+        print(f"{app:<10}{med['import']:>11.1f}{med['health']:>12.1f}{med['pdf']:>11.1f}   {', '.join(pesados) or '-'}")
+        if pesados:
+            falhas.append(f"{app}: módulos pesados importados cedo: {', '.join(pesados)}")
+        if args.limite_ms is not None and med["import"] > args.limite_ms:
+            falhas.append(f"{app}: import {med['import']:.1f} ms > limite {args.limite_ms:.0f} ms")
+
+    if falhas:
+        print("\nORÇAMENTO ESTOURADO:")
+        print("\n".join(f"  {f}" for f in falhas))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
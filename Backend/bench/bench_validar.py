@@ -0,0 +1,72 @@
+"""Latência do GET /validar com o registro cheio.
+
+Uso (dentro de Backend/):
+    python -m bench.bench_validar                   # 1.000.000 de códigos
+    python -m bench.bench_validar --codigos 200000
+
+Popula um registro temporário em lotes (emitir_lote), mede a carga do
+índice num processo "recém-iniciado" e a latência de consultar() para
+códigos válidos, inexistentes e malformados.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from uuid import uuid4
+
+from certificados import RegistroCertificados
+
+
+def percentis(amostras):
+    amostras = sorted(amostras)
+    return {p: amostras[min(len(amostras) - 1, int(len(amostras) * p / 100))] * 1e6 for p in (50, 99)}
+
+
+def main_cli():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--codigos", type=int, default=1_000_000)
+    ap.add_argument("--lote", type=int, default=10_000)
+    ap.add_argument("--consultas", type=int, default=20_000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "certificados.sqlite3")
+        reg = RegistroCertificados(db)
+        t = time.perf_counter()
+        codigos = []
+        for inicio in range(0, args.codigos, args.lote):
+            nomes = [f"Participante {i}" for i in range(inicio, min(inicio + args.lote, args.codigos))]
+            codigos += reg.emitir_lote(nomes, "Curso Exemplo", 8, "2025-10-08", "Fulano de Tal")
+        t_emissao = time.perf_counter() - t
+        reg.fechar()
+        assert len(set(codigos)) == args.codigos
+
+        # processo novo: índice vazio, carregado do SQLite
+        reg = RegistroCertificados(db)
+        t = time.perf_counter()
+        reg.carregar()
+        t_carga = time.perf_counter() - t
+
+        casos = {
+            "válido": [codigos[i * 7919 % len(codigos)] for i in range(args.consultas)],
+            "inexistente": [uuid4().hex[:10].upper() for _ in range(args.consultas)],
+            "malformado": ["nao-e-codigo"] * args.consultas,
+        }
+        print(f"{args.codigos} códigos: emissão {t_emissao:.1f} s "
+              f"({args.codigos / t_emissao:,.0f}/s), carga do índice {t_carga * 1000:.0f} ms")
+        print(f"{'consulta':<14}{'p50 µs':>9}{'p99 µs':>9}{'média µs':>10}")
+        for nome, lista in casos.items():
+            tempos = []
+            for codigo in lista:
+                t = time.perf_counter()
+                cert = reg.consultar(codigo)
+                tempos.append(time.perf_counter() - t)
+                assert (cert is not None) == (nome == "válido")
+            p = percentis(tempos)
+            print(f"{nome:<14}{p[50]:>9.1f}{p[99]:>9.1f}{statistics.fmean(tempos) * 1e6:>10.1f}")
+        reg.fechar()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,234 @@
+"""Hashes de ouro: cada rota de documento de main.py e main_nf.py, byte a byte.
+
+Uso (dentro de Backend/):
+    python -m bench.golden                                # tabela sha256/bytes por caso
+    python -m bench.golden --save bench/golden.json       # grava a referência
+    python -m bench.golden --compare bench/golden.json    # sai com código 1 se algum hash mudar
+    python -m bench.golden -k nota --executor inline
+
+Roda os dois apps com PDF_DETERMINISTICO=1 (relogio.py: relógio fixo,
+metadados invariantes, códigos de certificado derivados do conteúdo) e
+registros novos num diretório temporário — numeração de notas, certificados,
+spool e jobs começam do zero a cada execução, então a mesma versão do
+código gera os mesmos bytes. Cobre PDF, HTML, ESC/POS, prévias PNG, lote
+(PDF no spool e ZIP), planilha, pacote, jobs e o orçamento incremental.
+
+Casos sem efeito colateral são pedidos duas vezes, com o cache desligado,
+e as duas respostas precisam ser idênticas ("instável" falha mesmo sem
+--compare). Rotas que não são documento (/health, /metrics, /validar,
+status de job) ficam de fora: mostram o relógio real ou contadores.
+
+Um hash que muda num PR é mudança visível no documento (ou nos
+metadados): confira o PDF e regrave a referência com --save.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+ITENS = [{"descricao": f"Item {i} - troca de peça", "valor": f"{10 + i % 97 * 1.37:.2f}"} for i in range(5)]
+ITENS_LONGO = [{"descricao": f"Serviço {i}", "valor": f"{1 + i % 500 * 3.1:.2f}"} for i in range(500)]  # incremental
+QUERY_ITENS = {"cliente": "Cliente Teste", "servicos": [i["descricao"] for i in ITENS], "valores": [i["valor"] for i in ITENS]}
+CONTRATO = {"cliente": "Cliente Teste", "descricao": " ".join(["Cláusula de prestação de serviços técnicos."] * 60)}
+RECIBO = {"cliente": "Cliente Teste", "valor": "1234.56"}
+CARTA = {"destinatario": "Destinatário", "mensagem": "\n".join(f"Linha {i} da mensagem ao cliente." for i in range(40))}
+CERT_MAIN = {
+    "nome": "Alison Antunes", "curso": "Inteligência Artificial", "carga_horaria": 20,
+    "periodo_inicio": "2025-09-11", "periodo_fim": "2025-10-09", "local": "Jundiaí-SP",
+    "instrutor": "Natália", "assinatura": "CIJUN JUNDIAÍ",
+}
+CERT_NF = {"nome": "Alison Antunes", "curso": "Inteligência Artificial", "carga_horaria": 20,
+           "data_conclusao": "2025-10-08", "instrutor": "Natália"}
+PARTICIPANTES = ["Alison Antunes", "Natália Souza", "Bruno Lima"]
+CSV = ("cliente;descricao;valor\n"
+       "Ana;Troca de tela;\"1.234,56\"\n"
+       "Ana;Bateria;R$ 99,90\n"
+       "Bruno;Capa;30\n"
+       "Bruno;;x\n")
+JSONL = "\n".join(json.dumps(linha, ensure_ascii=False) for linha in (
+    {"cliente": "Ana", "descricao": "Troca de tela", "valor": 1234.56},
+    {"cliente": "Bruno", "itens": ITENS},
+    {"cliente": "Carla"},
+)) + "\n"
+
+
+def _pacote(cert):
+    return {"documentos": [
+        {"tipo": "orcamento", "cliente": "João da Silva", "itens": ITENS},
+        {"tipo": "nota-fiscal", "cliente": "João da Silva", "itens": ITENS, "data": "2025-10-06 09:00"},
+        {"tipo": "contrato", **CONTRATO},
+        {"tipo": "recibo", **RECIBO},
+        {"tipo": "certificado", **cert},
+    ]}
+
+
+def casos(app: str):
+    """(nome, método, url, kwargs do httpx, repetível) de um app."""
+    nf = app == "main_nf"
+    cert = CERT_NF if nf else CERT_MAIN
+    cert_lote = {**{k: v for k, v in cert.items() if k != "nome"}, "participantes": PARTICIPANTES}
+    nota = {"cliente": "Cliente Teste", "itens": ITENS, "data": "2025-10-06 09:00"}
+    corpos = {"orcamento": {"cliente": "Cliente Teste", "itens": ITENS}, "nota-fiscal": nota,
+              "contrato": CONTRATO, "recibo": RECIBO, "carta": CARTA, "certificado": cert}
+
+    # GET com query
+    yield "GET /gerar-pdf", "GET", "/gerar-pdf", {"params": QUERY_ITENS}, True
+    yield "GET /gerar-pdf html", "GET", "/gerar-pdf", {"params": {**QUERY_ITENS, "formato": "html"}}, True
+    yield "GET /nota-fiscal", "GET", "/nota-fiscal", {"params": QUERY_ITENS}, False
+    yield "GET /nota-fiscal html", "GET", "/nota-fiscal", {"params": {**QUERY_ITENS, "formato": "html"}}, True
+    if nf:
+        yield "GET /nota-fiscal escpos", "GET", "/nota-fiscal", {"params": {**QUERY_ITENS, "formato": "escpos"}}, False
+    yield "GET /contrato", "GET", "/contrato", {"params": CONTRATO}, True
+    yield "GET /recibo", "GET", "/recibo", {"params": RECIBO}, True
+    yield "GET /carta", "GET", "/carta", {"params": {"destinatario": "Destinatário", "mensagem": "Olá"}}, True
+    yield "GET /certificado", "GET", "/certificado", {"params": {"nome": "Alison Antunes"}}, not nf
+    yield "GET /certificado html", "GET", "/certificado", {"params": {"nome": "Alison Antunes", "formato": "html"}}, True
+
+    # POST JSON, nos dois perfis
+    for tipo, corpo in corpos.items():
+        rota = "/orcamento" if tipo == "orcamento" else f"/{tipo}"
+        repetivel = tipo not in ("nota-fiscal", "certificado") or (tipo == "certificado" and not nf)
+        yield f"POST {rota}", "POST", rota, {"json": corpo}, repetivel
+        yield f"POST {rota} compacto", "POST", rota, {"json": corpo, "params": {"perfil": "compacto"}}, repetivel
+        yield f"POST {rota} html", "POST", rota, {"json": corpo, "params": {"formato": "html"}}, True
+    if nf:
+        yield "POST /nota-fiscal escpos", "POST", "/nota-fiscal", {"json": nota, "params": {"formato": "escpos"}}, False
+    yield "POST /orcamento incremental", "POST", "/orcamento", {"json": {"cliente": "Cliente Teste", "itens": ITENS_LONGO}}, True
+
+    # lote, planilha, pacote
+    yield "POST /certificado/lote pdf", "POST", "/certificado/lote", {"json": cert_lote}, not nf
+    yield "POST /certificado/lote zip", "POST", "/certificado/lote", {"json": cert_lote, "params": {"formato": "zip"}}, not nf
+    yield "POST /orcamentos/planilha csv", "POST", "/orcamentos/planilha", {
+        "content": CSV.encode(), "headers": {"Content-Type": "text/csv"}}, True
+    yield "POST /orcamentos/planilha jsonl", "POST", "/orcamentos/planilha", {
+        "content": JSONL.encode(), "headers": {"Content-Type": "application/x-ndjson"}}, True
+    yield "POST /pacote", "POST", "/pacote", {"json": _pacote(cert)}, False
+
+    # jobs (POST /jobs/{tipo} → GET /jobs/{id}/result)
+    for tipo, corpo in {**corpos, "certificado-lote": cert_lote}.items():
+        yield f"JOB {tipo}", "JOB", f"/jobs/{tipo}", {"json": corpo}, tipo not in ("nota-fiscal",) and not (nf and "certificado" in tipo)
+
+    # prévias PNG
+    for tipo, corpo in corpos.items():
+        yield f"POST /{tipo}/preview", "POST", f"/{tipo}/preview", {"json": corpo}, True
+    yield "GET /orcamento/preview", "GET", "/orcamento/preview", {"params": {**QUERY_ITENS, "dpi": 72}}, True
+
+
+def pedir(cliente, metodo: str, url: str, kwargs: dict) -> bytes:
+    """Corpo da resposta (200/202 obrigatório); JOB espera o job terminar e baixa o resultado."""
+    if metodo != "JOB":
+        r = cliente.request(metodo, url, **kwargs)
+        if r.status_code != 200:
+            raise RuntimeError(f"{metodo} {url}: {r.status_code} {r.text[:200]}")
+        local = r.headers.get("content-location")
+        if local:  # lote no spool: a retomada (GET /arquivos/{id}) precisa servir os mesmos bytes
+            retomada = cliente.get(local)
+            if retomada.content != r.content:
+                raise RuntimeError(f"{local} diferente da resposta original")
+        return r.content
+    r = cliente.post(url, **kwargs)
+    if r.status_code != 202:
+        raise RuntimeError(f"POST {url}: {r.status_code} {r.text[:200]}")
+    job_id = r.json()["id"]
+    limite = time.monotonic() + 60
+    while True:
+        status = cliente.get(f"/jobs/{job_id}").json()["status"]
+        if status == "concluido":
+            break
+        if status == "erro" or time.monotonic() > limite:
+            raise RuntimeError(f"job {url}: {status}")
+        time.sleep(0.02)
+    return cliente.get(f"/jobs/{job_id}/result").content
+
+
+def executar(filtro: str = None) -> dict:
+    from fastapi.testclient import TestClient
+
+    import main
+    import main_nf
+
+    resultado = {}
+    for mod in (main, main_nf):
+        with TestClient(mod.app) as cliente:
+            for nome, metodo, url, kwargs, repetivel in casos(mod.__name__):
+                nome = f"{mod.__name__} {nome}"
+                if filtro and filtro not in nome:
+                    continue
+                dados = pedir(cliente, metodo, url, kwargs)
+                registro = {"sha256": hashlib.sha256(dados).hexdigest(), "bytes": len(dados)}
+                if repetivel and pedir(cliente, metodo, url, kwargs) != dados:
+                    registro["instavel"] = True
+                resultado[nome] = registro
+    return resultado
+
+
+def main_cli():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("-k", dest="filtro", help="só casos cujo nome contém o texto")
+    ap.add_argument("--executor", default="process", help="PDF_EXECUTOR dos apps (process|thread|inline)")
+    ap.add_argument("--save", metavar="ARQUIVO")
+    ap.add_argument("--compare", metavar="ARQUIVO")
+    args = ap.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ.update({
+        "PDF_DETERMINISTICO": "1",
+        "PDF_RELOGIO": "2025-01-01T12:00:00",
+        "PDF_EXECUTOR": args.executor,
+        "PDF_CACHE_MAX_BYTES": "0",      # a 2ª chamada renderiza de novo
+        "PREVIEW_CACHE_MAX_BYTES": "0",
+        "ADMISSAO_TAXA": "0",
+        "NOTAS_DB": os.path.join(tmp.name, "notas.sqlite3"),
+        "NOTAS_INICIO": "1",
+        "CERTIFICADOS_DB": os.path.join(tmp.name, "certificados.sqlite3"),
+        "SPOOL_DIR": os.path.join(tmp.name, "spool"),
+        "JOBS_SPOOL": os.path.join(tmp.name, "jobs"),
+    })
+    os.environ.pop("JOBS_DB", None)
+    with tmp:
+        resultado = executar(args.filtro)
+
+    referencia = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            referencia = json.load(f)["casos"]
+
+    falhas = 0
+    print(f"{'caso':58} {'bytes':>9}  sha256")
+    for nome, r in resultado.items():
+        marca = ""
+        if r.get("instavel"):
+            marca, falhas = "  INSTÁVEL", falhas + 1
+        elif args.compare:
+            antes = referencia.get(nome)
+            if antes is None:
+                marca = "  novo"
+            elif antes["sha256"] != r["sha256"]:
+                marca, falhas = f"  MUDOU (era {antes['bytes']} bytes)", falhas + 1
+        print(f"{nome:58} {r['bytes']:>9}  {r['sha256'][:16]}{marca}")
+    if args.compare and not args.filtro:
+        for nome in referencia.keys() - resultado.keys():
+            print(f"{nome:58} {'':>9}  SUMIU")
+            falhas += 1
+
+    if args.save:
+        import reportlab
+
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "ambiente": {"python": platform.python_version(), "reportlab": reportlab.Version},
+                "casos": resultado,
+            }, f, ensure_ascii=False, indent=1, sort_keys=True)
+            f.write("\n")
+        print(f"referência gravada em {args.save}")
+    if falhas:
+        print(f"{falhas} caso(s) com saída diferente")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
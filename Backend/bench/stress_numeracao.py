@@ -0,0 +1,85 @@
+"""Teste de carga da numeração das notas: vários processos x threads.
+
+Uso (dentro de Backend/):
+    python -m bench.stress_numeracao                          # 4 processos x 8 threads x 500 notas
+    python -m bench.stress_numeracao --processos 8 --bloco 1
+
+Simula workers do uvicorn disputando a mesma sequência (SQLite temporário).
+Roda em duas ondas — a segunda reaproveita os blocos devolvidos no shutdown
+da primeira — e confere que os números emitidos são exatamente 1..N: sem
+repetidos e sem buracos. Sai com código 1 se não forem.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from numeracao import SequenciaNotas
+
+
+def worker(db: str, bloco: int, threads: int, por_thread: int, saida):
+    seq = SequenciaNotas(db, bloco=bloco)
+    emitidos = []
+
+    def pedir():
+        meus = [seq.proximo() for _ in range(por_thread)]
+        emitidos.extend(meus)  # list.extend é atômico sob o GIL
+
+    ts = [threading.Thread(target=pedir) for _ in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    alugueis = seq.alugueis
+    seq.fechar()  # devolve o resto do bloco, como no shutdown do app
+    saida.put((emitidos, alugueis))
+
+
+def onda(db: str, args) -> tuple:
+    saida = mp.Queue()
+    procs = [mp.Process(target=worker, args=(db, args.bloco, args.threads, args.por_thread, saida))
+             for _ in range(args.processos)]
+    for p in procs:
+        p.start()
+    resultados = [saida.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return [n for r, _ in resultados for n in r], sum(a for _, a in resultados)
+
+
+def main_cli():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--processos", type=int, default=4)
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--por-thread", type=int, default=500)
+    ap.add_argument("--bloco", type=int, default=100)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "notas.sqlite3")
+        todos, falhas = [], []
+        for i in (1, 2):
+            t = time.perf_counter()
+            numeros, alugueis = onda(db, args)
+            dt = time.perf_counter() - t
+            todos += numeros
+            print(f"onda {i}: {len(numeros)} notas em {dt:.2f} s ({len(numeros) / dt:,.0f}/s), {alugueis} aluguéis de bloco")
+
+        repetidos = [n for n, q in Counter(todos).items() if q > 1]
+        buracos = sorted(set(range(1, len(todos) + 1)) - set(todos))
+        if repetidos:
+            falhas.append(f"{len(repetidos)} números repetidos, ex.: {repetidos[:5]}")
+        if buracos:
+            falhas.append(f"{len(buracos)} buracos, ex.: {buracos[:5]}")
+        print(f"total {len(todos)}: {'1..%d sem repetidos nem buracos' % len(todos) if not falhas else 'FALHOU'}")
+        if falhas:
+            print("\n".join(f"  {f}" for f in falhas))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,179 @@
+"""Registro de certificados emitidos, para a validação pelo QR (GET /validar).
+
+- armazenamento append-only em SQLite (CERTIFICADOS_DB); triggers recusam
+  UPDATE/DELETE, então um código emitido nunca muda nem some;
+- índice em memória: conjunto com os códigos como inteiros (40 bits do
+  hex), carregado em segundo plano no startup. Código inexistente é
+  respondido sem tocar no banco; existente busca a linha pela chave;
+- com vários processos (uvicorn --workers) cada um tem seu índice: num
+  miss o índice é sincronizado com as linhas novas (rowid > último visto)
+  antes de responder "inválido";
+- emissão em lote gera todos os códigos (únicos contra o índice) e grava
+  numa única transação;
+- com PDF_DETERMINISTICO=1 (relogio.py) o código é um hash do instante
+  fixo + nome + curso em vez de aleatório: num registro novo, o mesmo
+  corpo gera o mesmo código e, portanto, o mesmo PDF.
+
+    CERTIFICADOS_DB   caminho do SQLite (padrão tmp/helptech-certificados.sqlite3)
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Iterable, List, NamedTuple, Optional
+from uuid import uuid4
+
+import relogio
+
+_CODIGO = re.compile(r"[0-9A-F]{10}")
+_CAMPOS = ("codigo", "nome", "curso", "carga_horaria", "data_conclusao", "instrutor", "emitido")
+
+
+def _semente(nome: str, curso: str) -> Optional[str]:
+    if not relogio.DETERMINISTICO:
+        return None
+    return f"{relogio.agora().isoformat()}|{nome}|{curso}"
+
+
+class Certificado(NamedTuple):
+    codigo: str
+    nome: str
+    curso: str
+    carga_horaria: int
+    data_conclusao: Optional[str]
+    instrutor: Optional[str]
+    emitido: float
+
+
+def normalizar(codigo: str) -> Optional[str]:
+    """Código no formato emitido (10 hex maiúsculos) ou None."""
+    codigo = (codigo or "").strip().upper()
+    return codigo if _CODIGO.fullmatch(codigo) else None
+
+
+class RegistroCertificados:
+    def __init__(self, db: str = None):
+        self.caminho = db or os.getenv("CERTIFICADOS_DB") or os.path.join(
+            tempfile.gettempdir(), "helptech-certificados.sqlite3")
+        self._db: Optional[sqlite3.Connection] = None
+        self._codigos = set()
+        self._ultimo = 0  # maior rowid já indexado
+        self._lock = threading.RLock()
+        self._carregado = threading.Event()
+        self._carregando = False
+
+    # ----- banco -----
+    def _conexao(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.caminho, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS certificados (codigo TEXT PRIMARY KEY, nome TEXT NOT NULL,"
+                " curso TEXT NOT NULL, carga_horaria INTEGER, data_conclusao TEXT, instrutor TEXT,"
+                " emitido REAL NOT NULL)"
+            )
+            for op in ("UPDATE", "DELETE"):
+                db.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS certificados_sem_{op.lower()} BEFORE {op} ON certificados"
+                    " BEGIN SELECT RAISE(ABORT, 'registro de certificados é append-only'); END"
+                )
+            self._db = db
+        return self._db
+
+    # ----- índice -----
+    def carregar(self):
+        """Lê todos os códigos para o índice (idempotente; chamadas seguintes só sincronizam)."""
+        with self._lock:
+            self._sincronizar()
+            self._carregado.set()
+
+    def carregar_em_segundo_plano(self):
+        """Para o startup: não atrasa o primeiro byte do cold start."""
+        with self._lock:
+            if self._carregado.is_set() or self._carregando:
+                return
+            self._carregando = True
+        threading.Thread(target=self.carregar, name="indice-certificados", daemon=True).start()
+
+    def _garantir_indice(self):
+        if not self._carregado.is_set():
+            self.carregar()
+
+    def _sincronizar(self):
+        cur = self._conexao().execute(
+            "SELECT rowid, codigo FROM certificados WHERE rowid > ? ORDER BY rowid", (self._ultimo,))
+        while True:
+            linhas = cur.fetchmany(50_000)
+            if not linhas:
+                break
+            self._codigos.update(int(codigo, 16) for _, codigo in linhas)
+            self._ultimo = linhas[-1][0]
+
+    def __len__(self) -> int:
+        self._garantir_indice()
+        return len(self._codigos)
+
+    # ----- emissão -----
+    def _novo_codigo(self, reservados: set, semente: Optional[str] = None) -> str:
+        tentativa = 0
+        while True:
+            if semente is None:
+                codigo = uuid4().hex[:10].upper()
+            else:  # modo determinístico: mesma semente → mesma sequência de candidatos
+                codigo = hashlib.sha256(f"{semente}|{tentativa}".encode()).hexdigest()[:10].upper()
+                tentativa += 1
+            valor = int(codigo, 16)
+            if valor not in self._codigos and valor not in reservados:
+                reservados.add(valor)
+                return codigo
+
+    def emitir(self, nome: str, curso: str, carga_horaria: int,
+               data_conclusao: Optional[str] = None, instrutor: Optional[str] = None) -> str:
+        return self.emitir_lote([nome], curso, carga_horaria, data_conclusao, instrutor)[0]
+
+    def emitir_lote(self, nomes: Iterable[str], curso: str, carga_horaria: int,
+                    data_conclusao: Optional[str] = None, instrutor: Optional[str] = None) -> List[str]:
+        """Gera códigos únicos e grava todos numa transação; devolve os códigos na ordem dos nomes."""
+        agora = time.time()
+        with self._lock:
+            self._garantir_indice()
+            reservados = set()
+            linhas = [(self._novo_codigo(reservados, _semente(nome, curso)), nome, curso, carga_horaria,
+                       data_conclusao, instrutor, agora)
+                      for nome in nomes]
+            db = self._conexao()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany(f"INSERT INTO certificados ({', '.join(_CAMPOS)}) VALUES (?, ?, ?, ?, ?, ?, ?)", linhas)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            self._sincronizar()  # inclui as linhas novas (e as de outros processos) no índice
+        return [linha[0] for linha in linhas]
+
+    # ----- consulta -----
+    def consultar(self, codigo: str) -> Optional[Certificado]:
+        codigo = normalizar(codigo)
+        if codigo is None:
+            return None
+        valor = int(codigo, 16)
+        with self._lock:
+            self._garantir_indice()
+            if valor not in self._codigos:
+                self._sincronizar()  # emitido por outro processo depois do nosso último sync?
+                if valor not in self._codigos:
+                    return None
+            linha = self._conexao().execute(
+                f"SELECT {', '.join(_CAMPOS)} FROM certificados WHERE codigo = ?", (codigo,)).fetchone()
+        return Certificado(*linha) if linha else None
+
+    def fechar(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
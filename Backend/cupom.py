@@ -0,0 +1,224 @@
+"""Layout de cupom térmico compartilhado entre PDF e ESC/POS.
+
+O cupom é descrito uma vez como uma lista de elementos (Texto, Colunas,
+Linha, Barras, QR, Estatico) e materializado por dois backends:
+
+    desenhar_pdf(c, elementos, y)   canvas do ReportLab (80 mm de largura)
+    escpos(elementos)               bytes ESC/POS para a impressora térmica
+
+No PDF cada elemento é desenhado na altura atual e depois desce `avanco`
+pontos. No ESC/POS o layout é por linhas: tamanhos viram fonte A/B ou
+altura dupla, alinhamentos viram ESC a, e código de barras/QR usam os
+comandos nativos da impressora (GS k e GS ( k), sem rasterizar nada.
+"""
+from functools import lru_cache
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+from reportlab.lib.units import mm
+
+from lazy import modulo
+from metrics import cronometro
+from page_templates import stamp
+from qrcodes import draw_qr
+
+code128 = modulo("reportlab.graphics.barcode.code128")
+
+LARGURA = 80 * mm
+MARGEM = 6 * mm
+
+
+class Texto(NamedTuple):
+    texto: str
+    alinhar: str = "esq"  # esq | centro | dir
+    fonte: str = "Helvetica"
+    tamanho: float = 8
+    avanco: float = 9
+
+
+class Colunas(NamedTuple):
+    """Texto à esquerda e valor à direita na mesma linha."""
+    esq: str
+    dir: str
+    fonte: str = "Helvetica"
+    tamanho: float = 8
+    avanco: float = 9
+    fonte_dir: Optional[str] = None
+    tamanho_dir: Optional[float] = None
+
+
+class Linha(NamedTuple):
+    avanco: float = 10
+
+
+class Barras(NamedTuple):
+    """Code128; no PDF a base fica 8 pt abaixo da altura atual."""
+    dados: str
+    altura: float = 8 * mm
+    avanco: float = 16
+
+
+class QR(NamedTuple):
+    """QR centralizado; no PDF ocupa `lado` abaixo da altura atual e desce lado + avanco."""
+    dados: str
+    lado: float = 28 * mm
+    avanco: float = 6
+
+
+class Estatico(NamedTuple):
+    """Trecho fixo: no PDF vira o template `nome` (form XObject), no ESC/POS sai inline."""
+    nome: str
+    elementos: Tuple
+    avanco: float
+
+
+# ==================== PDF ====================
+def desenhar_pdf(c, elementos: Sequence, y: float, largura: float = LARGURA, margem: float = MARGEM) -> float:
+    """Desenha os elementos a partir de `y` (descendo) e devolve o y final."""
+    for el in elementos:
+        if isinstance(el, Texto):
+            c.setFont(el.fonte, el.tamanho)
+            if el.alinhar == "centro":
+                c.drawCentredString(largura / 2, y, el.texto)
+            elif el.alinhar == "dir":
+                c.drawRightString(largura - margem, y, el.texto)
+            else:
+                c.drawString(margem, y, el.texto)
+        elif isinstance(el, Colunas):
+            c.setFont(el.fonte, el.tamanho)
+            c.drawString(margem, y, el.esq)
+            if el.fonte_dir or el.tamanho_dir:
+                c.setFont(el.fonte_dir or el.fonte, el.tamanho_dir or el.tamanho)
+            c.drawRightString(largura - margem, y, el.dir)
+        elif isinstance(el, Linha):
+            c.line(margem, y, largura - margem, y)
+        elif isinstance(el, Barras):
+            with cronometro("codigos"):
+                barcode = code128.Code128(el.dados, barHeight=el.altura, barWidth=0.35)
+                barcode.drawOn(c, margem, y - 8)
+        elif isinstance(el, QR):
+            draw_qr(c, el.dados, largura / 2 - el.lado / 2, y - el.lado, el.lado)
+            y -= el.lado
+        elif isinstance(el, Estatico):
+            stamp(c, el.nome, y=y)
+        else:
+            raise TypeError(f"elemento de cupom desconhecido: {el!r}")
+        y -= el.avanco
+    return y
+
+
+# ==================== ESC/POS ====================
+ESC, GS = b"\x1b", b"\x1d"
+COLUNAS_A, COLUNAS_B = 48, 64  # 80 mm / 203 dpi: fonte A 12 dots, fonte B 9 dots
+PONTOS_POR_MM = 8              # 203 dpi
+CODEPAGE = ("cp860", 3)        # português (ESC t 3)
+_ALINHAR = {"esq": 0, "centro": 1, "dir": 2}
+# capacidade do QR em modo byte, correção L, versões 1..20
+_QR_CAPACIDADE = (17, 32, 53, 78, 106, 134, 154, 192, 230, 271,
+                  321, 367, 425, 458, 520, 586, 644, 718, 792, 858)
+_TROCAS = str.maketrans({"–": "-", "—": "-", "“": '"', "”": '"', "‘": "'", "’": "'", "•": "*"})
+
+
+def _bytes(texto: str) -> bytes:
+    return texto.translate(_TROCAS).encode(CODEPAGE[0], "replace")
+
+
+def _fonte(tamanho: float, negrito: bool) -> tuple:
+    """Estado de fonte da impressora: (pequena → fonte B, grande → altura dupla, negrito)."""
+    return tamanho <= 7, tamanho >= 10, negrito
+
+
+def _cmd_fonte(fonte: tuple) -> bytes:
+    pequena, grande, negrito = fonte
+    return ESC + b"M" + bytes([pequena]) + GS + b"!" + bytes([0x01 if grande else 0]) + ESC + b"E" + bytes([negrito])
+
+
+def _colunas(tamanho: float) -> int:
+    return COLUNAS_B if tamanho <= 7 else COLUNAS_A
+
+
+def _qr_modulo(dados: bytes, lado: float) -> int:
+    versao = next((v for v, cap in enumerate(_QR_CAPACIDADE, 1) if len(dados) <= cap), 20)
+    modulos = 17 + 4 * versao
+    return max(1, min(16, int(lado / mm * PONTOS_POR_MM) // modulos))
+
+
+def _gs_k(fn: int, dados: bytes) -> bytes:
+    n = len(dados) + 2
+    return GS + b"(k" + bytes([n & 0xFF, n >> 8, 0x31, fn]) + dados
+
+
+class _Impressora:
+    """Acumula comandos e só reemite alinhamento/fonte quando mudam."""
+
+    def __init__(self):
+        self.out = []
+        self.alinhado = self.fonte = None
+
+    def alinhar(self, modo: str):
+        if modo != self.alinhado:
+            self.out.append(ESC + b"a" + bytes([_ALINHAR[modo]]))
+            self.alinhado = modo
+
+    def usar(self, fonte: tuple):
+        if fonte != self.fonte:
+            self.out.append(_cmd_fonte(fonte))
+            self.fonte = fonte
+
+    def emitir(self, elementos):
+        out = self.out
+        for el in elementos:
+            if isinstance(el, Texto):
+                self.alinhar(el.alinhar)
+                self.usar(_fonte(el.tamanho, "Bold" in el.fonte))
+                out.append(_bytes(el.texto[:_colunas(el.tamanho)]) + b"\n")
+            elif isinstance(el, Colunas):
+                self.alinhar("esq")
+                largura = _colunas(el.tamanho)
+                direita = el.dir[:largura]
+                esquerda = el.esq[:max(largura - len(direita) - 1, 0)]
+                self.usar(_fonte(el.tamanho, "Bold" in el.fonte))
+                out.append(_bytes(esquerda) + b" " * (largura - len(esquerda) - len(direita)))
+                self.usar(_fonte(el.tamanho, "Bold" in (el.fonte_dir or el.fonte)))
+                out.append(_bytes(direita) + b"\n")
+            elif isinstance(el, Linha):
+                self.alinhar("esq")
+                self.usar(_fonte(8, False))
+                out.append(b"-" * COLUNAS_A + b"\n")
+            elif isinstance(el, Barras):
+                self.alinhar("centro")
+                dados = b"{B" + el.dados.encode("ascii", "replace")
+                altura = max(1, min(255, int(el.altura / mm * PONTOS_POR_MM)))
+                out.append(GS + b"h" + bytes([altura]) + GS + b"w\x02" + GS + b"H\x02"
+                           + GS + b"kI" + bytes([len(dados)]) + dados + b"\n")
+            elif isinstance(el, QR):
+                self.alinhar("centro")
+                dados = el.dados.encode("utf-8")
+                out.append(_gs_k(0x41, b"\x32\x00")                                   # modelo 2
+                           + _gs_k(0x43, bytes([_qr_modulo(dados, el.lado)]))          # tamanho do módulo
+                           + _gs_k(0x45, b"\x30")                                      # correção L
+                           + _gs_k(0x50, b"\x30" + dados)                              # armazena
+                           + _gs_k(0x51, b"\x30") + b"\n")                             # imprime
+            elif isinstance(el, Estatico):
+                out.append(_estatico(el.elementos))
+                self.alinhado = self.fonte = None  # estado após o bloco é desconhecido aqui
+            else:
+                raise TypeError(f"elemento de cupom desconhecido: {el!r}")
+
+
+@lru_cache(maxsize=32)
+def _estatico(elementos: tuple) -> bytes:
+    """Trechos fixos (cabeçalho, rodapé legal) são compilados uma vez por processo."""
+    impressora = _Impressora()
+    impressora.emitir(elementos)
+    return b"".join(impressora.out)
+
+
+def escpos(elementos: Sequence, cortar: bool = True) -> bytes:
+    """Converte o layout em comandos ESC/POS (Epson e compatíveis)."""
+    impressora = _Impressora()
+    impressora.out += [ESC + b"@", ESC + b"t" + bytes([CODEPAGE[1]])]
+    impressora.emitir(elementos)
+    impressora.usar(_fonte(8, False))
+    if cortar:
+        impressora.out.append(GS + b"VB\x03")  # avança 3 linhas e corta
+    return b"".join(impressora.out)
@@ -0,0 +1,86 @@
+"""Dinheiro exato: Decimal na entrada (modelos), centavos inteiros no desenho.
+
+Os valores eram float do modelo até o PDF: o total somado em float deriva
+alguns centavos em notas longas, e cada valor passava por uma cadeia de
+três .replace() para virar "1.234,56". Aqui:
+
+- `Dinheiro` é o tipo dos campos de valor nos modelos (Decimal
+  arredondado ao centavo, meio centavo para cima);
+- `centavos()` converte para int na fronteira modelo → desenho; a soma
+  de ints é exata e os ints são baratos de enviar ao executor;
+- `brl_lote()` formata a lista inteira de uma vez: divmod em lote e
+  str() dos inteiros + milhares/centavos tabelados, sem o format com
+  separador; quando os preços se repetem (o normal numa nota), cada
+  valor distinto é formatado uma vez só.
+
+    brl_lote([123456, 5]) -> ["1.234,56", "0,05"]
+"""
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from itertools import repeat
+from typing import Annotated, List, Sequence
+
+from pydantic import AfterValidator
+
+CENTAVO = Decimal("0.01")
+_CENTS = [f",{r:02d}" for r in range(100)]
+_MILHAR = [f".{m:03d}" for m in range(1000)]
+_AMOSTRA = 1024
+
+
+def arredondar(valor: Decimal) -> Decimal:
+    """Ao centavo, meio centavo para cima. ValueError (422 no modelo) se não cabe na precisão do Decimal."""
+    try:
+        return valor.quantize(CENTAVO, rounding=ROUND_HALF_UP)
+    except InvalidOperation:  # a partir de 1e26: ArithmeticError viraria 500
+        raise ValueError("valor fora do intervalo") from None
+
+
+Dinheiro = Annotated[Decimal, AfterValidator(arredondar)]
+
+
+def centavos(valor) -> int:
+    """Valor em reais (Decimal, int, float ou str) → centavos inteiros."""
+    if not isinstance(valor, Decimal):
+        valor = Decimal(str(valor))  # str(): 0.1 vira Decimal("0.1"), não a expansão binária do float
+    return int(valor.scaleb(2).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def _inteiro(q: int) -> str:
+    if q < 1000:
+        return str(q)
+    if q < 1_000_000:
+        return str(q // 1000) + _MILHAR[q % 1000]
+    if q < 1_000_000_000:
+        return str(q // 1_000_000) + _MILHAR[q // 1000 % 1000] + _MILHAR[q % 1000]
+    return f"{q:,}".replace(",", ".")
+
+
+def brl(c: int) -> str:
+    """Centavos → "1.234,56" (sem "R$")."""
+    q, r = divmod(abs(c), 100)
+    return ("-" if c < 0 else "") + _inteiro(q) + _CENTS[r]
+
+
+def _formatar(valores: Sequence[int]) -> List[str]:
+    # até R$ 999.999,99 só str(int) + pedaços tabelados, sem o format com separador
+    saida = [(str(q) if q < 1000 else str(q // 1000) + _MILHAR[q % 1000] if q < 1_000_000 else _inteiro(q)) + _CENTS[r]
+             for q, r in map(divmod, map(abs, valores), repeat(100))]
+    if valores and min(valores) < 0:
+        for i, c in enumerate(valores):
+            if c < 0:
+                saida[i] = "-" + saida[i]
+    return saida
+
+
+def brl_lote(valores: Sequence[int]) -> List[str]:
+    """brl() para a lista inteira; valores repetidos são formatados uma vez só."""
+    if len(set(valores[:_AMOSTRA])) > _AMOSTRA // 2:  # quase tudo distinto: deduplicar só custaria
+        return _formatar(valores)
+    distintos = list(set(valores))
+    tabela = dict(zip(distintos, _formatar(distintos)))
+    return [tabela[c] for c in valores]
+
+
+def decimal_str(c: int) -> str:
+    """Centavos → "1234.56": formato de máquina (QR, JSON), sem separador de milhar."""
+    return f"{c // 100}.{c % 100:02d}" if c >= 0 else f"-{-c // 100}.{-c % 100:02d}"
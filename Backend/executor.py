@@ -0,0 +1,80 @@
+"""Executor de renderização de PDF.
+
+O ReportLab é CPU-bound e segura a GIL; rodar no thread pool padrão do
+Starlette faz um orçamento grande travar todas as outras requisições.
+Aqui a renderização vai para um pool configurável:
+
+    PDF_EXECUTOR   "process" (padrão) | "thread" | "inline"
+    PDF_WORKERS    número de workers (padrão: núcleos da máquina)
+
+No modo "process" as funções enviadas precisam ser picláveis (funções de
+módulo ou functools.partial delas — nada de lambda). O relógio fixado da
+requisição (relogio.py) vai junto com a função.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from relogio import levar
+
+MODOS = ("process", "thread", "inline")
+
+
+class RenderExecutor:
+    """Pool preguiçoso: só cria os workers na primeira renderização."""
+
+    def __init__(self, modo: str = None, workers: int = None):
+        modo = (modo or os.getenv("PDF_EXECUTOR", "process")).strip().lower()
+        if modo not in MODOS:
+            raise ValueError(f"PDF_EXECUTOR inválido: {modo!r} (use {', '.join(MODOS)})")
+        self.modo = modo
+        self.workers = workers or int(os.getenv("PDF_WORKERS", "0") or 0) or os.cpu_count() or 1
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        if self.modo == "inline":
+            return None
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = self._criar_pool()
+        return self._pool
+
+    def _criar_pool(self):
+        if self.modo == "process":
+            try:
+                return ProcessPoolExecutor(max_workers=self.workers)
+            except (OSError, NotImplementedError):
+                # Serverless sem /dev/shm (ex.: Vercel) não cria semáforos
+                self.modo = "thread"
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pdf")
+
+    async def run(self, fn, *args):
+        """Executa fn(*args) no pool e aguarda o resultado."""
+        pool = self._get_pool()
+        if pool is None:
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        fn = levar(partial(fn, *args))
+        try:
+            return await loop.run_in_executor(pool, fn)
+        except BrokenProcessPool:
+            # Um worker morreu (OOM, sinal): recria o pool e tenta uma vez
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+                    pool.shutdown(wait=False, cancel_futures=True)
+            return await loop.run_in_executor(self._get_pool(), fn)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+executor = RenderExecutor()
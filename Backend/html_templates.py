@@ -0,0 +1,89 @@
+"""Prévia em HTML dos documentos (?formato=html), sem ReportLab.
+
+Para a tela do front um PDF completo (canvas, fontes, QR, serialização)
+é caro demais. As rotas de documento aceitam ?formato=html e renderizam
+os templates Jinja2 de templates/ — base.html com o cabeçalho da empresa
+e um template filho por documento (orcamento, nota, contrato, recibo,
+carta, certificado) — a partir dos mesmos modelos validados do PDF:
+
+- cada template é compilado uma vez por processo (no startup, em segundo
+  plano) e o objeto Template fica em `_compilados`; depois disso o render é só a função Python gerada
+  pelo Jinja, sem ler disco nem conferir mtime (auto_reload=False);
+- autoescape ligado: nomes e descrições vêm do cliente;
+- valores chegam em centavos (como nos draw_*) e são formatados com
+  brl_lote, igual ao PDF.
+
+É rápido o bastante (dezenas de µs) para rodar no próprio handler, sem
+executor nem cache de resposta. jinja2 fica fora do import do app
+(lazy.py): quem o carrega é a thread do startup ou o primeiro HTML.
+
+    HTML_TEMPLATES   diretório dos templates (padrão templates/ ao lado deste arquivo)
+"""
+import os
+import threading
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+from dinheiro import brl, brl_lote
+from lazy import modulo
+from relogio import agora
+
+jinja2 = modulo("jinja2")
+
+DIRETORIO = os.getenv("HTML_TEMPLATES") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+_compilados = {}  # nome -> jinja2.Template pronto
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _ambiente():
+    amb = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(DIRETORIO),
+        autoescape=True,
+        auto_reload=False,
+        trim_blocks=True,
+        lstrip_blocks=True,
+        cache_size=-1,
+    )
+    amb.filters["brl"] = brl
+    return amb
+
+
+def compilado(nome: str):
+    """Template `nome`.html compilado, do cache do processo."""
+    template = _compilados.get(nome)
+    if template is None:
+        with _lock:
+            template = _compilados.get(nome)
+            if template is None:
+                template = _compilados[nome] = _ambiente().get_template(f"{nome}.html")
+    return template
+
+
+def precompilar() -> int:
+    """Compila todos os templates de documento (startup); devolve quantos."""
+    nomes = [f[:-5] for f in sorted(os.listdir(DIRETORIO)) if f.endswith(".html") and not f.startswith("_")]
+    for nome in nomes:
+        compilado(nome)
+    return len(nomes)
+
+
+def precompilar_em_segundo_plano():
+    """Para o startup: importa o jinja2 e compila fora do caminho do primeiro byte."""
+    threading.Thread(target=precompilar, name="precompilar-html", daemon=True).start()
+
+
+def tabela(pares: Sequence[tuple]) -> Tuple[List[tuple], str]:
+    """pares (descrição, centavos) -> linhas (nº, descrição, "1.234,56") e total formatado.
+
+    O nº vem pronto para o template não precisar de loop.index (o LoopContext
+    do Jinja custa mais que a linha inteira).
+    """
+    valores = [val for _, val in pares]
+    return list(zip(range(1, len(pares) + 1), (desc for desc, _ in pares), brl_lote(valores))), brl(sum(valores))
+
+
+def renderizar(template: str, **contexto) -> str:
+    contexto.setdefault("gerado_em", agora().strftime("%d/%m/%Y %H:%M"))
+    return compilado(template).render(contexto)
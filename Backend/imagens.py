@@ -0,0 +1,325 @@
+"""Cache de imagens (logo do certificado) em dois níveis: memória e disco.
+
+Antes o logo_path ia direto para c.drawImage: a cada certificado o logo
+era baixado e decodificado de novo, a thread do worker ficava presa no
+download e qualquer falha sumia num `except: pass`. Aqui:
+
+- memória: LRU de ImageReader já decodificados, endereçados pelo hash do
+  conteúdo (a mesma imagem por URLs diferentes é decodificada uma vez);
+  a origem (URL, ou caminho + mtime + tamanho) aponta para o hash;
+- disco: blobs por hash + referências por origem, compartilhados entre os
+  processos do executor e entre reinícios;
+- downloads concorrentes da mesma origem esperam o primeiro (sem
+  "estouro de manada"); falhas são registradas no log e lembradas por
+  alguns segundos para não pagar o timeout a cada requisição.
+
+    IMAGENS_CACHE_BYTES    memória máx. (estimada pelos pixels, padrão 32 MiB)
+    IMAGENS_CACHE_ITENS    imagens decodificadas em memória (padrão 64)
+    IMAGENS_DIR            diretório do cache em disco (padrão tmp/helptech-imagens, "" desliga)
+    IMAGENS_DISCO_BYTES    limite do cache em disco (padrão 256 MiB)
+    IMAGENS_MAX_BYTES      tamanho máx. de uma imagem baixada (padrão 5 MiB)
+    IMAGENS_MAX_PIXELS     largura x altura máx. (padrão 16 megapixels)
+    IMAGENS_TIMEOUT        segundos para baixar uma URL (padrão 5)
+    IMAGENS_TTL            validade de uma URL antes de rebaixar (padrão 3600)
+    IMAGENS_FALHA_TTL      segundos lembrando uma falha (padrão 60)
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from io import BytesIO
+from typing import Callable, Optional
+
+from lazy import modulo
+
+utils = modulo("reportlab.lib.utils")
+
+log = logging.getLogger(__name__)
+
+
+class ImagemInvalida(Exception):
+    """Origem inacessível, grande demais ou que não decodifica como imagem."""
+
+
+def _eh_url(origem: str) -> bool:
+    return origem.startswith(("http://", "https://"))
+
+
+def _hash(dados: bytes) -> str:
+    return hashlib.sha256(dados).hexdigest()
+
+
+def _gravar_atomico(caminho: str, dados: bytes):
+    # temporário próprio: vários processos do executor gravam o mesmo blob/ref ao mesmo tempo
+    fd, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), prefix=".", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(dados)
+        os.replace(temporario, caminho)
+    except BaseException:
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+        raise
+
+
+class ImageCache:
+    def __init__(
+        self,
+        max_bytes: int = None,
+        max_itens: int = None,
+        disco: str = None,
+        disco_bytes: int = None,
+        max_download: int = None,
+        max_pixels: int = None,
+        timeout: float = None,
+        ttl: float = None,
+        falha_ttl: float = None,
+        abrir_url: Callable = None,
+    ):
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("IMAGENS_CACHE_BYTES", 32 * 1024 * 1024))
+        self.max_itens = max_itens if max_itens is not None else int(os.getenv("IMAGENS_CACHE_ITENS", 64))
+        if disco is None:
+            disco = os.getenv("IMAGENS_DIR", os.path.join(tempfile.gettempdir(), "helptech-imagens"))
+        self.disco = disco or None
+        self.disco_bytes = disco_bytes if disco_bytes is not None else int(os.getenv("IMAGENS_DISCO_BYTES", 256 * 1024 * 1024))
+        self.max_download = max_download or int(os.getenv("IMAGENS_MAX_BYTES", 5 * 1024 * 1024))
+        self.max_pixels = max_pixels or int(os.getenv("IMAGENS_MAX_PIXELS", 16_000_000))
+        self.timeout = timeout or float(os.getenv("IMAGENS_TIMEOUT", 5))
+        self.ttl = ttl if ttl is not None else float(os.getenv("IMAGENS_TTL", 3600))
+        self.falha_ttl = falha_ttl if falha_ttl is not None else float(os.getenv("IMAGENS_FALHA_TTL", 60))
+        self._abrir_url = abrir_url or urllib.request.urlopen
+        if self.disco:
+            os.makedirs(os.path.join(self.disco, "blobs"), exist_ok=True)
+            os.makedirs(os.path.join(self.disco, "refs"), exist_ok=True)
+
+        self._imagens = OrderedDict()  # hash -> (ImageReader, custo em bytes)
+        self._origens = {}             # chave da origem -> (hash, expira)
+        self._falhas = {}              # chave da origem -> (mensagem, expira)
+        self._em_voo = {}              # chave da origem -> threading.Event
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.disco_hits = self.downloads = self.falhas = 0
+
+    # ----- API -----
+    def obter(self, origem: str):
+        """ImageReader para a URL/caminho, ou None (com aviso no log) se não der para usar."""
+        try:
+            chave = self._chave(origem)
+        except OSError as exc:
+            self._registrar_falha(origem, origem, f"arquivo inacessível: {exc}")
+            return None
+        prazo = time.monotonic() + self.timeout * 2
+        while True:
+            with self._lock:
+                reader = self._da_memoria(chave)
+                if reader is not None:
+                    self.hits += 1
+                    return reader
+                falha = self._falhas.get(chave)
+                if falha and falha[1] > time.time():
+                    return None
+                evento = self._em_voo.get(chave)
+                dono = evento is None
+                if dono:
+                    evento = self._em_voo[chave] = threading.Event()
+                    self.misses += 1
+            if dono:
+                break
+            # outro thread já está buscando esta origem: quando terminar, a memória ou a falha respondem
+            if not evento.wait(max(0.0, prazo - time.monotonic())):
+                log.warning("logo ignorado (%s): a busca em andamento não terminou em %g s", origem, self.timeout * 2)
+                return None
+        try:
+            return self._carregar(origem, chave)
+        except ImagemInvalida as exc:
+            self._registrar_falha(origem, chave, str(exc))
+            return None
+        finally:
+            with self._lock:
+                evento = self._em_voo.pop(chave, None)
+            if evento:
+                evento.set()
+
+    async def precarregar(self, origem: Optional[str]):
+        """Aquece memória + disco fora do event loop antes de mandar o render ao executor."""
+        if origem:
+            await asyncio.to_thread(self.obter, origem)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "imagens": len(self._imagens),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "origens": len(self._origens),
+                "hits": self.hits,
+                "misses": self.misses,
+                "disco_hits": self.disco_hits,
+                "downloads": self.downloads,
+                "falhas": self.falhas,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._imagens.clear()
+            self._origens.clear()
+            self._falhas.clear()
+            self._bytes = 0
+
+    # ----- memória -----
+    def _chave(self, origem: str) -> str:
+        if _eh_url(origem):
+            return origem
+        st = os.stat(origem)
+        return f"{os.path.abspath(origem)}@{st.st_mtime_ns}:{st.st_size}"
+
+    def _da_memoria(self, chave: str):
+        ref = self._origens.get(chave)
+        if ref is None:
+            return None
+        digest, expira = ref
+        if expira < time.time() or digest not in self._imagens:
+            del self._origens[chave]
+            return None
+        self._imagens.move_to_end(digest)
+        return self._imagens[digest][0]
+
+    def _guardar(self, chave: str, digest: str, reader, custo: int, expira: float):
+        with self._lock:
+            self._origens[chave] = (digest, expira)
+            self._falhas.pop(chave, None)
+            if digest in self._imagens or custo > self.max_bytes:
+                return
+            self._imagens[digest] = (reader, custo)
+            self._bytes += custo
+            while self._imagens and (self._bytes > self.max_bytes or len(self._imagens) > self.max_itens):
+                _, (_, c) = self._imagens.popitem(last=False)
+                self._bytes -= c
+            # origens que apontam para imagens despejadas saem na próxima consulta
+
+    def _registrar_falha(self, origem: str, chave: str, motivo: str):
+        log.warning("logo ignorado (%s): %s", origem, motivo)
+        with self._lock:
+            self.falhas += 1
+            self._falhas[chave] = (motivo, time.time() + self.falha_ttl)
+
+    # ----- carga: disco ou origem -----
+    def _carregar(self, origem: str, chave: str):
+        expira = time.time() + (self.ttl if _eh_url(origem) else 365 * 86400)
+        dados = self._do_disco(chave)
+        if dados is not None:
+            with self._lock:
+                self.disco_hits += 1
+        else:
+            dados = self._baixar(origem) if _eh_url(origem) else self._ler_arquivo(origem)
+            with self._lock:
+                self.downloads += 1
+        digest = _hash(dados)
+        reader, custo = self._decodificar(dados)
+        self._para_disco(chave, digest, dados, expira)
+        self._guardar(chave, digest, reader, custo, expira)
+        return reader
+
+    def _baixar(self, url: str) -> bytes:
+        inicio = time.monotonic()
+        try:
+            req = urllib.request.Request(url, headers={"User-Agent": "helptech-pdf/1.0"})
+            with self._abrir_url(req, timeout=self.timeout) as resp:
+                tamanho = resp.headers.get("Content-Length")
+                if tamanho and int(tamanho) > self.max_download:
+                    raise ImagemInvalida(f"{tamanho} bytes > limite de {self.max_download}")
+                partes, total = [], 0
+                while True:
+                    parte = resp.read(64 * 1024)
+                    if not parte:
+                        break
+                    total += len(parte)
+                    if total > self.max_download:
+                        raise ImagemInvalida(f"mais de {self.max_download} bytes")
+                    if time.monotonic() - inicio > self.timeout:
+                        raise ImagemInvalida(f"download passou de {self.timeout:g} s")
+                    partes.append(parte)
+        except ImagemInvalida:
+            raise
+        except (OSError, ValueError) as exc:  # URLError, HTTPError, timeout, URL malformada
+            raise ImagemInvalida(f"falha ao baixar: {exc}") from exc
+        return b"".join(partes)
+
+    def _ler_arquivo(self, caminho: str) -> bytes:
+        try:
+            if os.path.getsize(caminho) > self.max_download:
+                raise ImagemInvalida(f"arquivo maior que {self.max_download} bytes")
+            with open(caminho, "rb") as f:
+                return f.read()
+        except OSError as exc:
+            raise ImagemInvalida(f"arquivo inacessível: {exc}") from exc
+
+    def _decodificar(self, dados: bytes):
+        try:
+            reader = utils.ImageReader(BytesIO(dados))
+            largura, altura = reader.getSize()
+        except Exception as exc:  # PIL levanta tipos variados para arquivo corrompido
+            motivo = str(exc).strip().splitlines()[-1] if str(exc).strip() else type(exc).__name__
+            raise ImagemInvalida(f"não é uma imagem válida: {motivo}") from exc
+        if largura * altura > self.max_pixels:
+            raise ImagemInvalida(f"{largura}x{altura} passa do limite de {self.max_pixels} pixels")
+        return reader, largura * altura * 4
+
+    # ----- disco -----
+    def _ref(self, chave: str) -> str:
+        return os.path.join(self.disco, "refs", hashlib.sha1(chave.encode("utf-8")).hexdigest())
+
+    def _blob(self, digest: str) -> str:
+        return os.path.join(self.disco, "blobs", digest)
+
+    def _do_disco(self, chave: str) -> Optional[bytes]:
+        if not self.disco:
+            return None
+        try:
+            with open(self._ref(chave)) as f:
+                ref = json.load(f)
+            if ref["expira"] < time.time():
+                return None
+            with open(self._blob(ref["hash"]), "rb") as f:
+                dados = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        return dados if _hash(dados) == ref["hash"] else None
+
+    def _para_disco(self, chave: str, digest: str, dados: bytes, expira: float):
+        if not self.disco:
+            return
+        try:
+            if not os.path.exists(self._blob(digest)):
+                _gravar_atomico(self._blob(digest), dados)
+                self._podar_disco()
+            _gravar_atomico(self._ref(chave), json.dumps({"hash": digest, "expira": expira}).encode())
+        except OSError as exc:
+            log.warning("cache de imagens em disco indisponível: %s", exc)
+
+    def _podar_disco(self):
+        """Remove os blobs mais antigos enquanto o diretório passar do limite."""
+        blobs = sorted(
+            (e for e in os.scandir(os.path.join(self.disco, "blobs")) if not e.name.startswith(".")),  # .part de outro processo
+            key=lambda e: e.stat().st_mtime,
+        )
+        total = sum(e.stat().st_size for e in blobs)
+        for entrada in blobs:
+            if total <= self.disco_bytes:
+                break
+            total -= entrada.stat().st_size
+            try:
+                os.remove(entrada.path)
+            except OSError:
+                pass
+
+
+imagens = ImageCache()
@@ -0,0 +1,251 @@
+"""Fila de jobs assíncrona para documentos grandes.
+
+Um orçamento de 10.000 linhas ou um lote grande de certificados não cabe
+no timeout de uma requisição HTTP (proxy/Vercel). O cliente cria o job,
+acompanha o progresso e baixa o resultado depois:
+
+    POST /jobs/{tipo}        -> {"id": ..., "status": "pendente", ...}
+    GET  /jobs/{id}          -> status, páginas renderizadas, ETA
+    GET  /jobs/{id}/result   -> PDF pronto
+
+Tudo roda no próprio processo, sem serviço externo:
+- workers asyncio (JOBS_WORKERS, padrão 2) consomem a fila e mandam a
+  renderização para o executor de PDF;
+- o resultado vai para um spool em disco (JOBS_SPOOL, spool.py), não
+  para a memória, e é servido com mmap e suporte a Range;
+- o progresso é gravado pelo worker num arquivo ao lado do PDF a cada
+  página, o que funciona também no modo process do executor;
+- com JOBS_DB=caminho.sqlite3 os metadados persistem entre reinícios; as
+  gravações no SQLite rodam numa thread (asyncio.to_thread), fora do
+  event loop;
+- no máximo JOBS_FILA jobs pendentes/executando: além disso POST /jobs
+  recebe 503 com Retry-After (a estimativa usa a duração dos últimos
+  jobs);
+- resultados expiram após JOBS_TTL segundos (padrão 3600), e um job que
+  passa JOBS_TTL na fila sem começar vira erro; dos terminados ficam no
+  máximo JOBS_GUARDADOS (os mais antigos saem antes do TTL).
+
+    JOBS_WORKERS     jobs simultâneos (padrão 2)
+    JOBS_FILA        jobs pendentes + executando aceitos (padrão 100)
+    JOBS_GUARDADOS   jobs terminados mantidos para consulta (padrão 1000)
+    JOBS_TTL         segundos até o resultado expirar (padrão 3600)
+    JOBS_SPOOL       diretório dos PDFs
+    JOBS_DB          SQLite opcional para o status
+"""
+import asyncio
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, asdict, field
+from functools import partial
+from typing import Dict, Optional
+from uuid import uuid4
+
+from fastapi import HTTPException
+
+from executor import executor
+from relogio import levar
+from spool import Spool, gravar_no_spool
+
+PENDENTE, EXECUTANDO, CONCLUIDO, ERRO = "pendente", "executando", "concluido", "erro"
+
+
+@dataclass
+class Job:
+    id: str
+    tipo: str
+    filename: str
+    paginas_total: int
+    status: str = PENDENTE
+    paginas_feitas: int = 0
+    criado: float = field(default_factory=time.time)
+    iniciado: Optional[float] = None
+    terminado: Optional[float] = None
+    erro: Optional[str] = None
+    arquivo: Optional[str] = None
+
+
+# ---------- lado do worker (precisa ser piclável) ----------
+def _gravar_progresso(caminho: str, paginas: int):
+    with open(caminho, "w") as f:
+        f.write(str(paginas))
+
+
+def _com_progresso(progresso: str, draw_fn, c, *args, **kwargs):
+    """Envolve draw_fn para registrar cada página concluída no arquivo de progresso."""
+    show_page = c.showPage
+
+    def showPage():
+        show_page()
+        _gravar_progresso(progresso, c.getPageNumber() - 1)
+
+    c.showPage = showPage
+    draw_fn(c, *args, **kwargs)
+
+
+# ---------- lado da API ----------
+class JobQueue:
+    def __init__(self, spool: str = None, db: str = None, workers: int = None, ttl: float = None,
+                 max_fila: int = None, max_guardados: int = None):
+        self.workers = workers or int(os.getenv("JOBS_WORKERS", 2))
+        self.ttl = ttl if ttl is not None else float(os.getenv("JOBS_TTL", 3600))
+        self.max_fila = max_fila or int(os.getenv("JOBS_FILA", 100))
+        self.max_guardados = max_guardados or int(os.getenv("JOBS_GUARDADOS", 1000))
+        self.spool = Spool(spool or os.getenv("JOBS_SPOOL") or os.path.join(tempfile.gettempdir(), "helptech-jobs"), self.ttl)
+        self._jobs: Dict[str, Job] = {}
+        self._renders = {}
+        self._fila: Optional[asyncio.Queue] = None
+        self._tarefas = []
+        self._ativos = 0      # pendentes + executando
+        self._duracao = 5.0   # média móvel da duração de um job, para o Retry-After
+        self._db_lock = threading.Lock()
+        db = db or os.getenv("JOBS_DB")
+        self._db = sqlite3.connect(db, check_same_thread=False) if db else None
+        if self._db:
+            self._carregar()
+
+    # ----- persistência opcional -----
+    def _carregar(self):
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, tipo TEXT, filename TEXT,"
+            " paginas_total INTEGER, status TEXT, paginas_feitas INTEGER, criado REAL,"
+            " iniciado REAL, terminado REAL, erro TEXT, arquivo TEXT)"
+        )
+        for row in self._db.execute(f"SELECT {', '.join(Job.__dataclass_fields__)} FROM jobs"):
+            job = Job(*row)
+            if job.status in (PENDENTE, EXECUTANDO):
+                job.status, job.erro, job.terminado = ERRO, "interrompido por reinício do servidor", time.time()
+                self._salvar(asdict(job))
+            self._jobs[job.id] = job
+        self._db.commit()
+
+    def _salvar(self, campos: dict):
+        with self._db_lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO jobs ({', '.join(campos)}) VALUES ({', '.join('?' * len(campos))})",
+                tuple(campos.values()),
+            )
+            self._db.commit()
+
+    async def _persistir(self, job: Job):
+        """Grava o job numa thread; a cópia dos campos é feita aqui, no event loop."""
+        if self._db:
+            await asyncio.to_thread(self._salvar, asdict(job))
+
+    # ----- fila -----
+    def verificar_vaga(self):
+        """503 com Retry-After se a fila está cheia; chamar antes de gastar recursos (número de nota)."""
+        if self._ativos >= self.max_fila:
+            espera = math.ceil(self._duracao * (self._ativos - self.max_fila + 1) / self.workers)
+            raise HTTPException(503, "Fila de jobs cheia; tente novamente em instantes",
+                                headers={"Retry-After": str(max(1, espera))})
+
+    async def submeter(self, tipo: str, filename: str, paginas_total: int, pdf_fn, draw_fn, *args, **kwargs) -> Job:
+        """Enfileira pdf_fn(draw_fn, *args, **kwargs) e devolve o job criado (503 se a fila está cheia)."""
+        await self.limpar_expirados()
+        self.verificar_vaga()
+        job = Job(id=uuid4().hex, tipo=tipo, filename=filename, paginas_total=max(paginas_total, 1))
+        _, job.arquivo = self.spool.novo(filename, job.id)
+        progresso = job.arquivo + ".progresso"
+        # os workers da fila não estão no contexto da requisição: o relógio fixo vai junto do render
+        self._renders[job.id] = levar(partial(pdf_fn, partial(_com_progresso, progresso, draw_fn), *args, **kwargs))
+        self._jobs[job.id] = job
+        self._ativos += 1
+        self._garantir_workers()
+        self._fila.put_nowait(job.id)
+        await self._persistir(job)
+        return job
+
+    def _garantir_workers(self):
+        if self._fila is None:
+            self._fila = asyncio.Queue()
+            self._tarefas = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _worker(self):
+        while True:
+            job = self._jobs.get(await self._fila.get())
+            render = self._renders.pop(job.id, None) if job else None
+            if render is None:
+                continue  # expirou na fila
+            job.status, job.iniciado = EXECUTANDO, time.time()
+            await self._persistir(job)
+            try:
+                await executor.run(partial(gravar_no_spool, job.arquivo, render))
+                job.status = CONCLUIDO
+                job.paginas_feitas = self._progresso(job) or job.paginas_total
+                job.paginas_total = max(job.paginas_total, job.paginas_feitas)
+            except Exception as exc:
+                job.status, job.erro = ERRO, f"{type(exc).__name__}: {exc}"
+            job.terminado = time.time()
+            self._ativos -= 1
+            self._duracao = 0.8 * self._duracao + 0.2 * (job.terminado - job.iniciado)
+            await asyncio.to_thread(self._remover_arquivo, job.arquivo + ".progresso")
+            await self._persistir(job)
+            await self.limpar_expirados()
+
+    def _progresso(self, job: Job) -> int:
+        try:
+            with open(job.arquivo + ".progresso") as f:
+                return int(f.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    # ----- consulta -----
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def status(self, job: Job) -> dict:
+        dados = asdict(job)
+        del dados["arquivo"]
+        if job.status == EXECUTANDO:
+            dados["paginas_feitas"] = feitas = min(self._progresso(job), job.paginas_total)
+            decorrido = time.time() - job.iniciado
+            dados["eta_segundos"] = round(decorrido / feitas * (job.paginas_total - feitas), 1) if feitas else None
+        else:
+            dados["eta_segundos"] = 0 if job.status == CONCLUIDO else None
+        dados["jobs_na_fila"] = self._fila.qsize() if self._fila else 0
+        return dados
+
+    # ----- limpeza -----
+    async def limpar_expirados(self):
+        """Remove terminados após o TTL (e os mais antigos além de max_guardados); pendentes velhos viram erro."""
+        agora = time.time()
+        limite = agora - self.ttl
+        for job in [j for j in self._jobs.values() if j.status == PENDENTE and j.criado < limite]:
+            if self._renders.pop(job.id, None) is not None:  # o worker pula o id quando chegar nele
+                job.status, job.erro, job.terminado = ERRO, "expirou na fila", agora
+                self._ativos -= 1
+                await self._persistir(job)
+        terminados = sorted((j for j in self._jobs.values() if j.terminado), key=lambda j: j.terminado)
+        excedentes = len(terminados) - self.max_guardados
+        removidos = [j for i, j in enumerate(terminados) if j.terminado < limite or i < excedentes]
+        for job in removidos:
+            del self._jobs[job.id]
+        if removidos:
+            await asyncio.to_thread(self._apagar, [(j.id, j.arquivo) for j in removidos])
+
+    def _apagar(self, jobs):
+        for _, arquivo in jobs:
+            self.spool.remover(arquivo)
+        if self._db:
+            with self._db_lock:
+                self._db.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id, _ in jobs])
+                self._db.commit()
+
+    @staticmethod
+    def _remover_arquivo(caminho: Optional[str]):
+        if caminho:
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+    def shutdown(self):
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        if self._db:
+            with self._db_lock:
+                self._db.close()
@@ -0,0 +1,49 @@
+"""Import preguiçoso dos módulos pesados de renderização.
+
+Na Vercel cada cold start importa main.py inteiro antes do primeiro byte.
+reportlab.pdfgen.canvas, reportlab.lib.colors e reportlab.graphics.barcode
+custam mais de 100 ms e só são necessários quando um PDF é desenhado; "/" e
+"/health" não deveriam pagar por eles. `modulo("x.y")` devolve um proxy que
+só importa o módulo no primeiro acesso a um atributo:
+
+    canvas = modulo("reportlab.pdfgen.canvas")
+    canvas.Canvas(...)   # importa aqui, uma vez por processo
+
+O tempo de cada carga fica em `carregados` (exposto em /metrics).
+"""
+import importlib
+import sys
+import time
+
+carregados = {}  # nome do módulo -> segundos gastos no import
+
+
+class _Modulo:
+    __slots__ = ("_nome", "_mod")
+
+    def __init__(self, nome: str):
+        object.__setattr__(self, "_nome", nome)
+        object.__setattr__(self, "_mod", None)
+
+    def _carregar(self):
+        mod = self._mod
+        if mod is None:
+            ja_importado = self._nome in sys.modules
+            t0 = time.perf_counter()
+            mod = importlib.import_module(self._nome)  # o lock de import já serializa threads
+            if not ja_importado:
+                carregados.setdefault(self._nome, time.perf_counter() - t0)
+            object.__setattr__(self, "_mod", mod)
+        return mod
+
+    def __getattr__(self, attr):
+        return getattr(self._carregar(), attr)
+
+    def __repr__(self):
+        estado = "carregado" if self._mod is not None else "não carregado"
+        return f"<módulo preguiçoso {self._nome!r} ({estado})>"
+
+
+def modulo(nome: str):
+    """Proxy que importa `nome` no primeiro acesso a atributo."""
+    return _Modulo(nome)
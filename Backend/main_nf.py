@@ -1,48 +1,164 @@
-from fastapi import FastAPI, Query
+import asyncio
+from fastapi import Body, FastAPI, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel, Field
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional
 from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from functools import partial
 from io import BytesIO
-from uuid import uuid4
 
 # ReportLab
 from reportlab.lib.pagesizes import A4, landscape
-from reportlab.pdfgen import canvas
 from reportlab.lib.units import mm
-from reportlab.lib import colors
-from reportlab.graphics.barcode import code128, qr
-from reportlab.graphics import renderPDF
-from reportlab.graphics.shapes import Drawing
+
+from executor import executor
+from admissao import AdmissaoMiddleware, admissao
+from relogio import RelogioMiddleware, agora, fixo
+from lazy import carregados, modulo
+from pdf_cache import PdfCache, chave, etag_confere
+from qrcodes import draw_qr
+from texto import contar_linhas, contar_paginas as contar_paginas_texto, desenhar_texto
+from cupom import Barras, Colunas, Estatico, Linha, QR, Texto, desenhar_pdf, escpos
+from page_templates import stamp, template
+from lote import draw_pacote, draw_paginas, render_em_ordem, zip_stream
+from jobs import CONCLUIDO, JobQueue
+from imagens import imagens
+from numeracao import notas
+from perfis import PERFIL_PADRAO, Perfil, compactar, perfil_de
+from spool import Spool, gravar_partes, responder_arquivo, responder_bytes
+from planilhas import FormatoPlanilha, Manifesto, com_manifesto, formato_do_upload, orcamentos, receber
+from pdf_stream import PAGINAS_MIN as PAGINAS_INCREMENTAL, PARALELO_FATIA, fatia_no_executor, pdf_costurado, pdf_incremental, pdf_paralelo
+from dinheiro import Dinheiro, brl, brl_lote, centavos, decimal_str
+from certificados import RegistroCertificados
+from html_templates import precompilar_em_segundo_plano, renderizar, tabela
+from preview import DPI_MAX, DPI_MIN, DPI_PADRAO, PREVIA, dados_da_query, pdfium_disponivel, png_primeira_pagina, previews
+from metrics import ADMISSAO, CACHE, EM_ANDAMENTO, IMPORTS, MetricsMiddleware, cronometro, marcar_validacao, medido, registrar_render, registro
+
+# reportlab pesado só é importado no primeiro PDF (cold start da Vercel)
+canvas = modulo("reportlab.pdfgen.canvas")
+colors = modulo("reportlab.lib.colors")
 
 app = FastAPI(title="HelpTech Antunes PDF API", version="1.1.0")
 
 # --- CORS ---
+app.add_middleware(RelogioMiddleware)  # ?gerado_em= / PDF_DETERMINISTICO: relógio fixo na requisição (relogio.py)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Em produção: restrinja para seu domínio
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # front lê o nome do arquivo (número da nota) e retoma downloads grandes (spool.py)
+    expose_headers=["Content-Disposition", "Content-Location", "Content-Range", "Accept-Ranges"],
 )
+app.add_middleware(AdmissaoMiddleware)  # devolve a vaga de render quando a resposta termina (admissao.py)
+app.add_middleware(MetricsMiddleware)
+
+URL_VALIDACAO = "https://helptech-antunes.vercel.app/validar"
+certificados = RegistroCertificados()
+
+@app.on_event("startup")
+def carregar_certificados():
+    certificados.carregar_em_segundo_plano()
+    precompilar_em_segundo_plano()
+
+@app.on_event("shutdown")
+def encerrar_executor():
+    jobs.shutdown()
+    executor.shutdown()
+    notas.fechar()
+    certificados.fechar()
 
 # ========= Helpers =========
-def pdf_bytes(draw_fn) -> bytes:
-    """Gera PDF em memória (BytesIO) e retorna bytes."""
+pdf_cache = PdfCache()
+jobs = JobQueue()
+spool = Spool()
+
+def pdf_bytes(draw_fn, *args, perfil: Optional[Perfil] = None, **kwargs) -> bytes:
+    """Gera PDF em memória (BytesIO) e retorna bytes; o perfil compacto reduz o tamanho (perfis.py)."""
     buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    draw_fn(c)
-    c.save()
+    # relógio fixo: CreationDate e /ID invariantes, o mesmo corpo dá os mesmos bytes
+    c = canvas.Canvas(buffer, pagesize=A4, invariant=fixo() is not None)
+    with cronometro("desenho"):
+        draw_fn(c, *args, **kwargs)
+    with cronometro("serializacao"):
+        if (perfil or PERFIL_PADRAO) == Perfil.compacto:
+            compactar(c)
+        c.save()
     buffer.seek(0)
     return buffer.read()
 
-def stream_pdf(content: bytes, filename: str) -> StreamingResponse:
-    """Retorna StreamingResponse com headers para download."""
+async def render_pdf(draw_fn, *args, perfil: Optional[Perfil] = None, **kwargs) -> bytes:
+    """Renderiza no executor configurado (process/thread/inline) sem bloquear o event loop."""
+    EM_ANDAMENTO.inc()
+    try:
+        pdf, fases = await executor.run(partial(medido, partial(pdf_bytes, draw_fn, *args, perfil=perfil, **kwargs)))
+    finally:
+        EM_ANDAMENTO.dec()
+    registrar_render(fases, len(pdf))
+    return pdf
+
+def stream_pdf(request: Request, content: bytes, filename: str, etag: Optional[str] = None) -> Response:
+    """PDF em memória como download, com Content-Length e Range (spool.py)."""
+    return responder_bytes(request, content, filename, etag=etag)
+
+def perfil_pedido(request: Request) -> Perfil:
+    """?perfil=compacto|padrao em qualquer rota de PDF (padrão: PDF_PERFIL)."""
+    try:
+        return perfil_de(request.query_params.get("perfil"))
+    except ValueError:
+        raise HTTPException(422, "perfil deve ser 'padrao' ou 'compacto'")
+
+async def responder_pdf(request: Request, tipo: str, filename: str, draw_fn, *args, **kwargs):
+    """Serve do cache (ou 304 via If-None-Match); senão renderiza e guarda."""
+    marcar_validacao(request)
+    perfil = perfil_pedido(request)
+    key = chave(tipo, perfil.value, fixo(), *args, **kwargs)
+    entrada = pdf_cache.get(key)
+    if entrada is None:
+        await admissao.admitir(request)
+        entrada = pdf_cache.put(key, await render_pdf(draw_fn, *args, perfil=perfil, **kwargs))
+    if etag_confere(request.headers.get("if-none-match"), entrada.etag):
+        return Response(status_code=304, headers={"ETag": entrada.etag})
+    return stream_pdf(request, entrada.pdf, filename, etag=entrada.etag)
+
+def responder_escpos(filename: str, dados: bytes) -> Response:
+    """Bytes ESC/POS crus (algumas centenas de bytes): gerados no próprio handler, sem executor nem cache."""
+    return Response(
+        dados,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+def responder_html(template: str, **contexto) -> HTMLResponse:
+    """Prévia ?formato=html (html_templates.py): template pré-compilado, no próprio handler."""
+    return HTMLResponse(renderizar(template, **contexto))
+
+async def responder_orcamento(request: Request, cliente: str, pares: List[tuple]):
+    """A partir de PDF_STREAM_PAGINAS páginas o orçamento sai página a página (pdf_stream.py), sem cache nem Range.
+
+    Com PDF_EXECUTOR=process o desenho vai para os workers em faixas de páginas (em paralelo a partir
+    de PDF_PARALELO_PAGINAS); nos outros modos, numa thread deste processo.
+    """
+    paginas = contar_paginas(len(pares))
+    if not (PAGINAS_INCREMENTAL and paginas >= PAGINAS_INCREMENTAL):
+        return await responder_pdf(request, "orcamento", "orcamento.pdf", draw_orcamento, cliente, pares)
+    marcar_validacao(request)
+    perfil_pedido(request)  # mesmo 422 das outras rotas; o incremental já sai enxuto
+    await admissao.admitir(request)  # a vaga fica até o último byte
+    fatia = fatia_no_executor(paginas)
+    if fatia:  # PDF_EXECUTOR=process: as faixas são desenhadas nos workers, aqui só a costura
+        corpo = pdf_paralelo(faixas_orcamento(cliente, pares, fatia))
+    else:
+        corpo = pdf_incremental(draw_orcamento, cliente, pares)
     return StreamingResponse(
-        BytesIO(content),
+        corpo,
         media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        headers={"Content-Disposition": 'attachment; filename="orcamento.pdf"', "Accept-Ranges": "none"},
     )
 
 # ========= Saúde / Home =========
@@ -54,18 +170,39 @@ def home():
 def health():
     return {"status": "ok", "time": datetime.now().isoformat()}
 
+@app.get("/cache/stats")
+def cache_stats():
+    """Contadores do cache de PDFs (hits/misses/bytes) para ajuste do tamanho."""
+    return {**pdf_cache.stats(), "preview": previews.stats(), "spool": spool.stats(), "admissao": admissao.stats()}
+
+@app.get("/imagens/stats")
+def imagens_stats():
+    """Contadores do cache de logos (memória, disco, downloads e falhas)."""
+    return imagens.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metricas():
+    """Métricas no formato texto do Prometheus (latência por rota, fases, tamanhos)."""
+    for campo, valor in pdf_cache.stats().items():
+        CACHE.set(campo, valor=valor)
+    for nome, segundos in carregados.items():
+        IMPORTS.set(nome, valor=segundos)
+    for campo, valor in admissao.stats().items():
+        ADMISSAO.set(campo, valor=valor)
+    return PlainTextResponse(registro.exportar(), media_type="text/plain; version=0.0.4")
+
 
 # ========= MODELOS =========
 class Item(BaseModel):
     descricao: str = Field(..., example="Troca de Tela")
-    valor: float = Field(..., example=199.90)
+    valor: Dinheiro = Field(..., example=199.90)
 
 class OrcamentoBody(BaseModel):
     cliente: str = Field(..., example="João da Silva")
     itens: List[Item] = Field(default_factory=list)
 
 class NotaFiscalBody(BaseModel):
-    numero: str = Field(..., example="0001")
+    # o número é alocado pelo servidor (numeracao.py); "numero" enviado pelo cliente é ignorado
     cliente: str = Field(..., example="João da Silva")
     itens: List[Item] = Field(default_factory=list)
     data: Optional[str] = Field(None, example="2025-10-06 09:00")
@@ -76,7 +213,7 @@ class ContratoBody(BaseModel):
 
 class ReciboBody(BaseModel):
     cliente: str = Field(..., example="Cliente Teste")
-    valor: float = Field(..., example=100.0)
+    valor: Dinheiro = Field(..., example=100.0)
 
 class CartaBody(BaseModel):
     destinatario: str = Field(..., example="Destinatário")
@@ -90,111 +227,443 @@ class CertificadoBody(BaseModel):
     instrutor: Optional[str] = Field(None, example="Fulano de Tal")
     logo_path: Optional[str] = Field(None, example="https://seusite.com/logo.png")
 
+class FormatoLote(str, Enum):
+    pdf = "pdf"
+    zip = "zip"
+
+class FormatoDoc(str, Enum):
+    pdf = "pdf"
+    html = "html"
+
+class FormatoNota(str, Enum):
+    pdf = "pdf"
+    escpos = "escpos"
+    html = "html"
+
+class PacoteBody(BaseModel):
+    # cada documento traz "tipo" + os campos do body daquele tipo
+    documentos: List[dict] = Field(..., min_length=1, max_length=20, example=[
+        {"tipo": "orcamento", "cliente": "João da Silva", "itens": [{"descricao": "Troca de Tela", "valor": 199.90}]},
+        {"tipo": "contrato", "cliente": "João da Silva", "descricao": "Troca de tela do celular"},
+        {"tipo": "recibo", "cliente": "João da Silva", "valor": 199.90},
+    ])
+
+class CertificadoLoteBody(BaseModel):
+    participantes: List[str] = Field(..., min_length=1, max_length=10000, example=["Nome do Aluno", "Outro Aluno"])
+    curso: str = Field(..., example="Curso Exemplo")
+    carga_horaria: int = Field(8, ge=1, le=1000)
+    data_conclusao: Optional[str] = Field(None, example="2025-10-08")  # ISO ou dd/mm/aaaa
+    instrutor: Optional[str] = Field(None, example="Fulano de Tal")
+    logo_path: Optional[str] = Field(None, example="https://seusite.com/logo.png")
+
 
 # ========= GET =========
 @app.get("/gerar-pdf")
-def gerar_orcamento_get(
+async def gerar_orcamento_get(
+    request: Request,
     cliente: str = "Cliente Teste",
     servicos: List[str] = Query(["Serviço X"]),
-    valores: List[float] = Query([100.0]),
+    valores: List[Dinheiro] = Query([Decimal("100.00")]),
+    formato: FormatoDoc = FormatoDoc.pdf,
 ):
-    pares = list(zip(servicos, valores))
-    pdf = pdf_bytes(lambda c: draw_orcamento(c, cliente, pares))
-    return stream_pdf(pdf, "orcamento.pdf")
+    pares = list(zip(servicos, map(centavos, valores)))
+    if formato == FormatoDoc.html:
+        return responder_orcamento_html(cliente, pares)
+    return await responder_orcamento(request, cliente, pares)
 
 @app.get("/nota-fiscal")
-def rota_nota_get(
-    numero: str = "0001",
+async def rota_nota_get(
+    request: Request,
     cliente: str = "Cliente Teste",
     servicos: List[str] = Query(["Serviço X"]),
-    valores: List[float] = Query([100.0]),
+    valores: List[Dinheiro] = Query([Decimal("100.00")]),
+    formato: FormatoNota = FormatoNota.pdf,
 ):
-    pares = list(zip(servicos, valores))
-    pdf = pdf_bytes(lambda c: draw_nota(c, numero, cliente, pares))
-    return stream_pdf(pdf, f"nota_{numero}.pdf")
+    pares = list(zip(servicos, map(centavos, valores)))
+    if formato == FormatoNota.html:
+        return responder_nota_html(cliente, pares)
+    perfil_pedido(request)  # ?perfil inválido não pode gastar um número
+    await admissao.admitir(request)  # 429/503 antes de gastar o número
+    numero = await asyncio.to_thread(notas.proximo_formatado)  # pode alugar bloco no SQLite
+    if formato == FormatoNota.escpos:
+        return responder_escpos(f"nota_{numero}.bin", escpos_nota(numero, cliente, pares))
+    return await responder_pdf(request, "nota", f"nota_{numero}.pdf", draw_nota, numero, cliente, pares)
 
 @app.get("/contrato")
-def gerar_contrato_get(cliente: str = "Cliente Teste", descricao: str = "Serviço contratado"):
-    pdf = pdf_bytes(lambda c: draw_contrato(c, cliente, descricao))
-    return stream_pdf(pdf, "contrato.pdf")
+async def gerar_contrato_get(request: Request, cliente: str = "Cliente Teste", descricao: str = "Serviço contratado", formato: FormatoDoc = FormatoDoc.pdf):
+    if formato == FormatoDoc.html:
+        return responder_html("contrato", cliente=cliente, descricao=descricao)
+    return await responder_pdf(request, "contrato", "contrato.pdf", draw_contrato, cliente, descricao)
 
 @app.get("/recibo")
-def gerar_recibo_get(cliente: str = "Cliente Teste", valor: float = 100.0):
-    pdf = pdf_bytes(lambda c: draw_recibo(c, cliente, valor))
-    return stream_pdf(pdf, "recibo.pdf")
+async def gerar_recibo_get(request: Request, cliente: str = "Cliente Teste", valor: Dinheiro = Decimal("100.00"), formato: FormatoDoc = FormatoDoc.pdf):
+    if formato == FormatoDoc.html:
+        return responder_html("recibo", cliente=cliente, valor=brl(centavos(valor)))
+    return await responder_pdf(request, "recibo", "recibo.pdf", draw_recibo, cliente, centavos(valor))
 
 @app.get("/carta")
-def gerar_carta_get(destinatario: str = "Destinatário", mensagem: str = "Mensagem padrão"):
-    pdf = pdf_bytes(lambda c: draw_carta(c, destinatario, mensagem))
-    return stream_pdf(pdf, "carta.pdf")
+async def gerar_carta_get(request: Request, destinatario: str = "Destinatário", mensagem: str = "Mensagem padrão", formato: FormatoDoc = FormatoDoc.pdf):
+    if formato == FormatoDoc.html:
+        return responder_html("carta", destinatario=destinatario, mensagem=mensagem)
+    return await responder_pdf(request, "carta", "carta.pdf", draw_carta, destinatario, mensagem)
 
 @app.get("/certificado", summary="Gera certificado (GET com query params)")
-def gerar_certificado_get(
+async def gerar_certificado_get(
+    request: Request,
     nome: str = "Nome do Aluno",
     curso: str = "Curso Exemplo",
     carga_horaria: int = 8,
     data_conclusao: Optional[str] = None,
     instrutor: Optional[str] = None,
     logo_path: Optional[str] = None,
+    formato: FormatoDoc = FormatoDoc.pdf,
 ):
-    codigo = uuid4().hex[:10].upper()
-    pdf = pdf_bytes(lambda c: draw_certificado(
-        c, nome, curso, carga_horaria, data_conclusao, instrutor, codigo,
-        url_validacao="https://helptech-antunes.vercel.app/validar",
-        logo_path=logo_path
-    ))
-    return stream_pdf(pdf, f"certificado-{codigo}.pdf")
+    if formato == FormatoDoc.html:  # prévia: não emite código no registro
+        return responder_certificado_html(nome, curso, carga_horaria, data_conclusao, instrutor)
+    marcar_validacao(request)
+    perfil = perfil_pedido(request)
+    await admissao.admitir(request)  # 429/503 antes de emitir o código
+    await imagens.precarregar(logo_path)
+    codigo = await asyncio.to_thread(certificados.emitir, nome, curso, carga_horaria, data_conclusao, instrutor)
+    pdf = await render_pdf(
+        draw_certificado, nome, curso, carga_horaria, data_conclusao, instrutor, codigo,
+        url_validacao=URL_VALIDACAO,
+        logo_path=logo_path,
+        perfil=perfil
+    )
+    return stream_pdf(request, pdf, f"certificado-{codigo}.pdf")
 
 
 # ========= POST =========
 @app.post("/orcamento")
-def gerar_orcamento_post(body: OrcamentoBody):
-    pares = [(i.descricao, i.valor) for i in body.itens]
-    pdf = pdf_bytes(lambda c: draw_orcamento(c, body.cliente, pares))
-    return stream_pdf(pdf, "orcamento.pdf")
+async def gerar_orcamento_post(body: OrcamentoBody, request: Request, formato: FormatoDoc = FormatoDoc.pdf):
+    pares = _pares(body.itens)
+    if formato == FormatoDoc.html:
+        return responder_orcamento_html(body.cliente, pares)
+    return await responder_orcamento(request, body.cliente, pares)
 
 @app.post("/nota-fiscal")
-def gerar_nota_post(body: NotaFiscalBody):
-    pares = [(i.descricao, i.valor) for i in body.itens]
-    pdf = pdf_bytes(lambda c: draw_nota(
-        c,
-        body.numero,
+async def gerar_nota_post(body: NotaFiscalBody, request: Request, formato: FormatoNota = FormatoNota.pdf):
+    pares = _pares(body.itens)
+    if formato == FormatoNota.html:
+        return responder_nota_html(body.cliente, pares, body.data)
+    perfil_pedido(request)  # ?perfil inválido não pode gastar um número
+    await admissao.admitir(request)  # 429/503 antes de gastar o número
+    numero = await asyncio.to_thread(notas.proximo_formatado)  # pode alugar bloco no SQLite
+    if formato == FormatoNota.escpos:
+        return responder_escpos(f"nota_{numero}.bin", escpos_nota(numero, body.cliente, pares, body.data))
+    return await responder_pdf(
+        request,
+        "nota",
+        f"nota_{numero}.pdf",
+        draw_nota,
+        numero,
         body.cliente,
         pares,
         body.data
-    ))
-    return stream_pdf(pdf, f"nota_{body.numero}.pdf")
+    )
 
 @app.post("/contrato")
-def gerar_contrato_post(body: ContratoBody):
-    pdf = pdf_bytes(lambda c: draw_contrato(c, body.cliente, body.descricao))
-    return stream_pdf(pdf, "contrato.pdf")
+async def gerar_contrato_post(body: ContratoBody, request: Request, formato: FormatoDoc = FormatoDoc.pdf):
+    if formato == FormatoDoc.html:
+        return responder_html("contrato", cliente=body.cliente, descricao=body.descricao)
+    return await responder_pdf(request, "contrato", "contrato.pdf", draw_contrato, body.cliente, body.descricao)
 
 @app.post("/recibo")
-def gerar_recibo_post(body: ReciboBody):
-    pdf = pdf_bytes(lambda c: draw_recibo(c, body.cliente, body.valor))
-    return stream_pdf(pdf, "recibo.pdf")
+async def gerar_recibo_post(body: ReciboBody, request: Request, formato: FormatoDoc = FormatoDoc.pdf):
+    if formato == FormatoDoc.html:
+        return responder_html("recibo", cliente=body.cliente, valor=brl(centavos(body.valor)))
+    return await responder_pdf(request, "recibo", "recibo.pdf", draw_recibo, body.cliente, centavos(body.valor))
 
 @app.post("/carta")
-def gerar_carta_post(body: CartaBody):
-    pdf = pdf_bytes(lambda c: draw_carta(c, body.destinatario, body.mensagem))
-    return stream_pdf(pdf, "carta.pdf")
+async def gerar_carta_post(body: CartaBody, request: Request, formato: FormatoDoc = FormatoDoc.pdf):
+    if formato == FormatoDoc.html:
+        return responder_html("carta", destinatario=body.destinatario, mensagem=body.mensagem)
+    return await responder_pdf(request, "carta", "carta.pdf", draw_carta, body.destinatario, body.mensagem)
 
 @app.post("/certificado", summary="Gera certificado (POST JSON)")
-def gerar_certificado_post(body: CertificadoBody):
-    codigo = uuid4().hex[:10].upper()
-    pdf = pdf_bytes(lambda c: draw_certificado(
-        c,
+async def gerar_certificado_post(body: CertificadoBody, request: Request, formato: FormatoDoc = FormatoDoc.pdf):
+    if formato == FormatoDoc.html:  # prévia: não emite código no registro
+        return responder_certificado_html(body.nome, body.curso, body.carga_horaria, body.data_conclusao, body.instrutor)
+    marcar_validacao(request)
+    perfil = perfil_pedido(request)
+    await admissao.admitir(request)  # 429/503 antes de emitir o código
+    await imagens.precarregar(body.logo_path)
+    codigo = await asyncio.to_thread(certificados.emitir, body.nome, body.curso, body.carga_horaria, body.data_conclusao, body.instrutor)
+    pdf = await render_pdf(
+        draw_certificado,
         body.nome,
         body.curso,
         body.carga_horaria,
         body.data_conclusao,
         body.instrutor,
         codigo,
-        url_validacao="https://helptech-antunes.vercel.app/validar",
-        logo_path=body.logo_path
-    ))
-    return stream_pdf(pdf, f"certificado-{codigo}.pdf")
+        url_validacao=URL_VALIDACAO,
+        logo_path=body.logo_path,
+        perfil=perfil
+    )
+    return stream_pdf(request, pdf, f"certificado-{codigo}.pdf")
+
+
+# ========= Lote =========
+@app.post("/certificado/lote", summary="Gera certificados em lote (PDF multipágina ou ZIP)")
+async def gerar_certificados_lote(body: CertificadoLoteBody, request: Request, formato: FormatoLote = FormatoLote.pdf):
+    """Um PDF com uma página por participante, ou um ZIP (streaming) com um PDF por pessoa."""
+    perfil = perfil_pedido(request)
+    await admissao.admitir(request)  # 429/503 antes de emitir os códigos
+    await imagens.precarregar(body.logo_path)
+    codigos = await asyncio.to_thread(
+        certificados.emitir_lote, body.participantes, body.curso, body.carga_horaria, body.data_conclusao, body.instrutor
+    )
+    emissoes = list(zip(codigos, body.participantes))
+    extras = {"url_validacao": URL_VALIDACAO, "logo_path": body.logo_path}
+
+    def args(nome, codigo):
+        return (nome, body.curso, body.carga_horaria, body.data_conclusao, body.instrutor, codigo)
+
+    if formato == FormatoLote.pdf:
+        lista = [args(nome, codigo) for codigo, nome in emissoes]
+        arquivo_id, destino = spool.novo("certificados.pdf")
+        await gravar_partes(destino, pdf_costurado(
+            partial(pdf_bytes, draw_paginas, partial(draw_certificado, **extras), lista[i:i + PARALELO_FATIA], perfil=perfil)
+            for i in range(0, len(lista), PARALELO_FATIA)
+        ))
+        return spool.responder(request, arquivo_id)
+    renders = (
+        (f"certificado-{codigo}.pdf", partial(pdf_bytes, draw_certificado, *args(nome, codigo), perfil=perfil, **extras))
+        for codigo, nome in emissoes
+    )
+    return StreamingResponse(
+        zip_stream(render_em_ordem(renders)),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="certificados.zip"'}
+    )
+
+
+@app.get("/arquivos/{arquivo_id}", summary="Retoma o download de um lote PDF (Range)")
+def baixar_arquivo(arquivo_id: str, request: Request):
+    """Serve o lote do spool enquanto ele não expira (SPOOL_TTL); aceita Range/If-Range."""
+    return spool.responder(request, arquivo_id)
+
+
+# ========= Planilha =========
+@app.post("/orcamentos/planilha", summary="Orçamentos em massa: CSV/JSONL → ZIP em streaming")
+async def gerar_orcamentos_planilha(request: Request, formato: Optional[FormatoPlanilha] = None):
+    """CSV/JSONL (cliente, descricao, valor) → ZIP com um orçamento por cliente e manifesto.jsonl dos erros."""
+    formato = formato_do_upload(request, formato)
+    perfil = perfil_pedido(request)
+    arquivo = await receber(request)
+    try:
+        await admissao.admitir(request)  # depois do upload: a vaga é só do render
+    except HTTPException:
+        arquivo.close()
+        raise
+    manifesto = Manifesto()
+    renders = (
+        (nome, partial(pdf_bytes, draw_orcamento, body.cliente, _pares(body.itens), perfil=perfil))
+        for nome, body in orcamentos(arquivo, formato, manifesto, Item, OrcamentoBody)
+    )
+    return StreamingResponse(
+        zip_stream(com_manifesto(render_em_ordem(renders), manifesto)),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="orcamentos.zip"'}
+    )
+
+
+# ========= Validação =========
+@app.get("/validar", summary="Valida o código impresso no certificado")
+def validar_certificado(codigo: str = Query(..., example="A1B2C3D4E5")):
+    cert = certificados.consultar(codigo)
+    if cert is None:
+        return JSONResponse({"valido": False, "codigo": codigo.strip().upper()}, status_code=404)
+    return {
+        "valido": True,
+        "codigo": cert.codigo,
+        "nome": cert.nome,
+        "curso": cert.curso,
+        "carga_horaria": cert.carga_horaria,
+        "data_conclusao": _parse_data(cert.data_conclusao),
+        "instrutor": cert.instrutor,
+        "emitido_em": datetime.fromtimestamp(cert.emitido).isoformat(timespec="seconds"),
+    }
+
+
+# ========= Prévia HTML =========
+def responder_orcamento_html(cliente: str, pares: List[tuple]) -> HTMLResponse:
+    itens, total = tabela(pares)
+    return responder_html("orcamento", cliente=cliente, itens=itens, total=total)
+
+def responder_nota_html(cliente: str, pares: List[tuple], data_str: Optional[str] = None) -> HTMLResponse:
+    """Sem número: a prévia não gasta a sequência (numeracao.py)."""
+    itens, total = tabela(pares)
+    return responder_html("nota", numero=None, cliente=cliente, itens=itens, total=total, data=data_str)
+
+def responder_certificado_html(nome, curso, carga_horaria, data_conclusao, instrutor) -> HTMLResponse:
+    return responder_html(
+        "certificado", nome=nome, curso=curso, carga_horaria=carga_horaria, instrutor=instrutor,
+        data=_parse_data(data_conclusao) or agora().strftime("%d/%m/%Y"), codigo=None, cor="#0E7D32",
+    )
+
+
+# ========= Jobs =========
+
+def _pares(itens: List[Item]) -> List[tuple]:
+    return [(i.descricao, centavos(i.valor)) for i in itens]
+
+def _paginas_texto(texto: str, y: float) -> int:
+    return contar_paginas_texto(contar_linhas(texto or " ", "Helvetica", 12, TEXTO_LARGURA), y, 12 * 1.2)
+
+def _job_nota(b: NotaFiscalBody):
+    numero = notas.proximo_formatado()
+    return f"nota_{numero}.pdf", 1, draw_nota, (numero, b.cliente, _pares(b.itens), b.data)
+
+def _job_certificado(b: CertificadoBody):
+    codigo = certificados.emitir(b.nome, b.curso, b.carga_horaria, b.data_conclusao, b.instrutor)
+    draw_fn = partial(draw_certificado, url_validacao=URL_VALIDACAO, logo_path=b.logo_path)
+    return f"certificado-{codigo}.pdf", 1, draw_fn, (b.nome, b.curso, b.carga_horaria, b.data_conclusao, b.instrutor, codigo)
+
+def _job_certificado_lote(b: CertificadoLoteBody):
+    draw_fn = partial(draw_certificado, url_validacao=URL_VALIDACAO, logo_path=b.logo_path)
+    codigos = certificados.emitir_lote(b.participantes, b.curso, b.carga_horaria, b.data_conclusao, b.instrutor)
+    lista = [
+        (nome, b.curso, b.carga_horaria, b.data_conclusao, b.instrutor, codigo)
+        for nome, codigo in zip(b.participantes, codigos)
+    ]
+    return "certificados.pdf", len(lista), draw_paginas, (draw_fn, lista)
+
+# tipo -> (modelo do body, body validado -> (filename, páginas estimadas, draw_fn, args))
+JOB_TIPOS = {
+    "orcamento": (OrcamentoBody, lambda b: ("orcamento.pdf", contar_paginas(len(b.itens)), draw_orcamento, (b.cliente, _pares(b.itens)))),
+    "nota-fiscal": (NotaFiscalBody, _job_nota),
+    "contrato": (ContratoBody, lambda b: ("contrato.pdf", _paginas_texto(b.descricao, TEXTO_Y), draw_contrato, (b.cliente, b.descricao))),
+    "recibo": (ReciboBody, lambda b: ("recibo.pdf", 1, draw_recibo, (b.cliente, centavos(b.valor)))),
+    "carta": (CartaBody, lambda b: ("carta.pdf", _paginas_texto(b.mensagem, 735), draw_carta, (b.destinatario, b.mensagem))),
+    "certificado": (CertificadoBody, _job_certificado),
+    "certificado-lote": (CertificadoLoteBody, _job_certificado_lote),
+}
+
+@app.post("/jobs/{tipo}", status_code=202, summary="Enfileira documento grande")
+async def criar_job(tipo: str, request: Request, payload: dict = Body(...)):
+    """Acompanhe em GET /jobs/{id} e baixe em GET /jobs/{id}/result."""
+    if tipo not in JOB_TIPOS:
+        raise HTTPException(404, f"Tipo de job desconhecido: {tipo}. Use: {', '.join(JOB_TIPOS)}")
+    modelo, preparar = JOB_TIPOS[tipo]
+    try:
+        body = modelo.model_validate(payload)
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors(include_url=False))
+    perfil = perfil_pedido(request)
+    jobs.verificar_vaga()  # 503 antes de cobrar a ficha, gastar número de nota ou emitir código
+    admissao.cobrar(request)  # a concorrência dos jobs é JOBS_WORKERS; aqui só o limite por cliente
+    # o preparo emite códigos (SQLite, BEGIN IMMEDIATE): fora do event loop
+    filename, paginas, draw_fn, args = await asyncio.to_thread(preparar, body)
+    job = await jobs.submeter(tipo, filename, paginas, pdf_bytes, draw_fn, *args, perfil=perfil)
+    return jobs.status(job)
+
+@app.get("/jobs/{job_id}", summary="Status e progresso do job")
+def status_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Job não encontrado (ou expirado)")
+    return jobs.status(job)
+
+@app.get("/jobs/{job_id}/result", summary="Baixa o PDF do job concluído")
+def resultado_job(job_id: str, request: Request):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Job não encontrado (ou expirado)")
+    if job.status != CONCLUIDO:
+        raise HTTPException(409, f"Job ainda não concluído (status: {job.status})")
+    try:
+        return responder_arquivo(request, job.arquivo, job.filename, etag=f'"{job.id}"')
+    except FileNotFoundError:
+        raise HTTPException(404, "Resultado do job não encontrado (ou expirado)")
+
+
+# ========= Pacote =========
+# tipo -> o mesmo preparo dos jobs (a nota gasta um número, o certificado é emitido); o lote fica de fora
+PACOTE_TIPOS = {tipo: v for tipo, v in JOB_TIPOS.items() if tipo != "certificado-lote"}
+
+@app.post("/pacote")
+async def gerar_pacote(body: PacoteBody, request: Request):
+    """Vários documentos (ex.: orçamento + contrato + recibo) num único PDF, em páginas seguidas.
+
+    Um canvas só: fontes e templates de página entram uma vez no arquivo.
+    Todos os documentos são validados antes de qualquer número ou código ser gasto.
+    """
+    validados, erros = [], []
+    for i, doc in enumerate(body.documentos):
+        tipo = doc.get("tipo")
+        if tipo not in PACOTE_TIPOS:
+            erros.append({"type": "value_error", "loc": ("body", "documentos", i, "tipo"), "input": tipo,
+                          "msg": f"tipo deve ser um de: {', '.join(PACOTE_TIPOS)}"})
+            continue
+        modelo, preparar = PACOTE_TIPOS[tipo]
+        try:
+            validados.append((preparar, modelo.model_validate(doc)))
+        except ValidationError as exc:
+            erros += [{**e, "loc": ("body", "documentos", i, *e["loc"])} for e in exc.errors(include_url=False)]
+    if erros:
+        raise RequestValidationError(erros)
+    perfil_pedido(request)  # ?perfil inválido não pode gastar um número
+    await admissao.admitir(request)
+    for _, b in validados:
+        await imagens.precarregar(getattr(b, "logo_path", None))
+    documentos = [(await asyncio.to_thread(preparar, b))[2:] for preparar, b in validados]  # emite códigos: fora do event loop
+    return await responder_pdf(request, "pacote", "pacote.pdf", draw_pacote, documentos)
+
+
+# ========= Prévia PNG =========
+# tipo -> (modelo do body, body validado -> (draw_fn, args)); sem efeitos colaterais (não gasta número)
+PREVIEW_TIPOS = {
+    "orcamento": (OrcamentoBody, lambda b: (draw_orcamento, (b.cliente, _pares(b.itens)))),
+    "nota-fiscal": (NotaFiscalBody, lambda b: (draw_nota, (PREVIA, b.cliente, _pares(b.itens), b.data))),
+    "contrato": (ContratoBody, lambda b: (draw_contrato, (b.cliente, b.descricao))),
+    "recibo": (ReciboBody, lambda b: (draw_recibo, (b.cliente, centavos(b.valor)))),
+    "carta": (CartaBody, lambda b: (draw_carta, (b.destinatario, b.mensagem))),
+    "certificado": (CertificadoBody, lambda b: (draw_certificado, (b.nome, b.curso, b.carga_horaria, b.data_conclusao, b.instrutor, PREVIA, URL_VALIDACAO, b.logo_path))),
+}
+
+async def responder_preview(request: Request, tipo: str, dados: dict, dpi: Optional[int]):
+    """PNG da 1ª página: do cache de miniaturas (ou 304); senão desenha só a 1ª página e rasteriza."""
+    if tipo not in PREVIEW_TIPOS:
+        raise HTTPException(404, f"Tipo de prévia desconhecido: {tipo}. Use: {', '.join(PREVIEW_TIPOS)}")
+    if not pdfium_disponivel():
+        raise HTTPException(501, "Prévia em PNG indisponível: instale pypdfium2")
+    modelo, preparar = PREVIEW_TIPOS[tipo]
+    try:
+        body = modelo.model_validate(dados)
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors(include_url=False))
+    marcar_validacao(request)
+    await imagens.precarregar(getattr(body, "logo_path", None))
+    draw_fn, args = preparar(body)
+    dpi = dpi or DPI_PADRAO
+    key = chave(tipo, "preview", dpi, fixo(), *args)
+    entrada = previews.get(key)
+    if entrada is None:
+        await admissao.admitir(request)
+        EM_ANDAMENTO.inc()
+        try:
+            png, fases = await executor.run(partial(medido, partial(png_primeira_pagina, draw_fn, *args, dpi=dpi)))
+        finally:
+            EM_ANDAMENTO.dec()
+        registrar_render(fases, len(png))
+        entrada = previews.put(key, png)
+    if etag_confere(request.headers.get("if-none-match"), entrada.etag):
+        return Response(status_code=304, headers={"ETag": entrada.etag})
+    return Response(entrada.pdf, media_type="image/png", headers={"ETag": entrada.etag})
+
+@app.get("/{tipo}/preview", summary="Miniatura PNG da 1ª página (query)")
+async def preview_get(tipo: str, request: Request, dpi: Optional[int] = Query(None, ge=DPI_MIN, le=DPI_MAX)):
+    """Mesmos campos do body do tipo na query; itens como servicos/valores."""
+    modelo = PREVIEW_TIPOS.get(tipo, (None,))[0]
+    dados = dados_da_query(modelo, request.query_params) if modelo else {}
+    return await responder_preview(request, tipo, dados, dpi)
+
+@app.post("/{tipo}/preview", summary="Miniatura PNG da 1ª página (JSON)")
+async def preview_post(tipo: str, request: Request, payload: dict = Body(...), dpi: Optional[int] = Query(None, ge=DPI_MIN, le=DPI_MAX)):
+    return await responder_preview(request, tipo, payload, dpi)
 
 
 # ========= Desenhos =========
@@ -202,151 +671,211 @@ def draw_header(c, titulo: str):
     c.setFont("Helvetica-Bold", 16)
     c.drawString(70, 800, titulo)
     c.setFont("Helvetica", 10)
-    c.drawString(70, 785, f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+    c.drawString(70, 785, f"Gerado em: {agora().strftime('%d/%m/%Y %H:%M')}")
+
+def draw_list_items(c, start_y: int, pares: List[tuple], col_x=70, gap=18, numero=1, subtotal=0, total=True):
+    """pares: (descrição, valor em centavos).
 
-def draw_list_items(c, start_y: int, pares: List[tuple], col_x=70, gap=18):
+    Os valores são formatados uma página por vez: com o canvas incremental
+    (pdf_stream.py) a 1ª página sai sem esperar a lista inteira. `numero` e
+    `subtotal` continuam a contagem e a soma de uma faixa anterior desenhada
+    em outro worker (pdf_paralelo); total=False para antes da linha de Total.
+    """
     y = start_y
-    total = 0.0
+    idx, soma = 0, subtotal
     c.setFont("Helvetica", 12)
-    for idx, (desc, val) in enumerate(pares, start=1):
-        c.drawString(col_x, y, f"{idx}. {desc}")
-        c.drawRightString(540, y, f"R$ {val:.2f}")
-        total += float(val)
-        y -= gap
+    while idx < len(pares):
+        pagina = pares[idx:idx + (y - 80) // gap + 1]  # linhas que cabem até y < 80
+        for (desc, val), texto in zip(pagina, brl_lote([val for _, val in pagina])):
+            c.drawString(col_x, y, f"{numero + idx}. {desc}")
+            c.drawRightString(540, y, f"R$ {texto}")
+            idx += 1
+            soma += val
+            y -= gap
         if y < 80:
             c.showPage()
             y = 800
             c.setFont("Helvetica", 12)
-    c.setFont("Helvetica-Bold", 12)
-    c.drawRightString(540, y - 6, f"Total: R$ {total:.2f}")
-
-def draw_orcamento(c, cliente: str, pares: List[tuple]):
+    if total:
+        c.setFont("Helvetica-Bold", 12)
+        c.drawRightString(540, y - 6, f"Total: R$ {brl(soma)}")
+
+def contar_paginas(n_itens: int, start_y: int = 730, gap: int = 18) -> int:
+    """Quantas páginas draw_list_items gera para n_itens (quebra quando y < 80)."""
+    primeira = (start_y - 80) // gap + 1
+    demais = (800 - 80) // gap + 1
+    return 1 if n_itens < primeira else 2 + (n_itens - primeira) // demais
+
+def draw_orcamento(c, cliente: str, pares: List[tuple], numero=1, subtotal=0, total=True):
+    """numero/subtotal/total: só para as faixas de faixas_orcamento (cabeçalho só na faixa do item 1)."""
+    if numero > 1:
+        draw_list_items(c, start_y=800, pares=pares, numero=numero, subtotal=subtotal, total=total)
+        return
     draw_header(c, "Orçamento")
     c.setFont("Helvetica", 12)
     c.drawString(70, 760, f"Cliente: {cliente}")
-    draw_list_items(c, start_y=730, pares=pares)
+    draw_list_items(c, start_y=730, pares=pares, total=total)
+
+def faixas_orcamento(cliente: str, pares: List[tuple], paginas_por_faixa: int = PARALELO_FATIA):
+    """(draw_orcamento, args) por faixa de páginas, para pdf_paralelo.
+
+    Cada página tem um número fixo de linhas (o mesmo cálculo de
+    contar_paginas), então o 1º item de cada faixa sai da conta; o subtotal
+    até ali é a soma de prefixo dos valores.
+    """
+    primeira = (730 - 80) // 18 + 1
+    demais = (800 - 80) // 18 + 1
+    paginas = contar_paginas(len(pares))
+    inicio = subtotal = 0
+    for pagina in range(0, paginas, paginas_por_faixa):
+        ultima = min(pagina + paginas_por_faixa, paginas)
+        fim = min(len(pares), primeira + (ultima - 1) * demais)
+        faixa = pares[inicio:fim]
+        yield draw_orcamento, (cliente, faixa, inicio + 1, subtotal, ultima == paginas)
+        subtotal += sum(val for _, val in faixa)
+        inicio = fim
+
+
+# ======= Templates (partes estáticas, gravadas uma vez por processo) =======
+NOTA_LARGURA, NOTA_ALTURA = 80 * mm, 250 * mm
+NOTA_TOPO = 49     # altura do cabeçalho fixo da nota
+NOTA_RODAPE = 56   # altura do rodapé legal (linha + 5 linhas de texto)
+
+CUPOM_TOPO = (
+    Texto("HELPTECH ANTUNES", "centro", "Helvetica-Bold", 10, avanco=10),
+    Texto("Assistência Técnica e Serviços", "centro"),
+    Texto("Rua Mariano Floripa Prudente 108 – Jundiaí/SP", "centro"),
+    Texto("CPF:400.187.518/73 | (11) 95780-5217", "centro"),
+    Linha(),
+)
+
+CUPOM_RODAPE = (
+    Linha(avanco=8),
+    Texto("Comete crime quem sonega", tamanho=7),
+    Texto("ICMS conforme LC 123/2006 - Simples Nacional.", tamanho=7),
+    Texto("Documento emitido por ME e EPP optante.", tamanho=7),
+    Texto("Valor aprox. dos tributos: R$ 14,61*", tamanho=7),
+    Texto("Conforme Lei Fed. 12.741/2012 – Fonte IBPT", tamanho=7),
+)
+
+@template("nf_nota_topo", bbox=(0, -NOTA_TOPO, NOTA_LARGURA, 12))
+def _nota_topo(c):
+    """Cabeçalho da empresa no cupom, desenhado a partir de y=0 para baixo."""
+    desenhar_pdf(c, CUPOM_TOPO, 0)
+
+@template("nf_nota_rodape", bbox=(0, -NOTA_RODAPE, NOTA_LARGURA, 1))
+def _nota_rodape(c):
+    """Observações legais do cupom, desenhadas a partir de y=0 para baixo."""
+    desenhar_pdf(c, CUPOM_RODAPE, 0)
+
+@template("nf_cert_fundo", bbox=(0, 0) + landscape(A4))
+def _cert_fundo(c, camada: str = "tudo"):
+    """Fundo, moldura, títulos, linhas de assinatura e rodapé do certificado.
+
+    Com logo o carimbo sai em duas camadas, "fundo" (fundo e moldura) e
+    "textos" (o resto), e o logo fica entre elas, abaixo do título.
+    """
+    largura, altura = landscape(A4)
+
+    if camada != "textos":
+        # Fundo verde HelpTech
+        c.setFillColor(colors.HexColor("#0E7D32"))
+        c.rect(0, 0, largura, altura, fill=1, stroke=0)
+
+        # Faixa branca
+        c.setFillColor(colors.whitesmoke)
+        c.roundRect(40, 40, largura - 80, altura - 80, 20, fill=1, stroke=0)
+
+        # Moldura
+        c.setStrokeColor(colors.HexColor("#1B5E20"))
+        c.setLineWidth(3)
+        c.roundRect(50, 50, largura - 100, altura - 100, 15, fill=0, stroke=1)
+    if camada == "fundo":
+        return
+    if camada == "textos":
+        c.setStrokeColor(colors.HexColor("#1B5E20"))  # as linhas de assinatura usam o verde da moldura
+
+    # Título
+    c.setFillColor(colors.HexColor("#0E7D32"))
+    c.setFont("Helvetica-Bold", 38)
+    c.drawCentredString(largura / 2, altura - 120, "CERTIFICADO")
+    c.setFont("Helvetica", 16)
+    c.setFillColor(colors.black)
+    c.drawCentredString(largura / 2, altura - 160, "DE CONCLUSÃO")
+
+    # Assinaturas
+    c.setLineWidth(0.8)
+    c.line(largura/3 - 90, 110, largura/3 + 90, 110)
+    c.line(2*largura/3 - 90, 110, 2*largura/3 + 90, 110)
+    c.setFont("Helvetica", 10)
+    c.drawCentredString(largura/3, 95, "Assinatura da Instituição")
+    c.drawCentredString(2*largura/3, 95, "Assinatura do(a) Instrutor(a)")
+
+    # Rodapé
+    c.setFont("Helvetica-Oblique", 9)
+    c.setFillColor(colors.grey)
+    c.drawCentredString(largura / 2, 60, "Emitido automaticamente por HelpTech Antunes – helptechantunes.com")
 
 
 # ======= Nota (Cupom 80mm) =======
+def layout_nota(numero: str, cliente: str, pares: List[tuple]) -> list:
+    """Descrição única do cupom, usada tanto no PDF quanto no ESC/POS."""
+    valores = [val for _, val in pares]
+    total = sum(valores)
+    elementos = [
+        Estatico("nf_nota_topo", CUPOM_TOPO, avanco=NOTA_TOPO),
+        Texto(f"Extrato No. {numero} do CUPOM FISCAL ELETRÔNICO - SAT", fonte="Helvetica-Bold", avanco=10),
+        Linha(),
+        Colunas("#  DESC", "VL ITEM R$", fonte="Helvetica-Bold"),
+        Linha(avanco=8),
+    ]
+    elementos += [
+        Colunas(f"{i:03d}  {desc[:20]}", texto)
+        for i, ((desc, _), texto) in enumerate(zip(pares, brl_lote(valores)), start=1)
+    ]
+    elementos += [
+        Linha(),
+        Colunas("Total bruto de itens", brl(total)),
+        Colunas("Total R$", brl(total), avanco=12, fonte_dir="Helvetica-Bold", tamanho_dir=9),
+        Texto("Dinheiro", avanco=12),
+        Estatico("nf_nota_rodape", CUPOM_RODAPE, avanco=NOTA_RODAPE),
+        Barras(numero[:15]),
+        QR(f"NF {numero} - Cliente: {cliente} - Total: R$ {decimal_str(total)}"),
+        Texto("Desenvolvido por: HelpTech Antunes", "centro", tamanho=7),
+    ]
+    return elementos
+
 def draw_nota(c, numero: str, cliente: str, pares: List[tuple], data_str: Optional[str] = None):
     """Desenha uma nota fiscal no formato cupom térmico (80mm)."""
-    largura = 80 * mm
-    altura = 250 * mm
-    x_margin = 6 * mm
-    y = altura - 8 * mm
+    c.setPageSize((NOTA_LARGURA, NOTA_ALTURA))
+    desenhar_pdf(c, layout_nota(numero, cliente, pares), NOTA_ALTURA - 8 * mm)
 
-    c.setPageSize((largura, altura))
+def escpos_nota(numero: str, cliente: str, pares: List[tuple], data_str: Optional[str] = None) -> bytes:
+    """Mesmo cupom em ESC/POS cru, para mandar direto à impressora térmica."""
+    return escpos(layout_nota(numero, cliente, pares))
 
-    # Cabeçalho
-    c.setFont("Helvetica-Bold", 10)
-    c.drawCentredString(largura / 2, y, "HELPTECH ANTUNES")
-    y -= 10
-    c.setFont("Helvetica", 8)
-    c.drawCentredString(largura / 2, y, "Assistência Técnica e Serviços")
-    y -= 9
-    c.drawCentredString(largura / 2, y, "Rua Mariano Floripa Prudente 108 – Jundiaí/SP")
-    y -= 9
-    c.drawCentredString(largura / 2, y, "CPF:400.187.518/73 | (11) 95780-5217")
-    y -= 9
-    c.line(x_margin, y, largura - x_margin, y)
-    y -= 12
-
-    c.setFont("Helvetica-Bold", 8)
-    c.drawString(x_margin, y, f"Extrato No. {numero} do CUPOM FISCAL ELETRÔNICO - SAT")
-    y -= 10
-    c.line(x_margin, y, largura - x_margin, y)
-    y -= 10
-
-    # Itens
-    c.setFont("Helvetica-Bold", 8)
-    c.drawString(x_margin, y, "#  DESC")
-    c.drawRightString(largura - x_margin, y, "VL ITEM R$")
-    y -= 9
-    c.line(x_margin, y, largura - x_margin, y)
-    y -= 8
-
-    total = 0.0
-    c.setFont("Helvetica", 8)
-    for i, (desc, val) in enumerate(pares, start=1):
-        c.drawString(x_margin, y, f"{i:03d}  {desc[:20]}")
-        c.drawRightString(largura - x_margin, y, f"{val:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-        total += float(val)
-        y -= 9
-
-    c.line(x_margin, y, largura - x_margin, y)
-    y -= 10
-
-    # Totais
-    c.drawString(x_margin, y, "Total bruto de itens")
-    c.drawRightString(largura - x_margin, y, f"{total:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-    y -= 9
-    c.drawString(x_margin, y, "Total R$")
-    c.setFont("Helvetica-Bold", 9)
-    c.drawRightString(largura - x_margin, y, f"{total:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-    y -= 12
-    c.setFont("Helvetica", 8)
-    c.drawString(x_margin, y, "Dinheiro")
-    y -= 12
-
-    # Observações
-    c.line(x_margin, y, largura - x_margin, y)
-    y -= 8
-    c.setFont("Helvetica", 7)
-    c.drawString(x_margin, y, "Comete crime quem sonega")
-    y -= 9
-    c.drawString(x_margin, y, "ICMS conforme LC 123/2006 - Simples Nacional.")
-    y -= 9
-    c.drawString(x_margin, y, "Documento emitido por ME e EPP optante.")
-    y -= 9
-    c.drawString(x_margin, y, "Valor aprox. dos tributos: R$ 14,61*")
-    y -= 9
-    c.drawString(x_margin, y, "Conforme Lei Fed. 12.741/2012 – Fonte IBPT")
-    y -= 12
-
-    # Código de barras
-    barcode = code128.Code128(numero[:15], barHeight=8 * mm, barWidth=0.35)
-    barcode.drawOn(c, x_margin, y - 8)
-    y -= 16
-
-    # QR Code
-    qr_data = f"NF {numero} - Cliente: {cliente} - Total: R$ {total:.2f}"
-    qr_code = qr.QrCodeWidget(qr_data)
-    bounds = qr_code.getBounds()
-    size = 28 * mm
-    w, h = bounds[2] - bounds[0], bounds[3] - bounds[1]
-    d = Drawing(size, size, transform=[size / w, 0, 0, size / h, 0, 0])
-    d.add(qr_code)
-    renderPDF.draw(d, c, largura / 2 - size / 2, y - size)
-    y -= size + 6
-
-    c.setFont("Helvetica", 7)
-    c.drawCentredString(largura / 2, y, "Desenvolvido por: HelpTech Antunes")
 
+TEXTO_X, TEXTO_LARGURA = 70, 470  # corpo de texto de 70 a 540, alinhado com os valores do orçamento
+TEXTO_Y = 735 - 2 * 14.4          # abaixo do rótulo + uma linha em branco
 
 def draw_contrato(c, cliente: str, descricao: str):
     draw_header(c, "Contrato de Prestação de Serviços")
     c.setFont("Helvetica", 12)
     c.drawString(70, 760, f"Cliente: {cliente}")
-    text = c.beginText(70, 735)
-    text.setFont("Helvetica", 12)
-    text.textLines(["Descrição do serviço:", "", descricao])
-    c.drawText(text)
+    c.drawString(70, 735, "Descrição do serviço:")
+    desenhar_texto(c, descricao, TEXTO_X, TEXTO_Y, TEXTO_LARGURA)
 
-def draw_recibo(c, cliente: str, valor: float):
+def draw_recibo(c, cliente: str, valor: int):
     draw_header(c, "Recibo")
     c.setFont("Helvetica", 12)
     c.drawString(70, 760, f"Recebemos de: {cliente}")
-    c.drawString(70, 742, f"Valor: R$ {valor:.2f}")
+    c.drawString(70, 742, f"Valor: R$ {brl(valor)}")
 
 def draw_carta(c, destinatario: str, mensagem: str):
     draw_header(c, "Carta")
     c.setFont("Helvetica", 12)
     c.drawString(70, 760, f"Para: {destinatario}")
-    text = c.beginText(70, 735)
-    text.setFont("Helvetica", 12)
-    for line in (mensagem.splitlines() or ["Mensagem vazia."]):
-        text.textLine(line)
-    c.drawText(text)
+    desenhar_texto(c, mensagem or "Mensagem vazia.", TEXTO_X, 735, TEXTO_LARGURA, justificar=False)
 
 # ========= Certificado Estilizado =========
 def _parse_data(data_conclusao: Optional[str]) -> Optional[str]:
@@ -379,35 +908,17 @@ def draw_certificado(
     largura, altura = landscape(A4)
     c.setPageSize((largura, altura))
 
-    # Fundo verde HelpTech
-    c.setFillColor(colors.HexColor("#0E7D32"))
-    c.rect(0, 0, largura, altura, fill=1, stroke=0)
-
-    # Faixa branca
-    c.setFillColor(colors.whitesmoke)
-    c.roundRect(40, 40, largura - 80, altura - 80, 20, fill=1, stroke=0)
-
-    # Moldura
-    c.setStrokeColor(colors.HexColor("#1B5E20"))
-    c.setLineWidth(3)
-    c.roundRect(50, 50, largura - 100, altura - 100, 15, fill=0, stroke=1)
-
-    # Logo (opcional)
-    if logo_path:
-        try:
-            c.drawImage(logo_path, 70, altura - 160, width=180, height=70, preserveAspectRatio=True, mask='auto')
-        except Exception:
-            pass
-
-    # Título
-    c.setFillColor(colors.HexColor("#0E7D32"))
-    c.setFont("Helvetica-Bold", 38)
-    c.drawCentredString(largura / 2, altura - 120, "CERTIFICADO")
-    c.setFont("Helvetica", 16)
-    c.setFillColor(colors.black)
-    c.drawCentredString(largura / 2, altura - 160, "DE CONCLUSÃO")
+    # Fundo, moldura, títulos e assinaturas; o logo (opcional) vai entre a moldura e o título
+    logo = imagens.obter(logo_path) if logo_path else None
+    if logo is None:
+        stamp(c, "nf_cert_fundo")
+    else:
+        stamp(c, "nf_cert_fundo", "fundo")
+        c.drawImage(logo, 70, altura - 160, width=180, height=70, preserveAspectRatio=True, mask='auto')
+        stamp(c, "nf_cert_fundo", "textos")
 
     # Texto principal
+    c.setFillColor(colors.black)
     c.setFont("Helvetica", 14)
     bloco = [
         f"Certificamos que {nome}, concluiu com êxito o curso",
@@ -420,21 +931,13 @@ def draw_certificado(
         y -= 22
 
     # Data / Instrutor
-    data_fmt = _parse_data(data_conclusao) or datetime.now().strftime("%d/%m/%Y")
+    data_fmt = _parse_data(data_conclusao) or agora().strftime("%d/%m/%Y")
     c.setFont("Helvetica-Oblique", 12)
     c.drawCentredString(largura / 2, 170, f"Jundiaí, {data_fmt}")
     if instrutor:
         c.setFont("Helvetica", 12)
         c.drawCentredString(largura / 2, 150, f"Instrutor(a): {instrutor}")
 
-    # Assinaturas
-    c.setLineWidth(0.8)
-    c.line(largura/3 - 90, 110, largura/3 + 90, 110)
-    c.line(2*largura/3 - 90, 110, 2*largura/3 + 90, 110)
-    c.setFont("Helvetica", 10)
-    c.drawCentredString(largura/3, 95, "Assinatura da Instituição")
-    c.drawCentredString(2*largura/3, 95, "Assinatura do(a) Instrutor(a)")
-
     # Código e QR
     c.setFont("Helvetica", 10)
     c.drawString(70, 80, f"Código de verificação: {codigo}")
@@ -444,15 +947,4 @@ def draw_certificado(
     else:
         qr_text = f"Certificado: {nome} | Curso: {curso} | Código: {codigo}"
 
-    qr_code = qr.QrCodeWidget(qr_text)
-    bounds = qr_code.getBounds()
-    size = 65
-    w, h = bounds[2] - bounds[0], bounds[3] - bounds[1]
-    d = Drawing(size, size, transform=[size / w, 0, 0, size / h, 0, 0])
-    d.add(qr_code)
-    renderPDF.draw(d, c, largura - 120, 80)
-
-    # Rodapé
-    c.setFont("Helvetica-Oblique", 9)
-    c.setFillColor(colors.grey)
-    c.drawCentredString(largura / 2, 60, "Emitido automaticamente por HelpTech Antunes – helptechantunes.com")
+    draw_qr(c, qr_text, largura - 120, 80, 65)
@@ -0,0 +1,236 @@
+"""Métricas no formato texto do Prometheus, sem dependências externas.
+
+Expostas em GET /metrics:
+    http_request_duration_seconds{rota,metodo,status}   histograma por rota
+    pdf_fase_duration_seconds{fase,rota}                validacao, desenho, codigos
+                                                        (QR/código de barras),
+                                                        serializacao (canvas.save),
+                                                        rasterizacao (miniatura PNG),
+                                                        fila (espera por vaga, admissao.py)
+                                                        e streaming da resposta
+    pdf_tamanho_bytes{rota}                             histograma do tamanho do PDF
+    pdf_renders_em_andamento                            gauge de renders em voo
+    pdf_cache{campo}                                    hits, misses, bytes... do cache
+    pdf_admissao{campo}                                 vagas em uso, fila e rejeições (admissao.py)
+    modulo_lazy_import_seconds{modulo}                  custo de cada import adiado (lazy.py)
+
+As fases de desenho/códigos/serialização acontecem dentro do executor
+(possivelmente em outro processo): o worker cronometra com `cronometro()`
+dentro de `coletar_fases()` e devolve os tempos junto com o PDF via
+`medido()`; o processo da API registra no histograma.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+LATENCIA_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(9))  # 1 KiB .. 64 MiB
+
+rota_atual: ContextVar[str] = ContextVar("rota_atual", default="-")
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(nomes, valores) -> str:
+    if not nomes:
+        return ""
+    return "{" + ",".join(f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)) + "}"
+
+
+def _num(v) -> str:
+    return "+Inf" if v == float("inf") else repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nome: str, ajuda: str, rotulos=()):
+        self.nome, self.ajuda, self.rotulos = nome, ajuda, tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def _cabecalho(self):
+        return [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+
+
+class Counter(_Metrica):
+    tipo = "counter"
+
+    def inc(self, *rotulos, valor: float = 1):
+        with self._lock:
+            self._valores[rotulos] = self._valores.get(rotulos, 0) + valor
+
+    def exportar(self):
+        with self._lock:
+            itens = list(self._valores.items())
+        return self._cabecalho() + [f"{self.nome}{_rotulos(self.rotulos, r)} {_num(v)}" for r, v in itens]
+
+
+class Gauge(Counter):
+    tipo = "gauge"
+
+    def dec(self, *rotulos, valor: float = 1):
+        self.inc(*rotulos, valor=-valor)
+
+    def set(self, *rotulos, valor: float):
+        with self._lock:
+            self._valores[rotulos] = valor
+
+
+class Histogram(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=LATENCIA_BUCKETS):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, *rotulos, valor: float):
+        with self._lock:
+            contagens, soma = self._valores.get(rotulos) or ([0] * len(self.buckets), 0.0)
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    contagens[i] += 1
+                    break
+            self._valores[rotulos] = (contagens, soma + valor)
+
+    def exportar(self):
+        linhas = self._cabecalho()
+        with self._lock:
+            itens = [(r, list(c), s) for r, (c, s) in self._valores.items()]
+        for rotulos, contagens, soma in itens:
+            acumulado = 0
+            for limite, n in zip(self.buckets, contagens):
+                acumulado += n
+                rot = _rotulos(self.rotulos + ("le",), rotulos + (_num(limite),))
+                linhas.append(f"{self.nome}_bucket{rot} {acumulado}")
+            rot = _rotulos(self.rotulos, rotulos)
+            linhas.append(f"{self.nome}_sum{rot} {_num(soma)}")
+            linhas.append(f"{self.nome}_count{rot} {acumulado}")
+        return linhas
+
+
+class Registro:
+    def __init__(self):
+        self._metricas = []
+
+    def registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def exportar(self) -> str:
+        linhas = []
+        for m in self._metricas:
+            linhas.extend(m.exportar())
+        return "\n".join(linhas) + "\n"
+
+
+registro = Registro()
+
+LATENCIA = registro.registrar(Histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP por rota.", ("rota", "metodo", "status")))
+FASES = registro.registrar(Histogram(
+    "pdf_fase_duration_seconds", "Tempo por fase da geração de PDF.", ("fase", "rota")))
+TAMANHO = registro.registrar(Histogram(
+    "pdf_tamanho_bytes", "Tamanho dos PDFs gerados.", ("rota",), buckets=BYTES_BUCKETS))
+EM_ANDAMENTO = registro.registrar(Gauge(
+    "pdf_renders_em_andamento", "Renderizações de PDF em execução no executor."))
+CACHE = registro.registrar(Gauge(
+    "pdf_cache", "Estado do cache de PDFs (atualizado a cada coleta).", ("campo",)))
+ADMISSAO = registro.registrar(Gauge(
+    "pdf_admissao", "Controle de admissão dos renders (atualizado a cada coleta).", ("campo",)))
+IMPORTS = registro.registrar(Gauge(
+    "modulo_lazy_import_seconds", "Tempo do import preguiçoso de cada módulo pesado.", ("modulo",)))
+
+
+# ---------- lado do worker ----------
+_local = threading.local()
+
+
+@contextmanager
+def coletar_fases():
+    """Ativa a coleta de fases na thread atual e entrega o dict acumulado."""
+    fases = {}
+    anterior = getattr(_local, "fases", None)
+    _local.fases = fases
+    try:
+        yield fases
+    finally:
+        _local.fases = anterior
+
+
+@contextmanager
+def cronometro(fase: str):
+    """Soma o tempo do bloco em `fase` se houver coleta ativa (senão, custo ~zero)."""
+    fases = getattr(_local, "fases", None)
+    if fases is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        fases[fase] = fases.get(fase, 0.0) + time.perf_counter() - t0
+
+
+def medido(fn):
+    """Executa fn() coletando fases; devolve (resultado, fases). Piclável para o executor."""
+    with coletar_fases() as fases:
+        resultado = fn()
+    if "desenho" in fases and "codigos" in fases:
+        fases["desenho"] = max(fases["desenho"] - fases["codigos"], 0.0)
+    return resultado, fases
+
+
+def registrar_render(fases: dict, tamanho: int):
+    rota = rota_atual.get()
+    for fase, segundos in fases.items():
+        FASES.observe(fase, rota, valor=segundos)
+    TAMANHO.observe(rota, valor=tamanho)
+
+
+# ---------- lado da API ----------
+class MetricsMiddleware:
+    """Middleware ASGI: latência total por rota e, nas rotas de PDF, tempo de streaming do corpo."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+        scope.setdefault("state", {})["t_inicio"] = t0
+        estado = {"status": 500, "inicio_corpo": None, "fim_corpo": None}
+
+        async def enviar(msg):
+            if msg["type"] == "http.response.start":
+                estado["status"] = msg["status"]
+                estado["inicio_corpo"] = time.perf_counter()
+            elif msg["type"] == "http.response.body" and not msg.get("more_body"):
+                await send(msg)
+                estado["fim_corpo"] = time.perf_counter()
+                return
+            await send(msg)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            route = scope.get("route")
+            rota = getattr(route, "path", "nao_encontrada")
+            LATENCIA.observe(rota, scope["method"], estado["status"], valor=time.perf_counter() - t0)
+            if scope["state"].get("pdf") and estado["fim_corpo"] and estado["status"] == 200:
+                FASES.observe("streaming", rota, valor=estado["fim_corpo"] - estado["inicio_corpo"])
+
+
+def marcar_validacao(request):
+    """Chamado na entrada do handler: leitura + validação do body = agora - início da requisição."""
+    rota = getattr(request.scope.get("route"), "path", "-")
+    rota_atual.set(rota)
+    estado = request.scope.setdefault("state", {})
+    estado["pdf"] = True
+    t0 = estado.get("t_inicio")
+    if t0 is not None:
+        FASES.observe("validacao", rota, valor=time.perf_counter() - t0)
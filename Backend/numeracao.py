@@ -0,0 +1,115 @@
+"""Numeração das notas alocada pelo servidor, correta com vários workers.
+
+O número vinha do cliente (padrão "0001") e repetia. Agora sai de uma
+sequência em SQLite (NOTAS_DB) compartilhada pelos processos do uvicorn:
+
+- cada processo aluga um bloco de NOTAS_BLOCO números numa transação
+  (BEGIN IMMEDIATE trava o arquivo só durante o aluguel) e distribui o
+  bloco em memória, sem I/O por requisição;
+- no shutdown o que sobrou do bloco volta para a tabela `livres` e é
+  alugado de novo antes de avançar a sequência, então com desligamento
+  normal os números emitidos não têm buracos;
+- se o processo morrer sem shutdown, o resto do bloco fica sem uso (até
+  NOTAS_BLOCO - 1 números). NOTAS_BLOCO=1 elimina isso ao custo de uma
+  transação por nota.
+
+Entre workers a ordem é por bloco, não global: o worker A pode emitir
+0001, 0002 enquanto B emite 0101.
+
+    NOTAS_DB      caminho do SQLite (padrão tmp/helptech-notas.sqlite3)
+    NOTAS_BLOCO   números por aluguel (padrão 100)
+    NOTAS_INICIO  primeiro número de uma sequência nova (padrão 1)
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import Optional
+
+
+class SequenciaNotas:
+    def __init__(self, db: str = None, bloco: int = None, inicio: int = None, nome: str = "nota"):
+        self.caminho = db or os.getenv("NOTAS_DB") or os.path.join(tempfile.gettempdir(), "helptech-notas.sqlite3")
+        self.bloco = max(1, bloco or int(os.getenv("NOTAS_BLOCO", 100)))
+        self.inicio = inicio if inicio is not None else int(os.getenv("NOTAS_INICIO", 1))
+        self.nome = nome
+        self._db: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._proximo = self._fim = 0  # bloco atual: [proximo, fim)
+        self._lock = threading.Lock()
+        self.alugueis = 0
+
+    # ----- banco -----
+    def _conexao(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():  # filho de fork: não herda conexão nem bloco do pai
+            self._db, self._pid = None, os.getpid()
+            self._proximo = self._fim = 0
+        if self._db is None:
+            db = sqlite3.connect(self.caminho, check_same_thread=False, isolation_level=None, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS sequencia (nome TEXT PRIMARY KEY, proximo INTEGER NOT NULL)")
+            db.execute("CREATE TABLE IF NOT EXISTS livres (nome TEXT NOT NULL, inicio INTEGER NOT NULL, fim INTEGER NOT NULL)")
+            self._db = db
+        return self._db
+
+    def _alugar(self):
+        """Pega o menor intervalo devolvido ou avança a sequência em `bloco`."""
+        db = self._conexao()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            livre = db.execute(
+                "SELECT rowid, inicio, fim FROM livres WHERE nome = ? ORDER BY inicio LIMIT 1", (self.nome,)).fetchone()
+            if livre:
+                rowid, inicio, fim = livre
+                if fim - inicio > self.bloco:
+                    db.execute("UPDATE livres SET inicio = ? WHERE rowid = ?", (inicio + self.bloco, rowid))
+                    fim = inicio + self.bloco
+                else:
+                    db.execute("DELETE FROM livres WHERE rowid = ?", (rowid,))
+            else:
+                db.execute("INSERT OR IGNORE INTO sequencia (nome, proximo) VALUES (?, ?)", (self.nome, self.inicio))
+                inicio = db.execute("SELECT proximo FROM sequencia WHERE nome = ?", (self.nome,)).fetchone()[0]
+                fim = inicio + self.bloco
+                db.execute("UPDATE sequencia SET proximo = ? WHERE nome = ?", (fim, self.nome))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        self._proximo, self._fim = inicio, fim
+        self.alugueis += 1
+
+    # ----- API -----
+    def proximo(self) -> int:
+        with self._lock:
+            if self._pid != os.getpid() or self._proximo >= self._fim:
+                self._alugar()
+            n = self._proximo
+            self._proximo += 1
+            return n
+
+    def proximo_formatado(self) -> str:
+        """Número no formato impresso na nota (4 dígitos, cresce além de 9999)."""
+        return f"{self.proximo():04d}"
+
+    def devolver(self):
+        """Devolve o resto do bloco (shutdown) para outro processo usar."""
+        with self._lock:
+            if self._pid != os.getpid() or self._proximo >= self._fim:
+                return
+            db = self._conexao()
+            db.execute("INSERT INTO livres (nome, inicio, fim) VALUES (?, ?, ?)", (self.nome, self._proximo, self._fim))
+            self._proximo = self._fim = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"bloco": self.bloco, "restantes": max(self._fim - self._proximo, 0), "alugueis": self.alugueis}
+
+    def fechar(self):
+        self.devolver()
+        with self._lock:
+            if self._db is not None and self._pid == os.getpid():
+                self._db.close()
+            self._db = None
+
+
+notas = SequenciaNotas()
@@ -0,0 +1,89 @@
+"""Templates de página (form XObjects) para as partes estáticas dos documentos.
+
+Cabeçalhos de nota, rodapés legais e fundos de certificado são sempre
+iguais. Cada template é gravado uma vez por processo (por combinação de
+parâmetros, ex.: modelo + cor do certificado) num canvas descartável; o
+que fica em cache é só o stream de operadores. Em cada documento novo o
+stream vira um form XObject, definido uma única vez por canvas e carimbado
+com "Do" em quantas páginas precisar.
+
+Os nomes internos de fonte (/F1, /F2...) dependem da ordem de uso em cada
+documento, por isso o stream é guardado com as fontes separadas e os nomes
+são resolvidos no documento de destino na hora de definir o form.
+
+Uso:
+    @template("nota_topo", bbox=(0, 0, 80 * mm, 250 * mm))
+    def _nota_topo(c): ...
+
+    stamp(c, "nota_topo")                  # em (0, 0)
+    stamp(c, "cert_fundo", modelo, cor)    # parâmetros fazem parte da chave
+"""
+import hashlib
+import re
+from functools import lru_cache
+from io import BytesIO
+
+from lazy import modulo
+
+canvas = modulo("reportlab.pdfgen.canvas")
+_FONTE = re.compile(r"(/F\d+) ")
+
+_registro = {}
+
+
+def template(nome: str, bbox):
+    """Registra uma função de desenho estática como template de página."""
+    def registrar(draw_fn):
+        anterior = _registro.get(nome)
+        if anterior and (anterior[0].__module__, anterior[0].__qualname__) != (draw_fn.__module__, draw_fn.__qualname__):
+            raise ValueError(f"template já registrado: {nome!r}")
+        _registro[nome] = (draw_fn, tuple(bbox))
+        _gravar.cache_clear()  # módulo recarregado (--reload) redefine o template
+        return draw_fn
+    return registrar
+
+
+@lru_cache(maxsize=128)
+def _gravar(nome: str, params: tuple):
+    """Desenha o template num canvas descartável e devolve o stream compilado."""
+    draw_fn, (x0, y0, x1, y1) = _registro[nome]
+    rascunho = canvas.Canvas(BytesIO(), pagesize=(x1, y1))
+    draw_fn(rascunho, *params)
+    ops = "\n".join(rascunho._code)
+    ps_por_interno = {v: k for k, v in rascunho._doc.fontMapping.items()}
+    # partes pares: texto literal; ímpares: nome PostScript da fonte
+    partes = _FONTE.split(ops)
+    for i in range(1, len(partes), 2):
+        partes[i] = ps_por_interno[partes[i]]
+    chave = repr((nome, params)).encode("utf-8")
+    form = "TPL" + hashlib.sha1(chave).hexdigest()[:10]
+    return form, (x0, y0, x1, y1), tuple(partes)
+
+
+def _definir(c, form: str, bbox, partes):
+    fontes = {}
+    ops = []
+    for i, parte in enumerate(partes):
+        if i % 2:
+            if parte not in fontes:
+                fontes[parte] = c._doc.getInternalFontName(parte)
+            ops.append(fontes[parte] + " ")
+        else:
+            ops.append(parte)
+    c.beginForm(form, *bbox)
+    c._code.append("".join(ops))
+    c.endForm()
+
+
+def stamp(c, nome: str, *params, x: float = 0, y: float = 0):
+    """Carimba o template `nome` (com `params`) no canvas, deslocado de (x, y)."""
+    form, bbox, partes = _gravar(nome, params)
+    if not c.hasForm(form):
+        _definir(c, form, bbox, partes)
+    if x or y:
+        c.saveState()
+        c.translate(x, y)
+        c.doForm(form)
+        c.restoreState()
+    else:
+        c.doForm(form)
@@ -0,0 +1,105 @@
+"""Cache LRU de PDFs renderizados, endereçado pelo conteúdo da entrada.
+
+A chave é o tipo do documento + hash canônico dos argumentos validados;
+a entrada guarda os bytes e um ETag forte (hash dos bytes). O despejo é
+por tamanho total em bytes e por TTL:
+
+    PDF_CACHE_MAX_BYTES   limite total (padrão 64 MiB, 0 desliga o cache)
+    PDF_CACHE_TTL         segundos de validade (padrão 300)
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+
+class Entrada(NamedTuple):
+    pdf: bytes
+    etag: str
+    expira: float
+
+
+def chave(tipo: str, *args, **kwargs) -> str:
+    """Hash canônico (JSON ordenado) do tipo + argumentos do documento."""
+    bruto = json.dumps([tipo, args, kwargs], sort_keys=True, separators=(",", ":"),
+                       ensure_ascii=False, default=str)
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+
+def etag_de(pdf: bytes) -> str:
+    return '"' + hashlib.sha256(pdf).hexdigest()[:32] + '"'
+
+
+def etag_confere(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparação do If-None-Match (aceita lista, '*' e prefixo W/)."""
+    if not if_none_match:
+        return False
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class PdfCache:
+    def __init__(self, max_bytes: int = None, ttl: float = None):
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("PDF_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+        self.ttl = ttl if ttl is not None else float(os.getenv("PDF_CACHE_TTL", 300))
+        self._itens: "OrderedDict[str, Entrada]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.despejos = 0
+
+    def get(self, key: str) -> Optional[Entrada]:
+        with self._lock:
+            entrada = self._itens.get(key)
+            if entrada is not None and entrada.expira < time.monotonic():
+                self._remover(key)
+                entrada = None
+            if entrada is None:
+                self.misses += 1
+                return None
+            self._itens.move_to_end(key)
+            self.hits += 1
+            return entrada
+
+    def put(self, key: str, pdf: bytes) -> Entrada:
+        entrada = Entrada(pdf, etag_de(pdf), time.monotonic() + self.ttl)
+        if len(pdf) > self.max_bytes:
+            return entrada  # maior que o cache inteiro: serve sem guardar
+        with self._lock:
+            if key in self._itens:
+                self._remover(key)
+            self._itens[key] = entrada
+            self._bytes += len(pdf)
+            while self._bytes > self.max_bytes:
+                self._remover(next(iter(self._itens)))
+                self.despejos += 1
+        return entrada
+
+    def _remover(self, key: str):
+        self._bytes -= len(self._itens.pop(key).pdf)
+
+    def clear(self):
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._itens),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "despejos": self.despejos,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,428 @@
+"""PDF escrito página a página, enviado enquanto as seguintes são desenhadas.
+
+draw_list_items já quebra página a cada ~37 itens, mas o canvas do
+ReportLab só produz bytes no save(): num orçamento de milhares de linhas
+o primeiro byte sai depois do render inteiro, e o documento todo fica em
+memória (canvas + BytesIO + cache). Para esses documentos:
+
+- `CanvasIncremental` implementa o subconjunto do canvas que os desenhos
+  de lista usam (setFont, drawString, drawRightString, drawCentredString,
+  showPage, setPageSize, getPageNumber, save). No showPage a página vira
+  um stream de conteúdo (Flate) + objeto /Page e é entregue na hora;
+- a árvore de páginas (obj 2) e os recursos de fonte (obj 3) têm número
+  reservado no início e só são escritos no save(), junto com o info, a
+  xref e o trailer. Até lá só ficam em memória um offset por objeto e um
+  número por página;
+- `pdf_paralelo` é o documento desenhado em faixas de páginas nos
+  workers do executor (render_em_ordem, janela limitada): cada worker
+  devolve só os streams de conteúdo já comprimidos (`paginas_flate`) e o
+  processo da API costura as faixas na ordem, no mesmo escritor. Quem
+  divide o documento precisa saber onde cada página começa (para o
+  orçamento: contar_paginas e soma de prefixo dos valores). Com
+  PDF_EXECUTOR=process é sempre este o caminho (`fatia_no_executor`): o
+  desenho não fica no processo da API, que só costura. Faixas de
+  PDF_STREAM_FATIA páginas; a partir de PDF_PARALELO_PAGINAS, com mais de
+  um worker, faixas maiores (PDF_PARALELO_FATIA) em paralelo;
+- `pdf_costurado` faz a mesma costura para documentos que só o ReportLab
+  desenha (o lote de certificados): cada worker gera o PDF de uma faixa
+  de PDF_PARALELO_FATIA páginas, e o processo da API renumera os objetos
+  dela no escritor e acrescenta as páginas à árvore única;
+- `pdf_incremental` é o caminho dos modos thread/inline (o render já roda
+  neste processo): o desenho vai numa thread, no máximo PDF_WORKERS ao
+  mesmo tempo, e entrega as páginas por uma asyncio.Queue com no máximo
+  PDF_STREAM_FILA páginas esperando. Se o cliente lê devagar, o desenho
+  espera; se desconecta, o desenho para na próxima página e nenhuma
+  thread fica presa esperando a fila.
+
+Fontes: as 14 padrão do PDF, sem embutir, com WinAnsiEncoding (o mesmo
+que o ReportLab faz para Helvetica); larguras de pdfmetrics.
+
+As rotas de orçamento usam este caminho a partir de PDF_STREAM_PAGINAS
+páginas (contar_paginas); abaixo disso o PDF continua vindo do canvas
+normal, do cache e com Range. O incremental não tem Content-Length, ETag
+nem Range (o tamanho só se conhece no fim) e não passa pelo cache.
+
+    PDF_STREAM_PAGINAS     páginas a partir das quais o orçamento sai incremental (padrão 10, 0 desliga)
+    PDF_STREAM_FILA        páginas prontas aguardando envio (padrão 4)
+    PDF_STREAM_FATIA       páginas por faixa desenhada no executor (padrão 5)
+    PDF_PARALELO_PAGINAS   a partir daqui o incremental é desenhado em paralelo (padrão 100, 0 desliga;
+                           só com PDF_EXECUTOR=process e mais de um worker)
+    PDF_PARALELO_FATIA     páginas por faixa enviada a um worker (padrão 40)
+"""
+import asyncio
+import contextvars
+import os
+import re
+import threading
+import time
+import zlib
+from functools import partial
+from typing import AsyncIterator, Callable, Iterable, List, Tuple
+
+from reportlab.lib.pagesizes import A4
+
+from executor import executor
+from lazy import modulo
+from lote import render_em_ordem
+from metrics import EM_ANDAMENTO, cronometro, medido, registrar_render
+from relogio import agora
+
+pdfmetrics = modulo("reportlab.pdfbase.pdfmetrics")
+
+PAGINAS_MIN = int(os.getenv("PDF_STREAM_PAGINAS", 10))
+FILA = int(os.getenv("PDF_STREAM_FILA", 4))
+STREAM_FATIA = int(os.getenv("PDF_STREAM_FATIA", 5))
+PARALELO_PAGINAS = int(os.getenv("PDF_PARALELO_PAGINAS", 100))
+PARALELO_FATIA = int(os.getenv("PDF_PARALELO_FATIA", 40))
+
+_CATALOGO, _PAGINAS, _RECURSOS = 1, 2, 3
+_FIM = object()
+
+# o que objetos_pdf lê de um PDF do ReportLab
+_STARTXREF = re.compile(rb"startxref\s+(\d+)")
+_ENTRADA = re.compile(rb"(\d{10}) \d{5} ([nf])")
+_ROOT = re.compile(rb"/Root (\d+) 0 R")
+_INFO = re.compile(rb"/Info (\d+) 0 R")
+_OBJETO = re.compile(rb"\d+ 0 obj\s*(.*?)\s*endobj\s*$", re.S)
+_STREAM = re.compile(rb">>\s*stream\r?\n")
+_PAGES = re.compile(rb"/Pages (\d+) 0 R")
+_KIDS = re.compile(rb"/Kids \[([^\]]*)\]")
+_REF = re.compile(rb"(\d+) 0 R")
+_REF_OBJETO = re.compile(rb"(?<![\w.])(\d+) 0 R\b")
+
+
+class _Cancelado(Exception):
+    pass
+
+
+def _num(v) -> bytes:
+    """Coordenada como o PDF gosta: sem zeros sobrando (12, 540, 287.64)."""
+    return (b"%.2f" % v).rstrip(b"0").rstrip(b".") if v != int(v) else b"%d" % v
+
+
+def _texto(s: str) -> bytes:
+    """Literal de string PDF em WinAnsi (cp1252); o que não existe lá vira '?'."""
+    dados = s.encode("cp1252", "replace")
+    return b"(" + dados.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)").replace(b"\r", b"\\r") + b")"
+
+
+class EscritorIncremental:
+    """Objetos PDF numerados escritos em `escrever` na ordem em que ficam prontos.
+
+    Guarda só os offsets para a xref; `despejar()` entrega o que foi
+    acumulado desde a última chamada (uma página de cada vez).
+    """
+
+    def __init__(self, escrever: Callable[[bytes], None]):
+        self._escrever = escrever
+        self._buffer = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._posicao = 0
+        self._offsets = {}
+        self._proximo = _RECURSOS + 1
+
+    def reservar(self) -> int:
+        numero = self._proximo
+        self._proximo += 1
+        return numero
+
+    def objeto(self, numero: int, corpo: bytes):
+        self._offsets[numero] = self._posicao + len(self._buffer)
+        self._buffer += b"%d 0 obj\n" % numero + corpo + b"\nendobj\n"
+
+    def stream(self, numero: int, dados: bytes):
+        """`dados` já comprimidos com zlib (FlateDecode)."""
+        self.objeto(numero, b"<< /Filter /FlateDecode /Length %d >>\nstream\n" % len(dados) + dados + b"\nendstream")
+
+    def despejar(self):
+        if self._buffer:
+            dados = bytes(self._buffer)
+            self._buffer.clear()
+            self._posicao += len(dados)
+            self._escrever(dados)
+
+    def fechar(self, info: int):
+        """xref + trailer; todos os objetos reservados já precisam ter sido escritos."""
+        inicio = self._posicao + len(self._buffer)
+        tamanho = self._proximo
+        linhas = [b"xref\n0 %d\n0000000000 65535 f \n" % tamanho]
+        linhas += [b"%010d 00000 n \n" % self._offsets[n] for n in range(1, tamanho)]
+        self._buffer += b"".join(linhas)
+        self._buffer += b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+            tamanho, _CATALOGO, info, inicio)
+        self.despejar()
+
+
+class CanvasIncremental:
+    """Subconjunto do reportlab Canvas que emite cada página no showPage().
+
+    A fonte entra nos recursos com o próprio nome (/Helvetica-Bold 12 Tf):
+    páginas desenhadas em processos diferentes usam os mesmos nomes.
+    """
+
+    def __init__(self, escrever: Callable[[bytes], None], pagesize=A4):
+        self._doc = EscritorIncremental(escrever)
+        self._pagesize = pagesize
+        self._kids = []  # números dos objetos /Page, na ordem
+        self.fontes = set()
+        self._ops = []
+        self._inicio_pagina()
+
+    def _inicio_pagina(self):
+        # como o ReportLab: cada página começa com Helvetica 12
+        self._fonte, self._tamanho = "Helvetica", 12
+        self._ops.clear()
+
+    def setFont(self, nome: str, tamanho: float, leading=None):
+        self._fonte, self._tamanho = nome, tamanho
+
+    def setPageSize(self, tamanho):
+        self._pagesize = tamanho
+
+    def getPageNumber(self) -> int:
+        return len(self._kids) + 1
+
+    def drawString(self, x: float, y: float, texto: str):
+        self.fontes.add(self._fonte)
+        self._ops.append(b"BT /%s %s Tf %s %s Td %s Tj ET\n" % (
+            self._fonte.encode(), _num(self._tamanho), _num(x), _num(y), _texto(texto)))
+
+    def drawRightString(self, x: float, y: float, texto: str):
+        self.drawString(x - pdfmetrics.stringWidth(texto, self._fonte, self._tamanho), y, texto)
+
+    def drawCentredString(self, x: float, y: float, texto: str):
+        self.drawString(x - pdfmetrics.stringWidth(texto, self._fonte, self._tamanho) / 2, y, texto)
+
+    def showPage(self):
+        self.incluir_pagina(zlib.compress(b"".join(self._ops), 6), self._pagesize)
+        self._inicio_pagina()
+
+    def incluir_pagina(self, flate: bytes, pagesize):
+        """Página pronta (conteúdo Flate) como próxima página do documento."""
+        conteudo, pagina = self._doc.reservar(), self._doc.reservar()
+        self._doc.stream(conteudo, flate)
+        largura, altura = pagesize
+        self._doc.objeto(pagina, b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %s %s] /Contents %d 0 R /Resources %d 0 R >>" % (
+            _PAGINAS, _num(largura), _num(altura), conteudo, _RECURSOS))
+        self._kids.append(pagina)
+        self._doc.despejar()
+
+    def save(self):
+        if self._ops or not self._kids:
+            self.showPage()
+        fontes = b" ".join(
+            b"/%s << /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>" % (n.encode(), n.encode())
+            for n in sorted(self.fontes)
+        )
+        _encerrar(self._doc, self._kids, b"<< /ProcSet [/PDF /Text] /Font << %s >> >>" % fontes)
+
+
+def _encerrar(doc: EscritorIncremental, kids: List[int], recursos: bytes):
+    """Catálogo, árvore de páginas, recursos, info, xref e trailer."""
+    doc.objeto(_CATALOGO, b"<< /Type /Catalog /Pages %d 0 R >>" % _PAGINAS)
+    doc.objeto(_PAGINAS, b"<< /Type /Pages /Count %d /Kids [%s] >>" % (
+        len(kids), b" ".join(b"%d 0 R" % k for k in kids)))
+    doc.objeto(_RECURSOS, recursos)
+    info = doc.reservar()
+    doc.objeto(info, b"<< /Producer (HelpTech Antunes) /CreationDate (D:%s) >>" % agora().strftime("%Y%m%d%H%M%S").encode())
+    doc.fechar(info)
+
+
+class _CanvasFaixa(CanvasIncremental):
+    """Guarda as páginas (Flate) em vez de escrevê-las: uma faixa do documento, no worker."""
+
+    def __init__(self, pagesize=A4):
+        self._pagesize = pagesize
+        self.fontes = set()
+        self.paginas = []
+        self._ops = []
+        self._inicio_pagina()
+
+    def getPageNumber(self) -> int:
+        return len(self.paginas) + 1
+
+    def incluir_pagina(self, flate: bytes, pagesize):
+        self.paginas.append((flate, pagesize))
+
+    def save(self):
+        if self._ops:
+            self.showPage()
+
+
+def paginas_flate(draw_fn, *args, **kwargs) -> Tuple[List[tuple], List[str]]:
+    """([(conteúdo Flate, tamanho da página)...], fontes usadas) de draw_fn. Piclável para o executor."""
+    c = _CanvasFaixa()
+    with cronometro("desenho"):
+        draw_fn(c, *args, **kwargs)
+        c.save()
+    return c.paginas, sorted(c.fontes)
+
+
+def fatia_no_executor(paginas: int) -> int:
+    """Páginas por faixa para desenhar o documento nos workers (pdf_paralelo); 0 = thread deste processo.
+
+    Só com processos: em thread/inline o executor já roda aqui, e faixas em
+    threads só disputariam a GIL.
+    """
+    if executor.modo != "process":
+        return 0
+    if PARALELO_PAGINAS and paginas >= PARALELO_PAGINAS and executor.workers > 1:
+        return PARALELO_FATIA
+    return STREAM_FATIA
+
+
+async def pdf_paralelo(faixas: Iterable[Tuple[Callable, tuple]]) -> AsyncIterator[bytes]:
+    """Bytes do PDF costurado a partir de (draw_fn, args) de faixas consecutivas de páginas.
+
+    As faixas rodam no executor com a janela do render_em_ordem e cada uma
+    é escrita assim que ela e as anteriores ficam prontas.
+    """
+    saida = []
+    c = CanvasIncremental(saida.append)
+    jobs = ((str(i), partial(medido, partial(paginas_flate, draw_fn, *args))) for i, (draw_fn, args) in enumerate(faixas))
+    fases, total = {}, 0
+    EM_ANDAMENTO.inc()
+    try:
+        async for _, ((paginas, fontes), tempos) in render_em_ordem(jobs):
+            c.fontes.update(fontes)
+            for flate, pagesize in paginas:
+                c.incluir_pagina(flate, pagesize)
+            for fase, segundos in tempos.items():
+                fases[fase] = fases.get(fase, 0.0) + segundos
+            dados = b"".join(saida)
+            saida.clear()
+            total += len(dados)
+            yield dados
+        c.save()
+        total += sum(map(len, saida))
+        yield b"".join(saida)
+    finally:
+        EM_ANDAMENTO.dec()
+    registrar_render(fases, total)
+
+
+def objetos_pdf(render) -> Tuple[List[Tuple[int, bytes, bytes]], List[int], int]:
+    """Um PDF do ReportLab (render()) desmontado para a costura. Piclável para o executor.
+
+    Devolve ([(número, dicionário, resto do objeto)...], números das
+    páginas na ordem, número da árvore de páginas). Catálogo e info ficam
+    de fora: o documento costurado tem os seus. As referências só aparecem
+    no dicionário; o stream vai intacto em `resto`.
+    """
+    dados = render()
+    xref = int(_STARTXREF.findall(dados[-128:])[-1])
+    fim_xref = dados.index(b"trailer", xref)
+    offsets = sorted(
+        (int(offset), i) for i, (offset, tipo) in enumerate(_ENTRADA.findall(dados, xref, fim_xref)) if tipo == b"n"
+    )
+    trailer = dados[fim_xref:]
+    catalogo, info = int(_ROOT.search(trailer).group(1)), int(_INFO.search(trailer).group(1))
+    objetos, corpos = [], {}
+    for (inicio, numero), (fim, _) in zip(offsets, offsets[1:] + [(xref, None)]):
+        corpo = _OBJETO.match(dados, inicio, fim).group(1)
+        corpos[numero] = corpo
+        if numero not in (catalogo, info):
+            stream = _STREAM.search(corpo)
+            corte = stream.end() if stream else len(corpo)
+            objetos.append((numero, corpo[:corte], corpo[corte:]))
+    raiz = int(_PAGES.search(corpos[catalogo]).group(1))
+    kids = [int(n) for n in _REF.findall(_KIDS.search(corpos[raiz]).group(1))]
+    return [o for o in objetos if o[0] != raiz], kids, raiz
+
+
+async def pdf_costurado(renders: Iterable[Callable[[], bytes]]) -> AsyncIterator[bytes]:
+    """Bytes de um PDF costurado a partir de faixas de páginas desenhadas pelo ReportLab nos workers.
+
+    Para documentos que o CanvasIncremental não desenha (o certificado
+    tem imagem, QR, template): cada faixa é um PDF normal, desmontado no
+    worker (`objetos_pdf`); aqui os objetos ganham números novos no
+    escritor e as páginas entram na árvore única. Fontes, template e logo
+    se repetem uma vez por faixa, não por página.
+    """
+    saida = []
+    doc = EscritorIncremental(saida.append)
+    kids = []
+    jobs = ((str(i), partial(medido, partial(objetos_pdf, render))) for i, render in enumerate(renders))
+    fases, total = {}, 0
+    EM_ANDAMENTO.inc()
+    try:
+        async for _, ((objetos, paginas, raiz), tempos) in render_em_ordem(jobs):
+            novos = {numero: doc.reservar() for numero, _, _ in objetos}
+            novos[raiz] = _PAGINAS
+            renumerar = partial(_REF_OBJETO.sub, lambda m: b"%d 0 R" % novos[int(m.group(1))])
+            for numero, dicionario, resto in objetos:
+                doc.objeto(novos[numero], renumerar(dicionario) + resto)
+            kids += [novos[p] for p in paginas]
+            doc.despejar()
+            for fase, segundos in tempos.items():
+                fases[fase] = fases.get(fase, 0.0) + segundos
+            dados = b"".join(saida)
+            saida.clear()
+            total += len(dados)
+            yield dados
+        _encerrar(doc, kids, b"<< >>")  # cada página aponta para os recursos da própria faixa
+        total += sum(map(len, saida))
+        yield b"".join(saida)
+    finally:
+        EM_ANDAMENTO.dec()
+    registrar_render(fases, total)
+
+
+_desenhos = asyncio.Semaphore(executor.workers)  # threads de desenho do pdf_incremental ao mesmo tempo
+
+
+async def pdf_incremental(draw_fn, *args, **kwargs) -> AsyncIterator[bytes]:
+    """Bytes do PDF página a página: draw_fn(c, *args) numa thread, fila limitada até o cliente."""
+    loop = asyncio.get_running_loop()
+    fila = asyncio.Queue()
+    vagas = threading.Semaphore(FILA)  # páginas entregues e ainda não enviadas
+    cancelado = threading.Event()
+    total = 0
+
+    def avisar(item):
+        try:
+            loop.call_soon_threadsafe(fila.put_nowait, item)
+        except RuntimeError:  # loop já fechado
+            raise _Cancelado
+
+    def entregar(item):
+        while not vagas.acquire(timeout=0.5):
+            if cancelado.is_set():
+                raise _Cancelado
+        if cancelado.is_set():
+            raise _Cancelado
+        avisar(item)
+
+    def desenhar():
+        try:
+            c = CanvasIncremental(entregar)
+            draw_fn(c, *args, **kwargs)
+            c.save()
+            entregar(_FIM)
+        except _Cancelado:
+            pass
+        except Exception as exc:
+            try:
+                avisar(exc)
+            except _Cancelado:
+                pass
+
+    await _desenhos.acquire()
+    EM_ANDAMENTO.inc()
+    t0 = time.perf_counter()
+    try:
+        # a thread roda no contexto da requisição: vê o relógio fixado (relogio.py)
+        threading.Thread(target=contextvars.copy_context().run, args=(desenhar,), name="pdf-incremental", daemon=True).start()
+        while True:
+            item = await fila.get()
+            if item is _FIM:
+                break
+            if isinstance(item, Exception):
+                raise item  # cabeçalhos já foram: o cliente vê a conexão cortada
+            vagas.release()
+            total += len(item)
+            yield item
+    finally:
+        cancelado.set()  # o desenho para ao terminar a página atual
+        _desenhos.release()
+        EM_ANDAMENTO.dec()
+    registrar_render({"desenho": time.perf_counter() - t0}, total)
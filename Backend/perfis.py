@@ -0,0 +1,133 @@
+"""Perfis de saída do PDF: "padrao" (ReportLab como sempre) e "compacto".
+
+Para quem baixa pelo celular em conexão lenta, o perfil compacto ajusta o
+documento logo antes do c.save(), sem mexer nos draw_*:
+
+- streams só com FlateDecode, no nível máximo do zlib: o ReportLab passa
+  páginas, formulários e imagens também por ASCII85 (+25% de bytes,
+  inútil em HTTP binário);
+- /Resources iguais viram um único objeto compartilhado pelas páginas
+  (num lote de certificados cada página repetia o mesmo dicionário) e
+  sem /ProcSet, obsoleto desde o PDF 1.4;
+- /Info só com Producer e CreationDate (sem Title "untitled", Author
+  "anonymous", Subject "unspecified"...).
+
+As fontes já são um único dicionário referenciado por todas as páginas
+(as 14 padrão não são embutidas), então não há o que reaproveitar ali.
+Tudo é por documento: não altera rl_config, então renders simultâneos
+com perfis diferentes não interferem entre si.
+
+    PDF_PERFIL   perfil quando a requisição não pede um (padrão "padrao")
+"""
+import os
+import zlib
+from enum import Enum
+from functools import lru_cache
+
+from lazy import modulo
+
+pdfdoc = modulo("reportlab.pdfbase.pdfdoc")
+
+
+class Perfil(str, Enum):
+    padrao = "padrao"
+    compacto = "compacto"
+
+
+PERFIL_PADRAO = Perfil(os.getenv("PDF_PERFIL", Perfil.padrao.value))
+
+
+def perfil_de(valor) -> Perfil:
+    """Perfil pedido (aceita "padrão" com acento); vazio usa PDF_PERFIL. ValueError se inválido."""
+    if not valor:
+        return PERFIL_PADRAO
+    return Perfil(str(valor).strip().lower().replace("ã", "a"))
+
+
+class _FlateMax:
+    """Mesmo filtro do PDFZCompress do ReportLab, com zlib nível 9."""
+    pdfname = "FlateDecode"
+
+    def encode(self, texto):
+        if isinstance(texto, str):
+            texto = texto.encode("utf8")
+        return zlib.compress(texto, 9)
+
+    def decode(self, codificado):
+        return zlib.decompress(codificado)
+
+
+_FLATE = _FlateMax()
+
+
+@lru_cache(maxsize=None)
+def _classe_info():
+    """PDFInfo que só grava Producer e CreationDate (criada no 1º uso: pdfdoc é preguiçoso)."""
+
+    class InfoCompacta(pdfdoc.PDFInfo):
+        def format(self, document):
+            return pdfdoc.PDFDictionary({
+                "Producer": pdfdoc.PDFString(self.producer),
+                "CreationDate": pdfdoc.PDFDate(ts=document._timeStamp, dateFormatter=self._dateFormatter),
+            }).format(document)
+
+    return InfoCompacta
+
+
+def _info_compacta(info):
+    nova = _classe_info()()
+    nova.__dict__.update(info.__dict__)
+    return nova
+
+
+def _sem_a85(obj):
+    """Remove o ASCII85 de um stream (página/formulário) ou imagem já codificada."""
+    if isinstance(obj, pdfdoc.PDFImageXObject):
+        filtros = tuple(obj._filters or ())
+        if filtros[:1] == ("ASCII85Decode",):
+            obj.streamContent = pdfdoc.asciiBase85Decode(obj.streamContent)
+            obj._filters = filtros[1:]
+    elif isinstance(obj, (pdfdoc.PDFPage, pdfdoc.PDFFormXObject)) and obj.stream and not obj.Contents:
+        s = pdfdoc.PDFStream()
+        s.content = obj.stream
+        s.filters = [_FLATE]
+        obj.Contents = s
+        obj.compression = 0  # senão o format do formulário recoloca os filtros do rl_config
+
+
+def _recursos(doc, pagina, compartilhados: dict):
+    """Mesmo dicionário que o PDFPage.format montaria, sem ProcSet e deduplicado."""
+    xobj = pagina.XObjects.dict if pagina.XObjects else {}
+    gstate = pagina.ExtGState or {}
+    # pelo conteúdo: nomes de XObject/ExtGState e pares (objeto, nome) de cores e sombreamentos.
+    # As fontes (basicFonts) são as do documento inteiro, iguais em todas as páginas.
+    assinatura = (tuple(sorted(xobj)), tuple(sorted(gstate)) if isinstance(gstate, dict) else repr(gstate),
+                  tuple(sorted(pagina._colorsUsed.items())), tuple(sorted(pagina._shadingUsed.items())))
+    ref = compartilhados.get(assinatura)
+    if ref is None:
+        r = pdfdoc.PDFResourceDictionary()
+        r.basicFonts()
+        r.ProcSet = []
+        if pagina.XObjects:
+            r.XObject = pagina.XObjects
+        if pagina.ExtGState:
+            r.ExtGState = pagina.ExtGState
+        r.setShading(pagina._shadingUsed)
+        r.setColorSpace(pagina._colorsUsed)
+        ref = compartilhados[assinatura] = doc.Reference(r)
+    pagina.Resources = ref
+
+
+def compactar(c):
+    """Aplica o perfil compacto ao canvas já desenhado; chamar antes de c.save()."""
+    if c._code:  # página em andamento: fecha como o save() faria
+        c.showPage()
+    doc = c._doc
+    doc.info = _info_compacta(doc.info)
+    compartilhados = {}
+    for obj in list(doc.idToObject.values()):
+        _sem_a85(obj)
+    for pagina in doc.Pages.pages:
+        _sem_a85(pagina)
+        if not pagina.Resources:
+            _recursos(doc, pagina, compartilhados)
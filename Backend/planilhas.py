@@ -0,0 +1,253 @@
+"""Orçamentos em massa a partir de CSV/JSONL (POST /orcamentos/planilha).
+
+No fim do mês saem centenas de orçamentos de uma planilha, e o único
+caminho era um POST /orcamento por linha. Aqui o upload inteiro vira um
+ZIP com um PDF por cliente:
+
+- o corpo é lido em pedaços para um SpooledTemporaryFile (memória até
+  PLANILHA_MEMORIA, depois disco); ele precisa terminar antes da resposta
+  começar porque o StreamingResponse do Starlette disputa o `receive` da
+  requisição;
+- as linhas são lidas uma a uma do arquivo: linhas seguidas do mesmo
+  `cliente` formam um OrcamentoBody (até PLANILHA_MAX_ITENS itens; acima
+  disso ou se o cliente reaparecer depois, sai outro arquivo), então a
+  memória fica limitada por um grupo, não pelo tamanho do upload;
+- cada linha é validada com o modelo Item das rotas; as inválidas vão
+  para `manifesto.jsonl` (também em arquivo temporário) e não derrubam o
+  lote. O manifesto é o último arquivo do ZIP, com uma linha por PDF, uma
+  por erro e um resumo;
+- os grupos vão para render_em_ordem + zip_stream (lote.py): render em
+  paralelo com janela limitada e ZIP enviado enquanto é montado.
+
+CSV: cabeçalho com cliente, descricao e valor (vírgula ou ponto e vírgula;
+"1.234,56" e "R$" são aceitos). JSONL: um objeto por linha, ou
+{"cliente", "descricao", "valor"} (um item) ou {"cliente", "itens": [...]}
+(um orçamento inteiro).
+
+    PLANILHA_MAX_BYTES   tamanho máximo do upload (padrão 256 MiB; 413 acima)
+    PLANILHA_MEMORIA     bytes do upload mantidos em memória antes de ir a disco (padrão 1 MiB)
+    PLANILHA_MAX_ITENS   itens por orçamento antes de quebrar em outro arquivo (padrão 5000)
+"""
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+from enum import Enum
+from typing import AsyncIterator, Iterator, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+
+from dinheiro import centavos, decimal_str
+
+MAX_BYTES = int(os.getenv("PLANILHA_MAX_BYTES", 256 * 1024 * 1024))
+MEMORIA = int(os.getenv("PLANILHA_MEMORIA", 1024 * 1024))
+MAX_ITENS = int(os.getenv("PLANILHA_MAX_ITENS", 5000))
+MANIFESTO = "manifesto.jsonl"
+
+
+class FormatoPlanilha(str, Enum):
+    csv = "csv"
+    jsonl = "jsonl"
+
+
+_TIPOS = {
+    "text/csv": FormatoPlanilha.csv,
+    "application/csv": FormatoPlanilha.csv,
+    "application/x-ndjson": FormatoPlanilha.jsonl,
+    "application/jsonl": FormatoPlanilha.jsonl,
+    "application/x-jsonlines": FormatoPlanilha.jsonl,
+}
+
+
+def formato_do_upload(request: Request, pedido: Optional[FormatoPlanilha]) -> FormatoPlanilha:
+    """?formato= manda; senão o Content-Type. 415 se nenhum dos dois diz."""
+    if pedido is not None:
+        return pedido
+    tipo = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if tipo in _TIPOS:
+        return _TIPOS[tipo]
+    raise HTTPException(415, "Envie Content-Type text/csv ou application/x-ndjson (ou use ?formato=csv|jsonl)")
+
+
+async def receber(request: Request):
+    """Lê o corpo em pedaços para um arquivo temporário (binário, posicionado no início)."""
+    destino = tempfile.SpooledTemporaryFile(max_size=MEMORIA)
+    total = 0
+    try:
+        async for pedaco in request.stream():
+            total += len(pedaco)
+            if total > MAX_BYTES:
+                raise HTTPException(413, f"Planilha maior que {MAX_BYTES} bytes")
+            destino.write(pedaco)
+    except BaseException:
+        destino.close()
+        raise
+    destino.seek(0)
+    return destino
+
+
+# ---------- leitura ----------
+def _texto(arquivo) -> io.TextIOWrapper:
+    return io.TextIOWrapper(arquivo, encoding="utf-8-sig", errors="replace", newline="")
+
+
+def _valor(texto) -> str:
+    """ "R$ 1.234,56" / "1234,56" / "1234.56" → "1234.56"; números (JSONL) passam direto."""
+    if not isinstance(texto, str):
+        return texto
+    texto = texto.replace("R$", "").strip()
+    if "," in texto:
+        texto = texto.replace(".", "").replace(",", ".")
+    return texto
+
+
+def linhas_csv(arquivo) -> Iterator[Tuple[int, dict]]:
+    """(nº da linha, {cliente, descricao, valor}) para cada registro do CSV."""
+    texto = _texto(arquivo)
+    cabecalho = texto.readline()
+    dialeto = "excel" if cabecalho.count(",") >= cabecalho.count(";") else _PontoEVirgula
+    campos = [c.strip().lower().replace("descrição", "descricao") for c in next(csv.reader([cabecalho], dialeto), [])]
+    leitor = csv.DictReader(texto, fieldnames=campos, dialect=dialeto)
+    for registro in leitor:
+        if not any(v.strip() for v in registro.values() if isinstance(v, str)):
+            continue  # linha em branco
+        yield leitor.line_num + 1, registro  # +1: o cabeçalho foi lido fora do DictReader
+
+
+class _PontoEVirgula(csv.excel):
+    delimiter = ";"
+
+
+def linhas_jsonl(arquivo) -> Iterator[Tuple[int, object]]:
+    """(nº da linha, objeto) para cada linha não vazia; JSON inválido vira ValueError no lugar do objeto."""
+    for n, linha in enumerate(_texto(arquivo), start=1):
+        if not linha.strip():
+            continue
+        try:
+            yield n, json.loads(linha)
+        except ValueError as exc:
+            yield n, ValueError(f"JSON inválido: {exc}")
+
+
+# ---------- manifesto ----------
+class Manifesto:
+    """manifesto.jsonl acumulado em arquivo temporário: uma linha por PDF, por erro e o resumo."""
+
+    def __init__(self):
+        self._arquivo = tempfile.SpooledTemporaryFile(max_size=MEMORIA)
+        self.documentos = self.itens = self.erros = 0
+
+    def _gravar(self, registro: dict):
+        self._arquivo.write(json.dumps(registro, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def documento(self, arquivo: str, cliente: str, linhas: Tuple[int, int], itens: int, total: int):
+        self.documentos += 1
+        self.itens += itens
+        self._gravar({"arquivo": arquivo, "cliente": cliente, "linhas": list(linhas), "itens": itens,
+                      "total": decimal_str(total)})
+
+    def erro(self, linha: int, cliente, erro: str):
+        self.erros += 1
+        self._gravar({"linha": linha, "cliente": cliente, "erro": erro})
+
+    def finalizar(self):
+        """Grava o resumo e devolve o arquivo pronto para leitura (fechado pelo zip_stream)."""
+        self._gravar({"resumo": {"documentos": self.documentos, "itens": self.itens, "erros": self.erros}})
+        self._arquivo.seek(0)
+        return self._arquivo
+
+    def close(self):
+        self._arquivo.close()
+
+
+def _erro_validacao(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'linha'}: {e['msg']}" for e in exc.errors(include_url=False))
+
+
+def _erro_linha(exc: Exception) -> str:
+    """Mensagem do manifesto para o que a validação levantou (nenhuma linha derruba o lote)."""
+    if isinstance(exc, ValidationError):
+        return _erro_validacao(exc)
+    return f"linha inválida: {str(exc) or type(exc).__name__}"
+
+
+def _slug(cliente: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", cliente.lower()).strip("_.")[:60] or "cliente"
+
+
+# ---------- agrupamento ----------
+def orcamentos(arquivo, formato: FormatoPlanilha, manifesto: Manifesto, item, corpo) -> Iterator[Tuple[str, object]]:
+    """(nome do PDF, OrcamentoBody) por grupo de linhas seguidas do mesmo cliente; fecha `arquivo` no fim.
+
+    `item` e `corpo` são os modelos Item/OrcamentoBody do app: a validação
+    é a mesma do POST /orcamento.
+    """
+    try:
+        yield from _agrupar(linhas_csv(arquivo) if formato == FormatoPlanilha.csv else linhas_jsonl(arquivo),
+                            manifesto, item, corpo)
+    finally:
+        arquivo.close()
+
+
+def _agrupar(registros: Iterator[Tuple[int, object]], manifesto: Manifesto, item, corpo) -> Iterator[Tuple[str, object]]:
+    vistos = {}  # cliente -> quantos arquivos já saíram (só o contador, não os itens)
+    atual, itens, primeira, ultima = None, [], 0, 0
+
+    def fechar():
+        partes = vistos[atual] = vistos.get(atual, 0) + 1
+        nome = f"{manifesto.documentos + 1:04d}_{_slug(atual)}" + (f"_{partes}" if partes > 1 else "") + ".pdf"
+        body = corpo(cliente=atual, itens=itens)
+        manifesto.documento(nome, atual, (primeira, ultima), len(itens), sum(centavos(i.valor) for i in itens))
+        return nome, body
+
+    for n, registro in registros:
+        if isinstance(registro, Exception):
+            manifesto.erro(n, None, str(registro))
+            continue
+        if not isinstance(registro, dict):
+            manifesto.erro(n, None, "esperado um objeto por linha")
+            continue
+        cliente = str(registro.get("cliente") or "").strip()
+        if not cliente:
+            manifesto.erro(n, None, "cliente: obrigatório")
+            continue
+        if "itens" in registro:  # JSONL com o orçamento inteiro na linha
+            try:
+                body = corpo.model_validate({**registro, "cliente": cliente})
+            except Exception as exc:  # ValidationError e o que escapar dela (ArithmeticError...)
+                manifesto.erro(n, cliente, _erro_linha(exc))
+                continue
+            if itens:
+                yield fechar()
+                atual, itens = None, []
+            atual, itens, primeira, ultima = cliente, body.itens, n, n
+            yield fechar()
+            atual, itens = None, []
+            continue
+        try:
+            novo = item.model_validate({"descricao": registro.get("descricao"), "valor": _valor(registro.get("valor"))})
+        except Exception as exc:  # ValidationError e o que escapar dela (ArithmeticError...)
+            manifesto.erro(n, cliente, _erro_linha(exc))
+            continue
+        if itens and (cliente != atual or len(itens) >= MAX_ITENS):
+            yield fechar()
+            itens = []
+        if not itens:
+            atual, primeira = cliente, n
+        itens.append(novo)
+        ultima = n
+    if itens:
+        yield fechar()
+
+
+async def com_manifesto(arquivos: AsyncIterator[Tuple[str, bytes]], manifesto: Manifesto) -> AsyncIterator[Tuple[str, object]]:
+    """Os PDFs renderizados e, por último, o manifesto."""
+    try:
+        async for nome, dados in arquivos:
+            yield nome, dados
+        yield MANIFESTO, manifesto.finalizar()
+    finally:
+        manifesto.close()
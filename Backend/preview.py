@@ -0,0 +1,99 @@
+"""Miniatura PNG da primeira página (GET/POST /{tipo}/preview).
+
+O front não mostrava nada até o PDF inteiro baixar. A miniatura:
+
+- desenha só a primeira página: o showPage() do canvas vira uma parada,
+  então um orçamento de 40 páginas custa o mesmo que um de uma;
+- rasteriza em baixa resolução (PREVIEW_DPI) com pypdfium2 e grava PNG;
+- fica num cache LRU próprio, limitado em bytes, com a mesma chave
+  canônica dos PDFs (pdf_cache.chave) + a resolução: enquanto o usuário
+  digita, cada estado do formulário já visto volta do cache, e o ETag
+  permite 304.
+
+A prévia não gasta número de nota nem emite código de certificado: os
+dois saem como PREVIA no desenho.
+
+pypdfium2 vem fixado no requirements.txt (render/to_pil mudam entre versões
+maiores); numa instalação sem ele as rotas respondem 501.
+
+    PREVIEW_DPI               resolução da miniatura (padrão 40)
+    PREVIEW_CACHE_MAX_BYTES   limite do cache de miniaturas (padrão 8 MiB, 0 desliga)
+    PREVIEW_CACHE_TTL         segundos de validade (padrão 300)
+"""
+import importlib.util
+import os
+from functools import lru_cache
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A4
+
+from lazy import modulo
+from metrics import cronometro
+from pdf_cache import PdfCache
+
+canvas = modulo("reportlab.pdfgen.canvas")
+pdfium = modulo("pypdfium2")
+
+PREVIA = "PREVIA"  # no lugar do número da nota / código do certificado (ASCII: vai no Code128)
+DPI_PADRAO = int(os.getenv("PREVIEW_DPI", 40))
+DPI_MIN, DPI_MAX = 24, 150
+
+previews = PdfCache(
+    max_bytes=int(os.getenv("PREVIEW_CACHE_MAX_BYTES", 8 * 1024 * 1024)),
+    ttl=float(os.getenv("PREVIEW_CACHE_TTL", 300)),
+)
+
+
+@lru_cache(maxsize=None)
+def pdfium_disponivel() -> bool:
+    return importlib.util.find_spec("pypdfium2") is not None
+
+
+class _PrimeiraPagina(Exception):
+    pass
+
+
+def _parar():
+    raise _PrimeiraPagina
+
+
+def draw_primeira_pagina(c, draw_fn, *args, **kwargs):
+    """Roda draw_fn até o primeiro showPage(); o save() depois fecha essa página."""
+    c.showPage = _parar  # atributo da instância esconde o método da classe
+    try:
+        draw_fn(c, *args, **kwargs)
+    except _PrimeiraPagina:
+        pass
+    finally:
+        del c.showPage
+
+
+def png_primeira_pagina(draw_fn, *args, dpi: int = None, **kwargs) -> bytes:
+    """PDF de uma página em memória → PNG em `dpi`. Piclável para o executor."""
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    with cronometro("desenho"):
+        draw_primeira_pagina(c, draw_fn, *args, **kwargs)
+    with cronometro("serializacao"):
+        c.save()
+    with cronometro("rasterizacao"):
+        doc = pdfium.PdfDocument(buffer.getvalue())
+        try:
+            pagina = doc[0]
+            imagem = pagina.render(scale=(dpi or DPI_PADRAO) / 72).to_pil()
+            pagina.close()
+        finally:
+            doc.close()
+        saida = BytesIO()
+        imagem.save(saida, "PNG")
+    return saida.getvalue()
+
+
+def dados_da_query(modelo, query) -> dict:
+    """Query string → dict para o modelo: campos pelo nome; itens como servicos/valores (igual às rotas GET)."""
+    dados = {k: v for k, v in query.items() if k in modelo.model_fields}
+    if "itens" in modelo.model_fields:
+        dados["itens"] = [
+            {"descricao": d, "valor": v} for d, v in zip(query.getlist("servicos"), query.getlist("valores"))
+        ]
+    return dados
@@ -0,0 +1,58 @@
+"""QR codes pré-compilados.
+
+O caminho antigo (QrCodeWidget + getBounds + Drawing + renderPDF.draw)
+codifica a matriz duas vezes por desenho e gera um retângulo por módulo.
+Aqui a matriz é codificada uma vez por payload, convertida num único path
+(um "re" por sequência horizontal de módulos escuros, em coordenadas de
+módulo) e guardada num LRU limitado:
+
+    QR_CACHE_SIZE   payloads memoizados por processo (padrão 512)
+"""
+import itertools
+import os
+from functools import lru_cache
+
+from lazy import modulo
+from metrics import cronometro
+
+qrencoder = modulo("reportlab.graphics.barcode.qrencoder")
+pathobject = modulo("reportlab.pdfgen.pathobject")
+
+BORDA = 4  # zona de silêncio em módulos, igual ao QrCodeWidget
+
+
+def matriz(payload: str, nivel: str = "L") -> tuple:
+    """Codifica o payload e devolve a matriz de módulos (True = escuro)."""
+    code = qrencoder.QRCode(None, getattr(qrencoder.QRErrorCorrectLevel, nivel))
+    code.addData(payload)
+    code.make()
+    return tuple(tuple(map(bool, row)) for row in code.modules)
+
+
+@lru_cache(maxsize=int(os.getenv("QR_CACHE_SIZE", 512)))
+def qr_path(payload: str, nivel: str = "L"):
+    """Path compacto do QR e o lado total (módulos + bordas), memoizados."""
+    modulos = matriz(payload, nivel)
+    lado = len(modulos) + 2 * BORDA
+    path = pathobject.PDFPathObject()
+    for r, row in enumerate(modulos):
+        col = 0
+        for escuro, grupo in itertools.groupby(row):
+            n = sum(1 for _ in grupo)
+            if escuro:
+                path.rect(col + BORDA, lado - (r + BORDA + 1), n, 1)
+            col += n
+    return path, lado
+
+
+def draw_qr(c, payload: str, x: float, y: float, size: float, nivel: str = "L"):
+    """Desenha o QR (quadrado de lado `size`, borda inclusa) com canto inferior em (x, y)."""
+    with cronometro("codigos"):
+        path, lado = qr_path(payload, nivel)
+    escala = size / lado
+    c.saveState()
+    c.translate(x, y)
+    c.scale(escala, escala)
+    c.setFillColorRGB(0, 0, 0)
+    c.drawPath(path, stroke=0, fill=1)
+    c.restoreState()
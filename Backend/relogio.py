@@ -0,0 +1,123 @@
+"""Relógio dos documentos e modo determinístico.
+
+O "Gerado em" do cabeçalho, a data padrão do certificado, o CreationDate
+e o /ID que o ReportLab grava e a data das entradas do ZIP vinham todos
+do relógio da máquina: o mesmo corpo gerava bytes diferentes a cada
+segundo, e não dava para comparar saídas por hash. Aqui:
+
+- `agora()` é o instante do documento: o relógio fixado para a
+  requisição, se houver, senão datetime.now(). Os desenhos, os templates
+  HTML e o ZIP usam só ele;
+- o relógio é fixado por requisição com `?gerado_em=2025-01-01T12:00`
+  (qualquer rota), ou para o servidor inteiro com PDF_DETERMINISTICO=1
+  (instante de PDF_RELOGIO). O RelogioMiddleware guarda o instante num
+  ContextVar que vale até o último byte da resposta (streaming incluído);
+- com relógio fixo o canvas do ReportLab roda em modo `invariant`
+  (CreationDate constante e /ID derivado do conteúdo), o cache separa as
+  entradas por instante e `levar` embrulha a função enviada ao executor
+  para que o worker (outra thread ou processo) veja o mesmo instante;
+- com PDF_DETERMINISTICO=1 os códigos de certificado também saem de um
+  hash do conteúdo + instante (certificados.py), então o mesmo corpo num
+  registro novo gera o mesmo PDF. Um `?gerado_em` sozinho não muda os
+  códigos: eles continuam aleatórios em produção.
+
+Mesmo corpo + mesmo instante → mesmos bytes; `python -m bench.golden`
+confere isso em todas as rotas dos dois apps.
+
+    PDF_DETERMINISTICO   1 fixa o relógio de todas as requisições (padrão desligado)
+    PDF_RELOGIO          instante usado no modo determinístico (ISO 8601, padrão 2025-01-01T00:00:00)
+"""
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import partial
+from typing import Optional
+from urllib.parse import parse_qsl
+
+from fastapi.responses import JSONResponse
+
+DETERMINISTICO = os.getenv("PDF_DETERMINISTICO", "").strip().lower() in ("1", "true", "sim")
+_ZIP_MINIMO = datetime(1980, 1, 1)  # o formato ZIP não representa datas anteriores
+
+_fixo: ContextVar[Optional[datetime]] = ContextVar("relogio_fixo", default=None)
+
+
+def interpretar(texto: str) -> datetime:
+    """ISO 8601 ("2025-01-01", "2025-01-01T12:00", "...Z") → datetime sem fuso. ValueError se inválido."""
+    momento = datetime.fromisoformat(texto.strip().replace("Z", "+00:00"))
+    if momento.tzinfo is not None:
+        momento = momento.replace(tzinfo=None)  # o documento mostra a hora como veio
+    if momento < _ZIP_MINIMO:
+        raise ValueError("instante anterior a 1980")
+    return momento
+
+
+RELOGIO = interpretar(os.getenv("PDF_RELOGIO", "2025-01-01T00:00:00"))
+
+
+def agora() -> datetime:
+    """Instante do documento: o relógio fixado, ou o da máquina."""
+    return _fixo.get() or datetime.now()
+
+
+def fixo() -> Optional[datetime]:
+    """Instante fixado para a requisição atual (None = relógio da máquina)."""
+    return _fixo.get()
+
+
+@contextmanager
+def fixado(momento: Optional[datetime]):
+    ficha = _fixo.set(momento)
+    try:
+        yield
+    finally:
+        _fixo.reset(ficha)
+
+
+def no_relogio(momento: Optional[datetime], fn, *args, **kwargs):
+    """fn(*args, **kwargs) com o relógio fixado em `momento`. Piclável para o executor."""
+    with fixado(momento):
+        return fn(*args, **kwargs)
+
+
+def levar(fn):
+    """fn embrulhada com o instante atual (ou com "sem relógio fixo"), para rodar em outra thread/processo.
+
+    Sempre embrulha: um worker criado por fork dentro de uma requisição com
+    relógio fixo herda aquele contexto e o veria nas requisições seguintes.
+    """
+    return partial(no_relogio, _fixo.get(), fn)
+
+
+class RelogioMiddleware:
+    """Fixa o relógio pela requisição inteira: ?gerado_em= ou, com PDF_DETERMINISTICO, PDF_RELOGIO."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        momento = RELOGIO if DETERMINISTICO else None
+        pedido = _gerado_em(scope)
+        if pedido is not None:
+            try:
+                momento = interpretar(pedido)
+            except ValueError:
+                resposta = JSONResponse({"detail": "gerado_em deve ser data/hora ISO 8601 a partir de 1980"}, 422)
+                return await resposta(scope, receive, send)
+        if momento is None:
+            return await self.app(scope, receive, send)
+        with fixado(momento):
+            await self.app(scope, receive, send)
+
+
+def _gerado_em(scope) -> Optional[str]:
+    query = scope.get("query_string", b"")
+    if b"gerado_em" not in query:
+        return None
+    for chave, valor in parse_qsl(query.decode("latin-1"), keep_blank_values=True):
+        if chave == "gerado_em":
+            return valor
+    return None
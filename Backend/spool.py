@@ -0,0 +1,252 @@
+"""Spool em disco para saídas grandes, servido com mmap e HTTP Range.
+
+stream_pdf embrulhava o PDF inteiro em BytesIO, sem Content-Length nem
+Range: um lote grande ficava todo na RAM do processo da API e uma conexão
+de celular que caísse no meio baixava tudo de novo. Aqui:
+
+- o worker do executor grava o resultado direto no spool
+  (`gravar_no_spool`), em `<SPOOL_DIR>/<id>/<nome do arquivo>`, com
+  rename atômico; os bytes não voltam ao processo da API. O lote PDF de
+  certificados chega em faixas costuradas (pdf_stream.pdf_costurado) e
+  vai para o disco à medida que chega (`gravar_partes`), sem o documento
+  inteiro na memória de ninguém;
+- a resposta mapeia o arquivo (mmap) e envia fatias de SPOOL_FATIA bytes
+  com Content-Length, Accept-Ranges e 206/Content-Range para quem pedir
+  `Range: bytes=...` (If-Range respeitado); um intervalo que começa depois
+  do fim recebe 416, um malformado (bytes=5-3) recebe o arquivo inteiro;
+- `GET /arquivos/{id}` serve o mesmo arquivo enquanto ele não expira, para
+  retomar um download cujo POST não pode ser repetido (o lote emite
+  códigos); a resposta original aponta para ele em Content-Location;
+- diretórios com mais de SPOOL_TTL segundos são apagados numa varredura
+  feita no máximo uma vez por minuto, a cada arquivo novo.
+
+O fd é aberto antes de a resposta começar, então um arquivo que expire
+durante o download continua legível até o fim.
+
+A fila de jobs usa a mesma classe, com o diretório e o TTL dela.
+
+    SPOOL_DIR     diretório (padrão helptech-spool no diretório temporário)
+    SPOOL_TTL     segundos até um arquivo expirar (padrão 3600)
+    SPOOL_FATIA   bytes por fatia enviada (padrão 262144)
+"""
+import asyncio
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import time
+from contextlib import aclosing, suppress
+from typing import AsyncIterator, Optional, Tuple
+from uuid import uuid4
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+FATIA = int(os.getenv("SPOOL_FATIA", 256 * 1024))
+_ID = re.compile(r"^[0-9a-f]{32}$")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_VARREDURA = 60
+
+
+# ---------- lado do worker (piclável) ----------
+def gravar_no_spool(destino: str, render) -> int:
+    """Renderiza no worker e grava direto no spool (os bytes não voltam ao processo da API)."""
+    dados = render()
+    with open(destino + ".part", "wb") as f:
+        f.write(dados)
+    os.replace(destino + ".part", destino)
+    return len(dados)
+
+
+async def gravar_partes(destino: str, partes: AsyncIterator[bytes]) -> int:
+    """Grava no spool os bytes de `partes` conforme chegam, com rename atômico no fim."""
+    total = 0
+    try:
+        async with aclosing(partes):
+            with open(destino + ".part", "wb") as f:
+                async for dados in partes:
+                    await asyncio.to_thread(f.write, dados)
+                    total += len(dados)
+        os.replace(destino + ".part", destino)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.remove(destino + ".part")
+        raise
+    return total
+
+
+# ---------- Range ----------
+def intervalo(range_header: Optional[str], tamanho: int) -> Optional[Tuple[int, int]]:
+    """`Range: bytes=a-b` → (início, fim exclusivo); None = arquivo inteiro. ValueError se não satisfazível.
+
+    Só um intervalo por pedido: listas (a-b,c-d), unidades desconhecidas e
+    intervalos inválidos (bytes=5-3) recebem o arquivo inteiro, como a
+    RFC 9110 manda; 416 só para um intervalo válido que começa no fim do
+    arquivo ou depois, e para bytes=-n num arquivo vazio.
+    """
+    m = _RANGE.match(range_header.strip()) if range_header else None
+    if m is None:
+        return None
+    a, b = m.groups()
+    if not a and not b:
+        return None
+    if not a:  # bytes=-n: os últimos n
+        n = int(b)
+        if n == 0 or tamanho == 0:  # arquivo vazio: não há último byte (416 bytes */0)
+            raise ValueError("intervalo vazio")
+        return max(tamanho - n, 0), tamanho
+    inicio = int(a)
+    if b and int(b) < inicio:
+        return None
+    if inicio >= tamanho:
+        raise ValueError("intervalo fora do arquivo")
+    fim = min(int(b) + 1, tamanho) if b else tamanho
+    return inicio, fim
+
+
+def _cabecalhos(request: Request, tamanho: int, filename: str, etag: str):
+    """(status, headers, início, fim) da resposta, ou Response 416 pronta."""
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "ETag": etag,
+    }
+    pedido = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        pedido = None  # o arquivo mudou desde a 1ª parte: manda inteiro
+    try:
+        faixa = intervalo(pedido, tamanho)
+    except ValueError:
+        return Response(status_code=416, headers={"Accept-Ranges": "bytes", "Content-Range": f"bytes */{tamanho}"})
+    inicio, fim = faixa or (0, tamanho)
+    headers["Content-Length"] = str(fim - inicio)
+    if faixa is None:
+        return 200, headers, inicio, fim
+    headers["Content-Range"] = f"bytes {inicio}-{fim - 1}/{tamanho}"
+    return 206, headers, inicio, fim
+
+
+def responder_bytes(request: Request, dados: bytes, filename: str, media_type: str = "application/pdf",
+                    etag: Optional[str] = None) -> Response:
+    """Bytes já em memória (cache de PDFs) com Content-Length e Range."""
+    r = _cabecalhos(request, len(dados), filename, etag or "")
+    if isinstance(r, Response):
+        return r
+    status, headers, inicio, fim = r
+    if not etag:
+        del headers["ETag"]
+    corpo = dados if status == 200 else dados[inicio:fim]
+    return Response(corpo, status_code=status, media_type=media_type, headers=headers)
+
+
+def _fatias(f, mapa, inicio: int, fim: int):
+    try:
+        for i in range(inicio, fim, FATIA):
+            yield mapa[i:min(i + FATIA, fim)]
+    finally:
+        if mapa is not None:
+            mapa.close()
+        f.close()
+
+
+def responder_arquivo(request: Request, caminho: str, filename: str, media_type: str = "application/pdf",
+                      etag: Optional[str] = None, headers: Optional[dict] = None) -> Response:
+    """Arquivo do spool via mmap, com Content-Length, Accept-Ranges e 206. FileNotFoundError se sumiu."""
+    f = open(caminho, "rb")
+    try:
+        st = os.fstat(f.fileno())
+        etag = etag or f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+        r = _cabecalhos(request, st.st_size, filename, etag)
+        if isinstance(r, Response):
+            f.close()
+            return r
+        status, cabecalhos, inicio, fim = r
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else None
+    except BaseException:
+        f.close()
+        raise
+    cabecalhos.update(headers or {})
+    return StreamingResponse(_fatias(f, mapa, inicio, fim), status_code=status, media_type=media_type, headers=cabecalhos)
+
+
+# ---------- spool ----------
+class Spool:
+    def __init__(self, diretorio: str = None, ttl: float = None):
+        self.diretorio = diretorio or os.getenv("SPOOL_DIR") or os.path.join(tempfile.gettempdir(), "helptech-spool")
+        self.ttl = ttl if ttl is not None else float(os.getenv("SPOOL_TTL", 3600))
+        os.makedirs(self.diretorio, exist_ok=True)
+        self._proxima_varredura = 0.0
+        self.expirados = 0
+
+    def novo(self, filename: str, arquivo_id: str = None) -> Tuple[str, str]:
+        """Reserva <id>/<filename> no spool; devolve (id, caminho) para o worker gravar."""
+        self.limpar_expirados()
+        arquivo_id = arquivo_id or uuid4().hex
+        pasta = os.path.join(self.diretorio, arquivo_id)
+        os.makedirs(pasta, exist_ok=True)
+        return arquivo_id, os.path.join(pasta, os.path.basename(filename))
+
+    def localizar(self, arquivo_id: str) -> Optional[str]:
+        """Caminho do arquivo pronto (sem .part/.progresso), ou None se não existe ou expirou."""
+        if not _ID.match(arquivo_id):
+            return None
+        pasta = os.path.join(self.diretorio, arquivo_id)
+        try:
+            if os.stat(pasta).st_mtime < time.time() - self.ttl:
+                return None
+            nomes = [n for n in os.listdir(pasta) if not n.endswith((".part", ".progresso"))]
+        except OSError:
+            return None
+        return os.path.join(pasta, nomes[0]) if nomes else None
+
+    def responder(self, request: Request, arquivo_id: str, media_type: str = "application/pdf") -> Response:
+        """Serve <id> com Range; Content-Location aponta para GET /arquivos/{id} (retomada)."""
+        caminho = self.localizar(arquivo_id)
+        if caminho is None:
+            raise HTTPException(404, "Arquivo não encontrado (ou expirado)")
+        try:
+            return responder_arquivo(request, caminho, os.path.basename(caminho), media_type,
+                                     etag=f'"{arquivo_id}"', headers={"Content-Location": f"/arquivos/{arquivo_id}"})
+        except FileNotFoundError:
+            raise HTTPException(404, "Arquivo não encontrado (ou expirado)")
+
+    def remover(self, caminho: Optional[str]):
+        """Apaga o arquivo e, se ficou vazia, a pasta <id> dele."""
+        if not caminho:
+            return
+        for alvo in (caminho, caminho + ".progresso"):
+            try:
+                os.remove(alvo)
+            except OSError:
+                pass
+        try:
+            os.rmdir(os.path.dirname(caminho))
+        except OSError:
+            pass
+
+    def limpar_expirados(self, agora: float = None):
+        agora = agora or time.time()
+        if agora < self._proxima_varredura:
+            return
+        self._proxima_varredura = agora + _VARREDURA
+        limite = agora - self.ttl
+        try:
+            entradas = list(os.scandir(self.diretorio))
+        except OSError:
+            return
+        for e in entradas:
+            try:
+                if e.is_dir(follow_symlinks=False) and _ID.match(e.name) and e.stat().st_mtime < limite:
+                    shutil.rmtree(e.path, ignore_errors=True)
+                    self.expirados += 1
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        try:
+            arquivos = sum(1 for e in os.scandir(self.diretorio) if e.is_dir() and _ID.match(e.name))
+        except OSError:
+            arquivos = 0
+        return {"diretorio": self.diretorio, "arquivos": arquivos, "ttl": self.ttl, "expirados": self.expirados}
@@ -0,0 +1,9 @@
+"""Os testes importam os apps de Backend/ com render no próprio processo e sem limite de taxa."""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("PDF_EXECUTOR", "inline")
+os.environ.setdefault("ADMISSAO_TAXA", "0")
+os.environ.setdefault("CERTIFICADOS_DB", os.path.join(tempfile.mkdtemp(), "certificados.db"))
@@ -0,0 +1,27 @@
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import main_nf
+from dinheiro import arredondar
+
+
+def test_arredondar_meio_centavo_para_cima():
+    assert arredondar(Decimal("1.005")) == Decimal("1.01")
+
+
+def test_arredondar_fora_da_precisao_e_value_error():
+    with pytest.raises(ValueError, match="fora do intervalo"):
+        arredondar(Decimal("1e26"))
+
+
+@pytest.mark.parametrize("app", [main.app, main_nf.app], ids=["main", "main_nf"])
+@pytest.mark.parametrize("valor", [1e30, "1e26"])
+def test_valor_enorme_e_422(app, valor):
+    c = TestClient(app)
+    assert c.post("/recibo", json={"cliente": "a", "valor": valor}).status_code == 422
+    assert c.get("/recibo", params={"cliente": "a", "valor": str(valor)}).status_code == 422
+    r = c.post("/orcamento", json={"cliente": "a", "itens": [{"descricao": "x", "valor": valor}]})
+    assert r.status_code == 422
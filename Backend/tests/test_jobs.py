@@ -0,0 +1,68 @@
+import asyncio
+import sqlite3
+
+import pytest
+from fastapi import HTTPException
+
+import main
+from jobs import CONCLUIDO, ERRO, PENDENTE, JobQueue
+
+
+def _fila(tmp_path, banco: bool = True, **kwargs) -> JobQueue:
+    db = str(tmp_path / "jobs.sqlite3") if banco else None
+    return JobQueue(spool=str(tmp_path / "spool"), db=db, workers=1, **kwargs)
+
+
+async def _submeter(fila: JobQueue, n: int = 0):
+    return await fila.submeter("recibo", f"recibo_{n}.pdf", 1, main.pdf_bytes, main.draw_recibo, f"cliente {n}", 100)
+
+
+async def _esperar(fila: JobQueue, *lista):
+    for _ in range(500):
+        if all(job.status not in (PENDENTE, "executando") for job in lista):
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("jobs não terminaram")
+
+
+def test_fila_cheia_e_503_com_retry_after(tmp_path):
+    async def cenario():
+        fila = _fila(tmp_path, max_fila=2)
+        # ao mesmo tempo: o terceiro chega antes de o worker tirar algum da fila
+        *primeiros, exc = await asyncio.gather(*(_submeter(fila, i) for i in range(3)), return_exceptions=True)
+        assert isinstance(exc, HTTPException), exc
+        assert exc.status_code == 503 and int(exc.headers["Retry-After"]) >= 1
+        await _esperar(fila, *primeiros)
+        await _submeter(fila, 3)  # terminaram: há vaga de novo
+        fila.shutdown()
+
+    asyncio.run(cenario())
+
+
+def test_terminados_alem_do_limite_saem_da_memoria_e_do_banco(tmp_path):
+    async def cenario():
+        fila = _fila(tmp_path, max_guardados=2)
+        for i in range(5):
+            await _esperar(fila, await _submeter(fila, i))
+        await asyncio.sleep(0.05)  # o worker grava o último e limpa depois de marcar concluído
+        await fila.limpar_expirados()
+        assert all(job.status == CONCLUIDO for job in fila._jobs.values())
+        assert len(fila._jobs) == 2
+        fila.shutdown()
+
+    asyncio.run(cenario())
+    assert sqlite3.connect(tmp_path / "jobs.sqlite3").execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 2
+
+
+def test_pendente_alem_do_ttl_vira_erro(tmp_path):
+    async def cenario():
+        fila = _fila(tmp_path, banco=False)  # sem await no submeter: o worker ainda não pegou o job
+        job = await _submeter(fila)
+        job.criado -= fila.ttl + 1  # como se estivesse na fila há mais que o TTL
+        await fila.limpar_expirados()
+        assert job.status == ERRO and job.erro == "expirou na fila" and fila._ativos == 0
+        await asyncio.sleep(0.05)  # o worker pula o id expirado
+        assert job.status == ERRO
+        fila.shutdown()
+
+    asyncio.run(cenario())
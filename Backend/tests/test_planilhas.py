@@ -0,0 +1,45 @@
+import io
+import json
+import zipfile
+
+from fastapi.testclient import TestClient
+from pydantic import field_validator
+
+import main
+from planilhas import FormatoPlanilha, Manifesto, orcamentos
+
+
+def _erros(manifesto: Manifesto):
+    return [json.loads(linha) for linha in manifesto.finalizar() if b'"erro"' in linha]
+
+
+def test_valor_enorme_vai_para_o_manifesto():
+    manifesto = Manifesto()
+    arquivo = io.BytesIO(b"cliente,descricao,valor\na,x,1e30\nb,y,2\n")
+    docs = list(orcamentos(arquivo, FormatoPlanilha.csv, manifesto, main.Item, main.OrcamentoBody))
+    assert [body.cliente for _, body in docs] == ["b"]
+    assert [e["linha"] for e in _erros(manifesto)] == [2]
+
+
+def test_erro_fora_da_validacao_nao_derruba_o_lote():
+    class ItemQueEstoura(main.Item):
+        @field_validator("descricao")
+        @classmethod
+        def estoura(cls, v):
+            if v == "x":
+                raise ZeroDivisionError("boom")  # não é ValueError: o pydantic não converte
+            return v
+
+    manifesto = Manifesto()
+    arquivo = io.BytesIO(b"cliente,descricao,valor\na,x,1\nb,y,2\n")
+    docs = list(orcamentos(arquivo, FormatoPlanilha.csv, manifesto, ItemQueEstoura, main.OrcamentoBody))
+    assert [body.cliente for _, body in docs] == ["b"]
+    assert _erros(manifesto)[0]["erro"] == "linha inválida: boom"
+
+
+def test_planilha_com_valor_enorme_fecha_o_zip():
+    c = TestClient(main.app)
+    r = c.post("/orcamentos/planilha?formato=csv", content=b"cliente,descricao,valor\na,x,1e30\nb,y,2\n")
+    assert r.status_code == 200
+    nomes = zipfile.ZipFile(io.BytesIO(r.content)).namelist()
+    assert nomes[-1] == "manifesto.jsonl" and len(nomes) == 2
@@ -0,0 +1,50 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from spool import intervalo, responder_arquivo
+
+
+@pytest.mark.parametrize("pedido, esperado", [
+    ("bytes=0-9", (0, 10)),
+    ("bytes=-5", (95, 100)),
+    ("bytes=90-", (90, 100)),
+    ("bytes=5-3", None),   # inválido: arquivo inteiro
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+])
+def test_intervalo(pedido, esperado):
+    assert intervalo(pedido, 100) == esperado
+
+
+@pytest.mark.parametrize("pedido, tamanho", [("bytes=100-", 100), ("bytes=-0", 100), ("bytes=-5", 0), ("bytes=0-", 0)])
+def test_intervalo_nao_satisfazivel(pedido, tamanho):
+    with pytest.raises(ValueError):
+        intervalo(pedido, tamanho)
+
+
+@pytest.fixture
+def cliente(tmp_path):
+    app = FastAPI()
+
+    @app.get("/{nome}")
+    def baixar(nome: str, request: Request):
+        return responder_arquivo(request, str(tmp_path / nome), nome)
+
+    (tmp_path / "vazio.pdf").write_bytes(b"")
+    (tmp_path / "cheio.pdf").write_bytes(bytes(range(100)))
+    return TestClient(app)
+
+
+def test_arquivo_vazio(cliente):
+    r = cliente.get("/vazio.pdf", headers={"Range": "bytes=-5"})
+    assert r.status_code == 416 and r.headers["content-range"] == "bytes */0"
+    r = cliente.get("/vazio.pdf")
+    assert r.status_code == 200 and r.content == b"" and r.headers["content-length"] == "0"
+
+
+def test_range_invalido_manda_o_arquivo_inteiro(cliente):
+    r = cliente.get("/cheio.pdf", headers={"Range": "bytes=5-3"})
+    assert r.status_code == 200 and len(r.content) == 100
+    r = cliente.get("/cheio.pdf", headers={"Range": "bytes=-5"})
+    assert r.status_code == 206 and r.headers["content-range"] == "bytes 95-99/100" and r.content == bytes(range(95, 100))
@@ -0,0 +1,131 @@
+"""Layout de texto corrido: quebra de linha, justificação e quebra de página.
+
+`textLines` do ReportLab não quebra linha nem página: contrato longo sai
+da folha. Aqui o texto é quebrado palavra a palavra (guloso, sem
+hifenização) usando larguras memoizadas por (fonte, tamanho, palavra) —
+num contrato de dezenas de milhares de palavras quase todas se repetem,
+então o custo fica linear no número de palavras e dominado por lookups.
+
+    desenhar_texto(c, texto, x, y, largura)   desenha e devolve o y final
+
+A justificação usa o operador de espaçamento entre palavras do PDF (Tw)
+num único objeto de texto por página, em vez de posicionar cada palavra.
+Quebras de página seguem o padrão de draw_list_items: abaixo de y_min
+chama showPage e continua em y_topo.
+
+    TEXTO_CACHE_SIZE   larguras memoizadas por processo (padrão 65536)
+"""
+import os
+from functools import lru_cache
+from typing import Callable, List, NamedTuple, Optional
+
+from lazy import modulo
+
+pdfmetrics = modulo("reportlab.pdfbase.pdfmetrics")
+
+
+class Linha(NamedTuple):
+    palavras: List[str]
+    largura: float        # largura natural (palavras + espaços simples)
+    fim_paragrafo: bool   # última linha do parágrafo não é justificada
+
+
+@lru_cache(maxsize=int(os.getenv("TEXTO_CACHE_SIZE", 65536)))
+def largura(fonte: str, tamanho: float, token: str) -> float:
+    """stringWidth memoizado por fonte, tamanho e token."""
+    return pdfmetrics.stringWidth(token, fonte, tamanho)
+
+
+def _cortar(palavra: str, fonte: str, tamanho: float, largura_max: float) -> List[str]:
+    """Palavra maior que a linha (URL, código): corta em pedaços que cabem."""
+    pedacos, atual, w = [], "", 0.0
+    for ch in palavra:
+        wc = largura(fonte, tamanho, ch)
+        if atual and w + wc > largura_max:
+            pedacos.append(atual)
+            atual, w = "", 0.0
+        atual += ch
+        w += wc
+    pedacos.append(atual)
+    return pedacos
+
+
+def quebrar(texto: str, fonte: str, tamanho: float, largura_max: float) -> List[Linha]:
+    """Quebra `texto` em linhas de até `largura_max`; "\\n" separa parágrafos."""
+    espaco = largura(fonte, tamanho, " ")
+    linhas = []
+    for paragrafo in texto.split("\n"):
+        atual, w = [], 0.0
+        for palavra in paragrafo.split():
+            wp = largura(fonte, tamanho, palavra)
+            if wp > largura_max:
+                *inteiros, palavra = _cortar(palavra, fonte, tamanho, largura_max)
+                for pedaco in inteiros:
+                    if atual:
+                        linhas.append(Linha(atual, w, False))
+                    atual, w = [], 0.0
+                    linhas.append(Linha([pedaco], largura(fonte, tamanho, pedaco), False))
+                wp = largura(fonte, tamanho, palavra)
+            if atual and w + espaco + wp > largura_max:
+                linhas.append(Linha(atual, w, False))
+                atual, w = [], 0.0
+            w = w + espaco + wp if atual else wp
+            atual.append(palavra)
+        linhas.append(Linha(atual, w, True))
+    return linhas
+
+
+def contar_linhas(texto: str, fonte: str, tamanho: float, largura_max: float) -> int:
+    return len(quebrar(texto, fonte, tamanho, largura_max))
+
+
+def contar_paginas(n_linhas: int, y: float, leading: float, y_min: float = 80, y_topo: float = 800) -> int:
+    """Páginas que desenhar_texto ocupa para n_linhas começando em y."""
+    primeira = max(int((y - y_min) // leading) + 1, 0)
+    if n_linhas <= primeira:
+        return 1
+    demais = int((y_topo - y_min) // leading) + 1
+    return 1 + -(-(n_linhas - primeira) // demais)
+
+
+def desenhar_texto(
+    c,
+    texto: str,
+    x: float,
+    y: float,
+    largura_max: float,
+    fonte: str = "Helvetica",
+    tamanho: float = 12,
+    leading: Optional[float] = None,
+    justificar: bool = True,
+    y_min: float = 80,
+    y_topo: float = 800,
+    nova_pagina: Optional[Callable] = None,
+) -> float:
+    """Desenha o texto quebrado (e justificado) a partir de (x, y); devolve o y da próxima linha."""
+    leading = leading or tamanho * 1.2
+    t = c.beginText(x, y)
+    t.setFont(fonte, tamanho, leading)
+    tw = 0.0
+    for linha in quebrar(texto, fonte, tamanho, largura_max):
+        if y < y_min:
+            c.drawText(t)
+            c.showPage()
+            if nova_pagina:
+                nova_pagina(c)
+            y = y_topo
+            t = c.beginText(x, y)
+            t.setFont(fonte, tamanho, leading)
+            tw = 0.0
+        lacunas = len(linha.palavras) - 1
+        novo_tw = (largura_max - linha.largura) / lacunas if justificar and lacunas and not linha.fim_paragrafo else 0.0
+        if novo_tw != tw:
+            t.setWordSpace(novo_tw)
+            tw = novo_tw
+        t.textLine(" ".join(linha.palavras))
+        y -= leading
+    if tw:
+        t.setWordSpace(0)
+    c.drawText(t)
+    return y
+
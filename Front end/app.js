@@ -11,6 +11,9 @@ async function downloadBlob(url, options, filename = "arquivo.pdf") {
     const res = await fetch(url, options);
     if (!res.ok) throw new Error(`Erro ${res.status}`);
     const blob = await res.blob();
+    // nome definido pelo servidor (ex.: número da nota alocado no backend)
+    const match = /filename="?([^";]+)"?/.exec(res.headers.get("Content-Disposition") || "");
+    if (match) filename = match[1];
     const fileUrl = URL.createObjectURL(blob);
     const a = document.createElement("a");
     a.href = fileUrl;
@@ -56,7 +59,6 @@ const formNF = document.querySelector("#formNF");
 if (formNF) {
   formNF.onsubmit = async (ev) => {
     ev.preventDefault();
-    const numero = formNF.querySelector("[name='numero']").value;
     const cliente = formNF.querySelector("[name='cliente']").value;
     const servicos = Array.from(formNF.querySelectorAll("[name='servico']"))
       .map((el) => el.value)
@@ -66,7 +68,6 @@ if (formNF) {
       .filter((v) => !isNaN(v));
 
     const body = {
-      numero,
       cliente,
       itens: servicos.map((s, i) => ({ descricao: s, valor: valores[i] || 0 })),
     };
@@ -75,7 +76,7 @@ if (formNF) {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify(body),
-    }, `nota_${numero}.pdf`);
+    }, "nota-fiscal.pdf");
   };
 }
 